@@ -6,6 +6,7 @@ BlackPiyan 模組入口點
 允許使用 'python -m blackpiyan' 運行
 """
 
+import argparse
 import os
 import sys
 import time
@@ -16,8 +17,13 @@ from blackpiyan.simulation.simulator import Simulator
 from blackpiyan.analysis.analyzer import Analyzer
 from blackpiyan.visualization.visualizer import Visualizer
 
-def main():
+def main(argv=None):
     """模組主入口點"""
+    parser = argparse.ArgumentParser(prog='blackpiyan', description="模擬並比較莊家補牌策略")
+    parser.add_argument('--resume', nargs='?', const='', default=None, metavar='CHECKPOINT',
+                        help="從檢查點繼續中斷的運行 (省略路徑時使用配置中的檢查點)")
+    args = parser.parse_args(argv)
+    
     # 載入配置
     config_path = 'configs/default.yaml'
     if not os.path.exists(config_path):
@@ -40,7 +46,32 @@ def main():
     # 執行模擬
     start_time = time.time()
     simulator = Simulator(config)
-    results = simulator.run_multiple_strategies(strategies, min_games)
+    if simulator.workers > 1:
+        logger.info(f"使用 {simulator.workers} 個工作進程並行模擬")
+    if args.resume is not None:
+        # 以檢查點中保存的配置和進度繼續，結果與未中斷的運行相同
+        results = Simulator.resume(args.resume or simulator.checkpoint_path())
+        strategies = list(results)
+    elif config.get('simulation', {}).get('run_mode', 'games') == 'time_budget':
+        # 在時間預算內盡可能多地模擬
+        time_budget = config.get('simulation', {}).get('sim_time_seconds', 10)
+        results = simulator.run_time_budget(strategies, time_budget)
+    elif config.get('simulation', {}).get('run_mode', 'games') == 'precision':
+        # 逐批模擬直到每個策略的置信區間半寬達到目標
+        results = simulator.run_precision(strategies)
+    elif config.get('simulation', {}).get('run_mode', 'games') == 'race':
+        # 逐輪淘汰明顯較差的策略，計算量集中在難以區分的策略上
+        results = simulator.run_race(strategies)
+        logger.info(f"比賽剩餘策略: {simulator.race_survivors}，被排除的策略及輪次: {simulator.race_eliminated}")
+    elif config.get('simulation', {}).get('aggregate_only', False):
+        # 只保留每個策略的點數計數，記憶體用量與局數無關
+        if simulator.checkpoint_interval is not None and simulator.record_column is None:
+            # 定期保存檢查點，中斷後可用 --resume 繼續（記錄明牌或滲透率時不保存檢查點）
+            results = simulator.run_checkpointed(strategies, min_games)
+        else:
+            results = simulator.run_aggregate(strategies, min_games)
+    else:
+        results = simulator.run_multiple_strategies(strategies, min_games)
     
     # 分析結果
     logger.info("模擬完成，開始分析結果")
@@ -55,9 +86,16 @@ def main():
         logger.info(f"  平均點數: {stats['mean']:.2f}")
         logger.info(f"  中位數點數: {stats['median']}")
     
-    # 比較策略
-    comparison = analyzer.compare_strategies()
+    # 比較策略（附自助法置信區間）
+    analysis_config = config.get('analysis', {})
+    confidence = analysis_config.get('confidence_level', 0.95) if analysis_config.get('confidence_intervals', True) else None
+    comparison = analyzer.compare_strategies(confidence, analysis_config.get('bootstrap_replicates', 2000))
     logger.info(f"策略比較: \n{comparison}")
+    if analysis_config.get('pairwise_tests', True) and len(strategies) >= 2:
+        # 成對顯著性檢定（Holm 校正後的 p 值）
+        tests = analyzer.pairwise_tests(analysis_config.get('distribution_test', 'chi2'),
+                                        analysis_config.get('significance_level', 0.05))
+        logger.info(f"成對顯著性檢定: \n{tests}")
     
     # 生成視覺化
     logger.info("生成視覺化圖表")
@@ -1,5 +1,9 @@
 """分析模塊，提供遊戲結果的分析功能"""
 
+from blackpiyan.analysis.aggregate import OutcomeAggregate
 from blackpiyan.analysis.analyzer import Analyzer
+from blackpiyan.analysis.exact import ExactCalculator
+from blackpiyan.analysis.incremental import IncrementalAnalyzer
+from blackpiyan.analysis.result_batch import ResultBatch
 
-__all__ = ['Analyzer'] 
\ No newline at end of file
+__all__ = ['Analyzer', 'ExactCalculator', 'IncrementalAnalyzer', 'OutcomeAggregate', 'ResultBatch'] 
\ No newline at end of file
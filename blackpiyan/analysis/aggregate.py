@@ -0,0 +1,553 @@
+from abc import ABC, abstractmethod
+from typing import Dict, Any, List, Optional, Sequence, Tuple, Union
+from statistics import NormalDist
+
+import numpy as np
+
+from blackpiyan.analysis.result_batch import ResultBatch
+
+# 各格對應的點數及其平方（計算點數和與平方和）
+_VALUES = np.arange(32, dtype=np.int64)
+_SQUARES = _VALUES * _VALUES
+
+# 明牌點數 (1-13) 到條件表行號的查找表：A、2-9 各一行，10、J、Q、K 合為一行（索引0不使用）
+UP_CARD_ROWS = np.array([0, 0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 9, 9, 9], dtype=np.intp)
+UP_CARD_LABELS = ('A', '2', '3', '4', '5', '6', '7', '8', '9', '10')
+
+# 牌靴剩餘比例的分組數量（每組 5%）及其標籤
+PENETRATION_BUCKETS = 20
+PENETRATION_LABELS = tuple(f'{100 * i // PENETRATION_BUCKETS}-{100 * (i + 1) // PENETRATION_BUCKETS}%'
+                           for i in range(PENETRATION_BUCKETS))
+
+class OutcomeAggregate:
+    """
+    單一策略模擬結果的聚合計數
+    
+    以固定大小的計數陣列記錄每個莊家最終點數出現的局數，記憶體用量與
+    模擬局數無關。爆牌即最終點數大於21，因此爆牌局數可直接由計數陣列得出。
+    多個批次或進程的聚合結果可以相加合併。
+    """
+    
+    # 點數 0-31 各佔一格（莊家最大點數為30）
+    NUM_BINS = 32
+    
+    # 可以設定目標置信區間半寬的指標
+    PRECISION_METRICS = ('bust_rate', 'mean')
+    
+    # 以自助法 (bootstrap) 估計置信區間的指標
+    BOOTSTRAP_METRICS = ('bust_rate', 'mean', 'median', 'std')
+    
+    def __init__(self, counts: Optional[Sequence[int]] = None):
+        """
+        初始化聚合計數
+        
+        Args:
+            counts: 長度為 NUM_BINS 的點數計數，如為None則從零開始
+        """
+        if counts is None:
+            self.counts = np.zeros(self.NUM_BINS, dtype=np.int64)
+        else:
+            self.counts = np.array(counts, dtype=np.int64)
+            if self.counts.shape != (self.NUM_BINS,):
+                raise ValueError(f"Counts must have {self.NUM_BINS} bins, got shape {self.counts.shape}")
+    
+    @classmethod
+    def from_totals(cls, totals: np.ndarray) -> 'OutcomeAggregate':
+        """
+        由每局最終點數陣列建立聚合計數
+        
+        Args:
+            totals: 每局莊家最終點數
+        
+        Returns:
+            聚合計數
+        """
+        aggregate = cls()
+        aggregate.add(totals)
+        return aggregate
+    
+    @classmethod
+    def from_results(cls, results: Union[ResultBatch, List[Dict[str, Any]]]) -> 'OutcomeAggregate':
+        """
+        由 Simulator.run_simulation 返回的結果批次或結果列表建立聚合計數
+        
+        Args:
+            results: 列式結果批次或遊戲結果列表
+        
+        Returns:
+            聚合計數
+        """
+        if isinstance(results, ResultBatch):
+            return cls.from_totals(results.totals)
+        return cls.from_totals(np.fromiter((r['dealer_hand_value'] for r in results),
+                                           dtype=np.int64, count=len(results)))
+    
+    def add(self, totals: np.ndarray) -> None:
+        """
+        累加一批最終點數
+        
+        Args:
+            totals: 每局莊家最終點數
+        """
+        totals = np.asarray(totals, dtype=np.intp)
+        if totals.size and (totals.min() < 0 or totals.max() >= self.NUM_BINS):
+            raise ValueError(f"Hand totals must be in [0, {self.NUM_BINS}), got {totals.min()}..{totals.max()}")
+        self.counts += np.bincount(totals, minlength=self.NUM_BINS)
+    
+    def merge(self, other: 'OutcomeAggregate') -> 'OutcomeAggregate':
+        """
+        將另一個聚合計數合併到此聚合中
+        
+        Args:
+            other: 要合併的聚合計數
+        
+        Returns:
+            合併後的此聚合（便於鏈式調用）
+        """
+        self.counts += other.counts
+        return self
+    
+    def __add__(self, other: 'OutcomeAggregate') -> 'OutcomeAggregate':
+        return OutcomeAggregate(self.counts + other.counts)
+    
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, OutcomeAggregate) and np.array_equal(self.counts, other.counts)
+    
+    def copy(self) -> 'OutcomeAggregate':
+        """返回聚合計數的副本"""
+        return OutcomeAggregate(self.counts)
+    
+    @property
+    def count(self) -> int:
+        """總局數"""
+        return int(self.counts.sum())
+    
+    @property
+    def bust_count(self) -> int:
+        """爆牌局數"""
+        return int(self.counts[22:].sum())
+    
+    def value_counts(self) -> Dict[int, int]:
+        """
+        獲取點數分布
+        
+        Returns:
+            點數到局數的映射字典（只包含出現過的點數，按點數排序）
+        """
+        values = np.flatnonzero(self.counts)
+        return {int(value): int(self.counts[value]) for value in values}
+    
+    def quantile(self, q: float) -> float:
+        """
+        計算最終點數的分位數，與 pandas 的線性插值結果相同
+        
+        Args:
+            q: 分位數 (0-1)
+        
+        Returns:
+            分位數值
+        """
+        cumulative = np.cumsum(self.counts)
+        if cumulative[-1] == 0:
+            return float('nan')
+        return self._quantiles(cumulative, (q,))[0]
+    
+    @staticmethod
+    def _quantiles(cumulative: np.ndarray, qs: Sequence[float]) -> List[float]:
+        """由累計計數一次查找多個分位數（排序後第 k 個值所在的點數，線性插值）"""
+        count = int(cumulative[-1])
+        positions = [(count - 1) * q for q in qs]
+        ranks = []
+        for position in positions:
+            lower = int(position)
+            ranks += [lower, min(lower + 1, count - 1)]
+        values = np.searchsorted(cumulative, ranks, side='right').tolist()
+        return [float(values[2 * i] + (position - int(position)) * (values[2 * i + 1] - values[2 * i]))
+                for i, position in enumerate(positions)]
+    
+    def statistics(self) -> Dict[str, Any]:
+        """
+        由計數陣列計算統計數據，鍵與 Analyzer.calculate_statistics 相同
+        
+        只處理 NUM_BINS 格的計數，成本與局數無關。中位數、四分位數、最小值和最大值
+        由累計計數精確得出；點數和與平方和以整數累加，標準差只在最後一步除法時取近似。
+        
+        Returns:
+            包含統計數據的字典
+        """
+        cumulative = np.cumsum(self.counts)
+        count = int(cumulative[-1])
+        if count == 0:
+            return {
+                'count': 0,
+                'bust_count': 0,
+                'bust_rate': 0.0,
+                'mean': 0.0,
+                'median': 0.0,
+                'std': 0.0,
+                'min': 0,
+                'max': 0,
+                'percentile_25': 0.0,
+                'percentile_75': 0.0,
+                'value_counts': {}
+            }
+        
+        total = int(self.counts @ _VALUES)
+        squares = int(self.counts @ _SQUARES)
+        # 樣本標準差 (ddof=1)，與 pandas 一致；離差平方和 = (n * Σx² - (Σx)²) / n 以整數精確計算
+        std = ((count * squares - total * total) / count / (count - 1)) ** 0.5 if count > 1 else float('nan')
+        bust_count = count - int(cumulative[21])
+        present = np.flatnonzero(self.counts)
+        percentile_25, median, percentile_75 = self._quantiles(cumulative, (0.25, 0.5, 0.75))
+        
+        return {
+            'count': count,
+            'bust_count': bust_count,
+            'bust_rate': bust_count / count,
+            'mean': total / count,
+            'median': median,
+            'std': std,
+            'min': int(present[0]),
+            'max': int(present[-1]),
+            'percentile_25': percentile_25,
+            'percentile_75': percentile_75,
+            'value_counts': dict(zip(present.tolist(), self.counts[present].tolist()))
+        }
+    
+    def half_widths(self, confidence: float = 0.95) -> Dict[str, float]:
+        """
+        計算爆牌率和平均點數的置信區間半寬
+        
+        爆牌率使用 Wilson 區間（爆牌率接近0或1、局數較少時仍然可靠），
+        平均點數使用正態近似 z * std / sqrt(n)。
+        
+        Args:
+            confidence: 置信水平 (0-1)
+        
+        Returns:
+            指標名稱到半寬的字典，局數不足時為 inf
+        """
+        return {metric: half_width for metric, (_, half_width) in self._intervals(confidence).items()}
+    
+    def confidence_interval(self, metric: str, confidence: float = 0.95) -> Tuple[float, float]:
+        """
+        計算指標的置信區間
+        
+        Args:
+            metric: 指標名稱 (bust_rate 或 mean)
+            confidence: 置信水平 (0-1)
+        
+        Returns:
+            (下界, 上界)，局數不足時為 (-inf, inf)
+        """
+        intervals = self._intervals(confidence)
+        if metric not in intervals:
+            raise ValueError(f"Unknown precision metric {metric}, expected one of {self.PRECISION_METRICS}")
+        center, half_width = intervals[metric]
+        return center - half_width, center + half_width
+    
+    def _intervals(self, confidence: float) -> Dict[str, Tuple[float, float]]:
+        """返回各指標置信區間的 (中心, 半寬)"""
+        if not 0 < confidence < 1:
+            raise ValueError(f"Confidence must be between 0 and 1, got {confidence}")
+        count = self.count
+        if count < 2:
+            return {metric: (0.0, float('inf')) for metric in self.PRECISION_METRICS}
+        
+        z = NormalDist().inv_cdf(0.5 + confidence / 2)
+        p = self.bust_count / count
+        shrink = 1 + z * z / count
+        bust_center = (p + z * z / (2 * count)) / shrink
+        bust_half_width = z / shrink * (p * (1 - p) / count + z * z / (4 * count * count)) ** 0.5
+        values = np.arange(self.NUM_BINS)
+        mean = float(self.counts @ values) / count
+        std = (float(self.counts @ (values - mean) ** 2) / (count - 1)) ** 0.5
+        return {'bust_rate': (bust_center, bust_half_width), 'mean': (mean, z * std / count ** 0.5)}
+    
+    def bootstrap(self, replicates: int = 2000, rng: Optional[np.random.Generator] = None) -> np.ndarray:
+        """
+        以多項分佈重抽樣點數計數
+        
+        每個重抽樣的計數陣列服從 Multinomial(n, counts / n)，與逐局有放回重抽樣 n 局的
+        點數計數分佈相同，但所有重抽樣由一次 NumPy 調用產生，成本只與重抽樣次數和
+        NUM_BINS 有關，與局數無關。
+        
+        Args:
+            replicates: 重抽樣次數
+            rng: 隨機數產生器，如為None則從系統熵建立
+        
+        Returns:
+            形狀為 (replicates, NUM_BINS) 的計數陣列
+        """
+        if replicates <= 0:
+            raise ValueError(f"Number of bootstrap replicates must be positive, got {replicates}")
+        count = self.count
+        if count == 0:
+            raise ValueError("Cannot bootstrap an empty aggregate")
+        rng = rng if rng is not None else np.random.default_rng()
+        return rng.multinomial(count, self.counts / count, size=replicates)
+    
+    @staticmethod
+    def batch_statistics(counts: np.ndarray) -> Dict[str, np.ndarray]:
+        """
+        由多組點數計數向量化計算 BOOTSTRAP_METRICS
+        
+        Args:
+            counts: 形狀為 (..., NUM_BINS) 的計數陣列，每組局數至少為2
+        
+        Returns:
+            指標名稱到形狀為 (...) 的陣列的字典，中位數與 quantile(0.5) 相同
+        """
+        cumulative = np.cumsum(counts, axis=-1)
+        count = cumulative[..., -1]
+        total = (counts @ _VALUES).astype(np.float64)
+        squares = (counts @ _SQUARES).astype(np.float64)
+        mean = total / count
+        # 排序後第 k 個值所在的點數 = 累計計數不超過 k 的格數
+        position = (count - 1) * 0.5
+        lower = np.floor(position).astype(np.int64)
+        upper = np.minimum(lower + 1, count - 1)
+        lower_value = (cumulative <= lower[..., None]).sum(axis=-1)
+        upper_value = (cumulative <= upper[..., None]).sum(axis=-1)
+        return {
+            'bust_rate': (count - cumulative[..., 21]) / count,
+            'mean': mean,
+            'median': lower_value + (position - lower) * (upper_value - lower_value),
+            'std': np.sqrt(np.maximum(squares - total * mean, 0.0) / (count - 1)),
+        }
+    
+    def bootstrap_intervals(self, confidence: float = 0.95, replicates: int = 2000,
+                            rng: Optional[np.random.Generator] = None) -> Dict[str, Tuple[float, float]]:
+        """
+        以自助法百分位數估計 BOOTSTRAP_METRICS 的置信區間
+        
+        Args:
+            confidence: 置信水平 (0-1)
+            replicates: 重抽樣次數
+            rng: 隨機數產生器，如為None則從系統熵建立
+        
+        Returns:
+            指標名稱到 (下界, 上界) 的字典，局數不足2時為 (nan, nan)
+        """
+        if not 0 < confidence < 1:
+            raise ValueError(f"Confidence must be between 0 and 1, got {confidence}")
+        if self.count < 2:
+            return {metric: (float('nan'), float('nan')) for metric in self.BOOTSTRAP_METRICS}
+        replicate_statistics = self.batch_statistics(self.bootstrap(replicates, rng))
+        tail = (1 - confidence) / 2
+        intervals = {}
+        for metric in self.BOOTSTRAP_METRICS:
+            low, high = np.quantile(replicate_statistics[metric], [tail, 1 - tail])
+            intervals[metric] = (float(low), float(high))
+        return intervals
+    
+    def games_needed(self, targets: Dict[str, float], confidence: float = 0.95) -> int:
+        """
+        估計達到目標置信區間半寬所需的總局數
+        
+        半寬與局數的平方根成反比，因此按目前的半寬外推；已達到目標時返回目前的局數。
+        
+        Args:
+            targets: 指標名稱 (bust_rate、mean) 到目標半寬的字典
+            confidence: 置信水平 (0-1)
+        
+        Returns:
+            估計的總局數
+        """
+        count = self.count
+        half_widths = self.half_widths(confidence)
+        needed = count
+        for metric, target in targets.items():
+            if metric not in half_widths:
+                raise ValueError(f"Unknown precision metric {metric}, expected one of {self.PRECISION_METRICS}")
+            if target <= 0:
+                raise ValueError(f"Target half-width for {metric} must be positive, got {target}")
+            if half_widths[metric] > target:
+                if count < 2:
+                    return count + 1
+                needed = max(needed, int(np.ceil(count * (half_widths[metric] / target) ** 2)))
+        return needed
+    
+    def __repr__(self) -> str:
+        return f"OutcomeAggregate(count={self.count}, bust_count={self.bust_count})"
+
+class JointAggregate(OutcomeAggregate, ABC):
+    """
+    按每局的一個條件欄分組的聚合計數
+    
+    以 (分組, 最終點數) 的聯合計數陣列 (NUM_ROWS × NUM_BINS) 記錄結果。聯合計數以
+    一次 np.bincount 對合併鍵 (行號 * NUM_BINS + 點數) 計數得出，每局的成本只是一次
+    計數器累加；各行相加即為 OutcomeAggregate 的點數計數，因此所有統計照常可用。
+    子類定義條件欄 (COLUMN)、行標籤 (LABELS)、行數 (NUM_ROWS) 和欄值到行號的映射 (rows)；
+    rows 為抽象方法，未實現它的子類在建立實例時即拋出 TypeError。
+    """
+    
+    # 對應 ResultBatch 的可選欄名
+    COLUMN = ''
+    LABELS: Tuple[str, ...] = ()
+    NUM_ROWS = 0
+    
+    def __init__(self, joint: Optional[Sequence[Sequence[int]]] = None):
+        """
+        初始化分組的聚合計數
+        
+        Args:
+            joint: 形狀為 (NUM_ROWS, NUM_BINS) 的聯合計數，如為None則從零開始
+        """
+        shape = (self.NUM_ROWS, self.NUM_BINS)
+        self.joint = np.zeros(shape, dtype=np.int64) if joint is None else np.array(joint, dtype=np.int64)
+        if self.joint.shape != shape:
+            raise ValueError(f"Joint counts must have shape {shape}, got {self.joint.shape}")
+        super().__init__(self.joint.sum(axis=0))
+    
+    @classmethod
+    @abstractmethod
+    def rows(cls, values: np.ndarray) -> np.ndarray:
+        """
+        將條件欄的值映射為行號
+        
+        Args:
+            values: 每局條件欄的值
+        
+        Returns:
+            每局的行號 (intp 陣列)
+        """
+    
+    @classmethod
+    def from_outcomes(cls, totals: np.ndarray, values: np.ndarray) -> 'JointAggregate':
+        """
+        由每局最終點數和條件欄陣列建立聚合計數
+        
+        Args:
+            totals: 每局莊家最終點數
+            values: 每局條件欄的值
+        
+        Returns:
+            分組的聚合計數
+        """
+        aggregate = cls()
+        aggregate.add(totals, values)
+        return aggregate
+    
+    def add(self, totals: np.ndarray, values: Optional[np.ndarray] = None) -> None:
+        """
+        累加一批最終點數及其條件欄
+        
+        Args:
+            totals: 每局莊家最終點數
+            values: 每局條件欄的值，長度與 totals 相同
+        """
+        if values is None:
+            raise ValueError(f"Column {self.COLUMN} is required to add outcomes to a {type(self).__name__}")
+        totals = np.asarray(totals, dtype=np.intp)
+        values = np.asarray(values)
+        if totals.shape != values.shape:
+            raise ValueError(f"Got {values.size} values of {self.COLUMN} for {totals.size} hand totals")
+        if totals.size and (totals.min() < 0 or totals.max() >= self.NUM_BINS):
+            raise ValueError(f"Hand totals must be in [0, {self.NUM_BINS}), got {totals.min()}..{totals.max()}")
+        keys = self.rows(values) * self.NUM_BINS + totals
+        delta = np.bincount(keys, minlength=self.joint.size).reshape(self.joint.shape)
+        self.joint += delta
+        self.counts += delta.sum(axis=0)
+    
+    def merge(self, other: OutcomeAggregate) -> 'JointAggregate':
+        """
+        將另一個同類的分組聚合計數合併到此聚合中
+        
+        Args:
+            other: 要合併的聚合計數（必須按同一欄分組）
+        
+        Returns:
+            合併後的此聚合（便於鏈式調用）
+        """
+        if type(other) is not type(self):
+            raise ValueError(f"Cannot merge {type(other).__name__} into {type(self).__name__}")
+        self.joint += other.joint
+        self.counts += other.counts
+        return self
+    
+    def __add__(self, other: OutcomeAggregate) -> OutcomeAggregate:
+        if type(other) is type(self):
+            return type(self)(self.joint + other.joint)
+        return OutcomeAggregate(self.counts + other.counts)
+    
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, JointAggregate):
+            return type(other) is type(self) and np.array_equal(self.joint, other.joint)
+        return super().__eq__(other)
+    
+    def copy(self) -> 'JointAggregate':
+        """返回聚合計數的副本"""
+        return type(self)(self.joint)
+    
+    def conditional(self) -> np.ndarray:
+        """
+        計算每個分組下最終點數的條件機率
+        
+        Returns:
+            形狀為 (NUM_ROWS, NUM_BINS) 的陣列，第 i 行為 P(點數 | 分組 i)，
+            沒有局數的分組為 NaN
+        """
+        row_counts = self.joint.sum(axis=1, keepdims=True)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return self.joint / row_counts
+    
+    def bust_rates(self) -> np.ndarray:
+        """
+        計算每個分組下的爆牌率
+        
+        Returns:
+            長度為 NUM_ROWS 的陣列，沒有局數的分組為 NaN
+        """
+        return self.conditional()[:, 22:].sum(axis=1)
+    
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}(count={self.count}, bust_count={self.bust_count})"
+
+class UpCardAggregate(JointAggregate):
+    """
+    按莊家明牌分組的聚合計數
+    
+    每張明牌一行，明牌 10、J、Q、K 合為一行。
+    """
+    
+    COLUMN = 'up_card'
+    LABELS = UP_CARD_LABELS
+    NUM_ROWS = len(UP_CARD_LABELS)
+    
+    @classmethod
+    def rows(cls, values: np.ndarray) -> np.ndarray:
+        """將明牌點數 (1-13) 映射為行號"""
+        values = np.asarray(values, dtype=np.intp)
+        if values.size and (values.min() < 1 or values.max() > 13):
+            raise ValueError(f"Up cards must be in [1, 13], got {values.min()}..{values.max()}")
+        return UP_CARD_ROWS[values]
+
+class PenetrationAggregate(JointAggregate):
+    """
+    按每局開始時牌靴剩餘比例分組的聚合計數
+    
+    剩餘比例 [0, 1] 等分為 NUM_ROWS 個區間，剛洗好的牌靴（剩餘比例為1）
+    歸入最後一個區間。條件欄為 ResultBatch 的 penetration（已發出的比例），
+    剩餘比例即 1 - penetration。
+    """
+    
+    COLUMN = 'penetration'
+    LABELS = PENETRATION_LABELS
+    NUM_ROWS = PENETRATION_BUCKETS
+    
+    @classmethod
+    def rows(cls, values: np.ndarray) -> np.ndarray:
+        """將已發出的比例映射為剩餘比例的區間號"""
+        values = np.asarray(values, dtype=np.float64)
+        if values.size and (values.min() < 0 or values.max() > 1):
+            raise ValueError(f"Penetration must be in [0, 1], got {values.min()}..{values.max()}")
+        return np.minimum(((1 - values) * cls.NUM_ROWS).astype(np.intp), cls.NUM_ROWS - 1)
+    
+    @classmethod
+    def bucket_edges(cls) -> np.ndarray:
+        """返回剩餘比例各區間的邊界（長度為 NUM_ROWS + 1）"""
+        return np.linspace(0, 1, cls.NUM_ROWS + 1)
+
+# 按條件欄名稱查找分組聚合的類型
+JOINT_AGGREGATES = {aggregate_type.COLUMN: aggregate_type for aggregate_type in (UpCardAggregate, PenetrationAggregate)}
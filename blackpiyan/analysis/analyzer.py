@@ -1,31 +1,71 @@
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple, Union
 import numpy as np
 import pandas as pd
 import logging
 
+from blackpiyan.analysis.aggregate import (JOINT_AGGREGATES, PENETRATION_LABELS, UP_CARD_LABELS, JointAggregate,
+                                           OutcomeAggregate, PenetrationAggregate, UpCardAggregate)
+from blackpiyan.analysis.result_batch import ResultBatch
+from blackpiyan.analysis.significance import distribution_test, pairwise_matrix, pairwise_tests
+
+# 置信區間指標在策略比較表中的欄名
+COMPARISON_COLUMNS = {'bust_rate': 'bust_rate', 'mean': 'mean_value', 'median': 'median_value', 'std': 'std_dev'}
+
 class Analyzer:
     """分析器類，用於分析21點模擬結果"""
     
-    def __init__(self, results: Optional[Dict[int, List[Dict[str, Any]]]] = None):
+    def __init__(self, results: Optional[Dict[int, Union[List[Dict[str, Any]], ResultBatch, OutcomeAggregate]]] = None):
         """
         初始化分析器
         
         Args:
-            results: 模擬結果字典，鍵為策略值，值為該策略的結果列表
+            results: 模擬結果字典，鍵為策略值，值為該策略的結果列表、列式結果批次 (ResultBatch)
+                或聚合計數 (OutcomeAggregate)
         """
         self.results = results if results is not None else {}
         self.strategies = list(self.results.keys()) if self.results else []
         
-        # 將結果轉換為DataFrame以便分析
+        # 每個策略都歸結為點數計數，統計只在計數上計算；結果列表另外保留DataFrame
         self.dataframes = {}
+        self.aggregates = {}
+        self.batches = {}
         if self.results:
             for strategy, strategy_results in self.results.items():
-                self.dataframes[strategy] = pd.DataFrame(strategy_results)
+                if isinstance(strategy_results, OutcomeAggregate):
+                    self.aggregates[strategy] = strategy_results
+                elif isinstance(strategy_results, ResultBatch):
+                    self.batches[strategy] = strategy_results
+                    self.aggregates[strategy] = self._aggregate_columns(strategy_results.totals,
+                                                                        strategy_results.columns())
+                else:
+                    df = pd.DataFrame(strategy_results)
+                    self.dataframes[strategy] = df
+                    self.aggregates[strategy] = (self._aggregate_columns(df['dealer_hand_value'].to_numpy(), df)
+                                                 if len(df) else OutcomeAggregate())
+    
+    @staticmethod
+    def _aggregate_columns(totals: np.ndarray, columns: Any) -> OutcomeAggregate:
+        """將點數計數為聚合；有明牌或滲透率欄時按該欄分組（明牌優先）"""
+        for column, aggregate_type in JOINT_AGGREGATES.items():
+            if columns.get(column) is not None:
+                return aggregate_type.from_outcomes(totals, np.asarray(columns[column]))
+        return OutcomeAggregate.from_totals(totals)
+    
+    def _joint_aggregate(self, strategy: int, aggregate_type: type) -> JointAggregate:
+        """返回策略按指定欄分組的聚合，沒有該欄的數據時拋出 ValueError"""
+        aggregate = self.aggregates.get(strategy)
+        if not isinstance(aggregate, aggregate_type):
+            raise ValueError(f"No {aggregate_type.COLUMN} data for strategy {strategy}; "
+                             f"enable simulation.record_{aggregate_type.COLUMN}")
+        return aggregate
     
     def calculate_statistics(self, strategy: Optional[int] = None) -> Dict[str, Any]:
         """
         計算特定策略的統計數據
         
+        統計由點數計數精確得出（見 OutcomeAggregate.statistics），成本與局數無關；
+        所有策略的合併統計將各策略的計數相加，而非拼接逐局結果。
+        
         Args:
             strategy: 要分析的策略，如不指定則計算所有策略的合併統計
             
@@ -34,60 +74,20 @@ class Analyzer:
         """
         if strategy is not None:
             # 分析單一策略
-            if strategy not in self.dataframes:
+            if strategy not in self.aggregates:
                 logging.warning(f"無結果找到（策略 {strategy}）")
                 # 返回默認值
-                return {
-                    'count': 0,
-                    'bust_count': 0,
-                    'bust_rate': 0.0,
-                    'mean': 0.0,
-                    'median': 0.0,
-                    'std': 0.0,
-                    'min': 0,
-                    'max': 0,
-                    'percentile_25': 0.0,
-                    'percentile_75': 0.0,
-                    'value_counts': {}
-                }
-            df = self.dataframes[strategy]
-        else:
-            # 分析所有策略
-            if not self.dataframes:
-                logging.warning("無結果數據可分析")
-                return {
-                    'count': 0,
-                    'bust_count': 0,
-                    'bust_rate': 0.0,
-                    'mean': 0.0,
-                    'median': 0.0,
-                    'std': 0.0,
-                    'min': 0,
-                    'max': 0,
-                    'percentile_25': 0.0,
-                    'percentile_75': 0.0,
-                    'value_counts': {}
-                }
-            df = pd.concat(list(self.dataframes.values()))
-        
-        # 計算統計數據
-        stats = {
-            'count': len(df),
-            'bust_count': df['is_dealer_busted'].sum(),
-            'bust_rate': df['is_dealer_busted'].mean(),
-            'mean': df['dealer_hand_value'].mean(),
-            'median': df['dealer_hand_value'].median(),
-            'std': df['dealer_hand_value'].std(),
-            'min': df['dealer_hand_value'].min(),
-            'max': df['dealer_hand_value'].max(),
-            # 百分位數
-            'percentile_25': df['dealer_hand_value'].quantile(0.25),
-            'percentile_75': df['dealer_hand_value'].quantile(0.75),
-            # 點數分布
-            'value_counts': df['dealer_hand_value'].value_counts().sort_index().to_dict()
-        }
-        
-        return stats
+                return OutcomeAggregate().statistics()
+            return self.aggregates[strategy].statistics()
+        
+        # 分析所有策略：合併所有策略的點數計數
+        if not self.aggregates:
+            logging.warning("無結果數據可分析")
+            return OutcomeAggregate().statistics()
+        merged = OutcomeAggregate()
+        for aggregate in self.aggregates.values():
+            merged.merge(aggregate)
+        return merged.statistics()
     
     def get_distribution(self, strategy: int) -> Dict[int, int]:
         """
@@ -99,12 +99,143 @@ class Analyzer:
         Returns:
             點數到局數的映射字典，若策略不存在則返回空字典
         """
-        if strategy not in self.dataframes:
+        if strategy not in self.aggregates:
             logging.warning(f"無結果找到（策略 {strategy}）")
             return {}
+        return self.aggregates[strategy].value_counts()
+    
+    def has_up_cards(self, strategy: int) -> bool:
+        """
+        策略的結果是否記錄了莊家明牌（simulation.record_up_card）
+        
+        Args:
+            strategy: 策略值
         
-        df = self.dataframes[strategy]
-        return df['dealer_hand_value'].value_counts().sort_index().to_dict()
+        Returns:
+            是否可以計算明牌條件表
+        """
+        return isinstance(self.aggregates.get(strategy), UpCardAggregate)
+    
+    def up_card_table(self, strategy: int, normalize: bool = True) -> pd.DataFrame:
+        """
+        獲取特定策略按莊家明牌分組的最終點數表
+        
+        表由 (明牌, 點數) 聯合計數得出（建立分析器時以一次 np.bincount 計數），
+        不對逐局結果分組。
+        
+        Args:
+            strategy: 要分析的策略
+            normalize: 為True時每行為該明牌下的條件機率 P(點數 | 明牌)，否則為局數
+        
+        Returns:
+            行為明牌 (A, 2-10)、欄為出現過的最終點數的 DataFrame
+        """
+        aggregate = self._joint_aggregate(strategy, UpCardAggregate)
+        present = np.flatnonzero(aggregate.counts)
+        values = aggregate.conditional() if normalize else aggregate.joint
+        return pd.DataFrame(values[:, present], index=pd.Index(UP_CARD_LABELS, name='up_card'),
+                            columns=pd.Index(present.tolist(), name='dealer_hand_value'))
+    
+    def up_card_bust_rates(self, strategy: int) -> pd.Series:
+        """
+        獲取特定策略在每張莊家明牌下的爆牌率
+        
+        Args:
+            strategy: 要分析的策略
+        
+        Returns:
+            以明牌 (A, 2-10) 為索引的爆牌率，沒有局數的明牌為 NaN
+        """
+        return pd.Series(self._joint_aggregate(strategy, UpCardAggregate).bust_rates(),
+                         index=pd.Index(UP_CARD_LABELS, name='up_card'), name='bust_rate')
+    
+    def has_penetration(self, strategy: int) -> bool:
+        """
+        策略的結果是否記錄了每局開始時的牌靴滲透率（simulation.record_penetration）
+        
+        Args:
+            strategy: 策略值
+        
+        Returns:
+            是否可以計算牌靴剩餘比例的條件表
+        """
+        return isinstance(self.aggregates.get(strategy), PenetrationAggregate)
+    
+    def penetration_table(self, strategy: int, normalize: bool = True) -> pd.DataFrame:
+        """
+        獲取特定策略按牌靴剩餘比例分組的最終點數表
+        
+        Args:
+            strategy: 要分析的策略
+            normalize: 為True時每行為該區間內的條件機率 P(點數 | 剩餘比例)，否則為局數
+        
+        Returns:
+            行為有局數的剩餘比例區間（由低到高，如 "40-45%"）、欄為出現過的最終點數的 DataFrame
+        """
+        aggregate = self._joint_aggregate(strategy, PenetrationAggregate)
+        rows = np.flatnonzero(aggregate.joint.sum(axis=1))
+        present = np.flatnonzero(aggregate.counts)
+        values = aggregate.conditional() if normalize else aggregate.joint
+        return pd.DataFrame(values[np.ix_(rows, present)],
+                            index=pd.Index([PENETRATION_LABELS[row] for row in rows], name='remaining'),
+                            columns=pd.Index(present.tolist(), name='dealer_hand_value'))
+    
+    def penetration_bust_rates(self, strategy: int, confidence: float = 0.95) -> pd.DataFrame:
+        """
+        獲取特定策略的爆牌率隨牌靴剩餘比例的變化
+        
+        Args:
+            strategy: 要分析的策略
+            confidence: 爆牌率 Wilson 置信區間的置信水平
+        
+        Returns:
+            每個有局數的剩餘比例區間一行（由低到高）的 DataFrame，欄為 remaining_low、
+            remaining_high、games、bust_rate、bust_rate_low 和 bust_rate_high
+        """
+        aggregate = self._joint_aggregate(strategy, PenetrationAggregate)
+        edges = PenetrationAggregate.bucket_edges()
+        present = np.flatnonzero(aggregate.joint.sum(axis=1))
+        rows = []
+        for row in present:
+            bucket = OutcomeAggregate(aggregate.joint[row])
+            low, high = bucket.confidence_interval('bust_rate', confidence)
+            rows.append({'remaining_low': edges[row], 'remaining_high': edges[row + 1], 'games': bucket.count,
+                         'bust_rate': bucket.bust_count / bucket.count,
+                         'bust_rate_low': max(0.0, low), 'bust_rate_high': min(1.0, high)})
+        index = pd.Index([PENETRATION_LABELS[row] for row in present], name='remaining')
+        return pd.DataFrame(rows, index=index,
+                            columns=['remaining_low', 'remaining_high', 'games', 'bust_rate',
+                                     'bust_rate_low', 'bust_rate_high'])
+    
+    def penetration_drift(self, strategy: int) -> Dict[str, float]:
+        """
+        檢定爆牌率是否隨牌靴剩餘比例變化
+        
+        斜率為以局數加權、爆牌率對區間中點的最小平方迴歸斜率（剩餘比例每減少 1 時
+        爆牌率的變化為其相反數）；是否變化以爆牌 × 區間的 2 × K 列聯表卡方檢定。
+        
+        Args:
+            strategy: 要分析的策略
+        
+        Returns:
+            包含 slope、statistic 和 p_value 的字典
+        """
+        aggregate = self._joint_aggregate(strategy, PenetrationAggregate)
+        games = aggregate.joint.sum(axis=1)
+        busts = aggregate.joint[:, 22:].sum(axis=1)
+        edges = PenetrationAggregate.bucket_edges()
+        midpoints = (edges[:-1] + edges[1:]) / 2
+        slope = float('nan')
+        if games.sum():
+            x_mean = midpoints @ games / games.sum()
+            spread = games @ (midpoints - x_mean) ** 2
+            if spread > 0:
+                slope = float(((midpoints - x_mean) * games) @ (busts / np.maximum(games, 1)) / spread)
+        if 0 < busts.sum() < games.sum():
+            statistic, p_value = distribution_test(busts, games - busts)
+        else:
+            statistic, p_value = 0.0, 1.0
+        return {'slope': slope, 'statistic': statistic, 'p_value': p_value}
     
     def get_all_distributions(self) -> Dict[int, Dict[int, int]]:
         """
@@ -118,27 +249,92 @@ class Analyzer:
             distributions[strategy] = self.get_distribution(strategy)
         return distributions
     
-    def compare_strategies(self) -> pd.DataFrame:
+    def confidence_intervals(self, strategy: Optional[int] = None, confidence: float = 0.95,
+                             replicates: int = 2000, seed: Optional[int] = None) -> Dict[str, Tuple[float, float]]:
+        """
+        以自助法估計爆牌率、平均點數、中位數和標準差的置信區間
+        
+        重抽樣為點數計數的多項分佈抽樣（見 OutcomeAggregate.bootstrap），成本與局數無關。
+        
+        Args:
+            strategy: 要分析的策略，如不指定則使用所有策略合併的點數計數
+            confidence: 置信水平 (0-1)
+            replicates: 重抽樣次數
+            seed: 重抽樣的隨機種子，如為None則從系統熵取得
+        
+        Returns:
+            指標名稱 (bust_rate、mean、median、std) 到 (下界, 上界) 的字典
+        """
+        if strategy is None:
+            aggregate = OutcomeAggregate()
+            for strategy_aggregate in self.aggregates.values():
+                aggregate.merge(strategy_aggregate)
+        else:
+            aggregate = self.aggregates.get(strategy, OutcomeAggregate())
+        return aggregate.bootstrap_intervals(confidence, replicates, np.random.default_rng(seed))
+    
+    def pairwise_tests(self, method: str = 'chi2', alpha: float = 0.05) -> pd.DataFrame:
+        """
+        檢定每一對策略的爆牌率和點數分佈是否不同
+        
+        只使用點數計數：爆牌率以雙比例 z 檢定（期望次數不足5時為 Fisher 精確檢定），
+        點數分佈以卡方檢定或 G 檢定，每個指標的所有配對以 Holm 方法校正。
+        
+        Args:
+            method: 點數分佈的檢定方法 (chi2 或 g)
+            alpha: 校正後的顯著水平
+        
+        Returns:
+            每對策略每個指標一行的DataFrame（見 significance.pairwise_tests）
+        """
+        return pairwise_tests(self.aggregates, method, alpha)
+    
+    def compare_strategies(self, confidence: Optional[float] = None, replicates: int = 2000,
+                           seed: Optional[int] = None, pairwise: bool = False, method: str = 'chi2',
+                           alpha: float = 0.05) -> Union[pd.DataFrame, Tuple[pd.DataFrame, Dict[str, pd.DataFrame]]]:
         """
         比較不同策略的關鍵指標
         
+        Args:
+            confidence: 置信水平 (0-1)，設置時每個指標增加 _low 和 _high 欄（自助法置信區間）
+            replicates: 每個策略的重抽樣次數
+            seed: 重抽樣的隨機種子，如為None則從系統熵取得
+            pairwise: 是否同時返回成對顯著性檢定的矩陣
+            method: 成對檢定中點數分佈的檢定方法 (chi2 或 g)
+            alpha: 成對檢定校正後的顯著水平
+        
         Returns:
-            包含各策略關鍵指標的DataFrame
+            包含各策略關鍵指標的DataFrame；pairwise 為True時返回 (DataFrame, 矩陣字典)，
+            矩陣字典以 bust_rate 和 distribution 為鍵，值為校正後 p 值的策略 × 策略矩陣
         """
+        if pairwise:
+            tests = self.pairwise_tests(method, alpha)
+            matrices = {metric: pairwise_matrix(tests, metric, self.strategies)
+                        for metric in ('bust_rate', 'distribution')}
+            return self.compare_strategies(confidence, replicates, seed), matrices
+        
         if not self.strategies:
             logging.warning("沒有策略可比較")
             return pd.DataFrame()
-            
+        
+        rng = np.random.default_rng(seed)
         comparison = []
         for strategy in self.strategies:
             stats = self.calculate_statistics(strategy)
-            comparison.append({
+            row = {
                 'strategy': strategy,
                 'sample_size': stats['count'],
                 'bust_rate': stats['bust_rate'],
                 'mean_value': stats['mean'],
                 'median_value': stats['median'],
                 'std_dev': stats['std']
-            })
+            }
+            if confidence is not None:
+                aggregate = self.aggregates.get(strategy, OutcomeAggregate())
+                intervals = aggregate.bootstrap_intervals(confidence, replicates, rng)
+                for metric, (low, high) in intervals.items():
+                    row[f'{COMPARISON_COLUMNS[metric]}_low'] = low
+                    row[f'{COMPARISON_COLUMNS[metric]}_high'] = high
+            comparison.append(row)
         
         return pd.DataFrame(comparison) 
\ No newline at end of file
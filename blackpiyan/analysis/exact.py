@@ -0,0 +1,141 @@
+from typing import Dict, List, Optional, Sequence, Tuple
+from functools import lru_cache
+
+import numpy as np
+
+from blackpiyan.analysis.aggregate import OutcomeAggregate
+
+class ExactCalculator:
+    """
+    有限牌靴下莊家最終點數的精確機率計算器
+    
+    從牌靴組成出發，對每種可能的補牌依剩餘牌數的機率遞迴展開，直到莊家按
+    補牌策略停牌。遞迴以 (已抽出的牌, 硬點數, 是否有 Ace) 記憶化，相同的
+    抽牌組合只計算一次，因此 1-8 副牌的任一策略都能在數十毫秒內算出。
+    規則與 Dealer.play_hand 一致：Ace 在不爆牌時計為 11 點，點數達到
+    hit_until_value 即停牌（軟點數同樣停牌）。
+    """
+    
+    def __init__(self, num_decks: int = 6):
+        """
+        初始化精確計算器
+        
+        Args:
+            num_decks: 完整牌靴的牌副數量，未指定牌靴組成時使用
+        """
+        if num_decks <= 0:
+            raise ValueError(f"Number of decks must be positive, got {num_decks}")
+        self.num_decks = num_decks
+        self._cache: Dict[Tuple[Tuple[int, ...], int], np.ndarray] = {}
+    
+    def get_probabilities(self, hit_until_value: int, counts: Optional[Sequence[int]] = None) -> np.ndarray:
+        """
+        計算莊家最終點數的機率陣列
+        
+        Args:
+            hit_until_value: 莊家補牌策略，當點數小於此值時補牌
+            counts: 剩餘牌靴組成，長度13（A-K 各點數的張數）或長度10
+                （牌值 1-10 的張數，10 包含 J/Q/K），如為None則使用完整牌靴
+        
+        Returns:
+            長度為 OutcomeAggregate.NUM_BINS 的陣列，索引為最終點數
+        """
+        if hit_until_value < 12 or hit_until_value > 21:
+            raise ValueError(f"Hit until value should be between 12 and 21, got {hit_until_value}")
+        composition = self._composition(counts)
+        
+        key = (composition, hit_until_value)
+        if key not in self._cache:
+            self._cache[key] = self._solve(composition, hit_until_value)
+        return self._cache[key].copy()
+    
+    def get_distribution(self, hit_until_value: int, counts: Optional[Sequence[int]] = None) -> Dict[int, float]:
+        """
+        獲取莊家最終點數的機率分布，格式與 Analyzer.get_distribution 相同
+        
+        Args:
+            hit_until_value: 莊家補牌策略
+            counts: 剩餘牌靴組成，格式見 get_probabilities
+        
+        Returns:
+            點數到機率的映射字典（只包含可能出現的點數，按點數排序）
+        """
+        probabilities = self.get_probabilities(hit_until_value, counts)
+        return {int(total): float(probabilities[total]) for total in np.flatnonzero(probabilities)}
+    
+    def get_all_distributions(self, strategies: List[int],
+                              counts: Optional[Sequence[int]] = None) -> Dict[int, Dict[int, float]]:
+        """
+        獲取多個策略的點數機率分布
+        
+        Args:
+            strategies: 補牌策略列表
+            counts: 剩餘牌靴組成，格式見 get_probabilities
+        
+        Returns:
+            策略到點數機率分布的嵌套字典
+        """
+        return {strategy: self.get_distribution(strategy, counts) for strategy in strategies}
+    
+    def get_bust_probability(self, hit_until_value: int, counts: Optional[Sequence[int]] = None) -> float:
+        """
+        計算莊家爆牌機率
+        
+        Args:
+            hit_until_value: 莊家補牌策略
+            counts: 剩餘牌靴組成，格式見 get_probabilities
+        
+        Returns:
+            爆牌機率
+        """
+        return float(self.get_probabilities(hit_until_value, counts)[22:].sum())
+    
+    def _composition(self, counts: Optional[Sequence[int]]) -> Tuple[int, ...]:
+        """將牌靴組成轉換為牌值 1-10 的張數元組"""
+        if counts is None:
+            return (4 * self.num_decks,) * 9 + (16 * self.num_decks,)
+        
+        counts = [int(count) for count in counts]
+        if len(counts) == 13:
+            # J/Q/K 與 10 同為10點
+            counts = counts[:9] + [sum(counts[9:])]
+        elif len(counts) != 10:
+            raise ValueError(f"Counts must have 13 ranks or 10 values, got {len(counts)}")
+        if min(counts) < 0:
+            raise ValueError(f"Counts must not be negative, got {counts}")
+        return tuple(counts)
+    
+    @staticmethod
+    def _solve(composition: Tuple[int, ...], hit_until_value: int) -> np.ndarray:
+        """以記憶化遞迴計算指定牌靴組成與策略的最終點數機率"""
+        # 只記錄可能的最終點數 [hit_until_value, 30]
+        width = OutcomeAggregate.NUM_BINS - hit_until_value
+        
+        @lru_cache(maxsize=None)
+        def outcome(removed: Tuple[int, ...], hard: int, has_ace: bool) -> Tuple[float, ...]:
+            total = hard + 10 if has_ace and hard <= 11 else hard
+            if total >= hit_until_value:
+                result = [0.0] * width
+                result[total - hit_until_value] = 1.0
+                return tuple(result)
+            
+            remaining = [count - used for count, used in zip(composition, removed)]
+            cards_left = sum(remaining)
+            if cards_left == 0:
+                raise ValueError(f"Composition {composition} runs out of cards before the dealer stands")
+            
+            result = [0.0] * width
+            for index, count in enumerate(remaining):
+                if not count:
+                    continue
+                p = count / cards_left
+                next_removed = removed[:index] + (removed[index] + 1,) + removed[index + 1:]
+                child = outcome(next_removed, hard + index + 1, has_ace or index == 0)
+                for offset, child_p in enumerate(child):
+                    if child_p:
+                        result[offset] += p * child_p
+            return tuple(result)
+        
+        probabilities = np.zeros(OutcomeAggregate.NUM_BINS)
+        probabilities[hit_until_value:] = outcome((0,) * len(composition), 0, False)
+        return probabilities
@@ -0,0 +1,51 @@
+from typing import Dict, Any, List, Optional, Union
+import numpy as np
+
+from blackpiyan.analysis.aggregate import JointAggregate, OutcomeAggregate
+from blackpiyan.analysis.analyzer import Analyzer
+
+# 一批結果可以是結果列表、每局點數陣列或聚合計數
+Batch = Union[List[Dict[str, Any]], np.ndarray, OutcomeAggregate]
+
+class IncrementalAnalyzer(Analyzer):
+    """
+    增量分析器，逐批累加模擬結果
+    
+    每個策略維護一個點數計數，所有統計數據（平均值、標準差、中位數和百分位數）
+    都由計數精確得出。update 的成本只與該批大小有關，calculate_statistics 和
+    compare_strategies 的成本只與不同點數的數量有關，與累計局數無關。
+    """
+    
+    def __init__(self, results: Optional[Dict[int, Batch]] = None):
+        """
+        初始化增量分析器
+        
+        Args:
+            results: 初始結果字典，鍵為策略值，值為一批結果
+        """
+        super().__init__()
+        self.results = self.aggregates
+        if results:
+            for strategy, batch in results.items():
+                self.update(strategy, batch)
+    
+    def update(self, strategy: int, batch: Batch) -> None:
+        """
+        將一批結果併入指定策略的統計
+        
+        Args:
+            strategy: 策略值
+            batch: 結果列表、每局點數陣列或聚合計數
+        """
+        if isinstance(batch, OutcomeAggregate):
+            delta = batch
+        elif isinstance(batch, np.ndarray):
+            delta = OutcomeAggregate.from_totals(batch)
+        else:
+            delta = OutcomeAggregate.from_results(batch)
+        
+        if strategy not in self.aggregates:
+            self.strategies.append(strategy)
+            # 第一批記錄了明牌或滲透率時保留按該欄分組的計數
+            self.aggregates[strategy] = type(delta)() if isinstance(delta, JointAggregate) else OutcomeAggregate()
+        self.aggregates[strategy].merge(delta)
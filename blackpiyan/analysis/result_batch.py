@@ -0,0 +1,159 @@
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+class ResultBatch:
+    """
+    單一策略模擬結果的列式批次
+    
+    每一欄為一個 NumPy 陣列：最終點數 (int8) 和是否爆牌 (bool)，以及可選的
+    莊家明牌點數 (int8) 和開局時的牌靴滲透率 (float32)。
+    每局約 2 位元組，而每局一個字典的結果列表約 400 位元組以上。
+    
+    為了與原本的結果列表相容，ResultBatch 也是一個只讀序列：len()、索引、
+    迭代都返回與 Simulator 舊版結果相同格式的字典（按需建立），連續切片返回
+    共用陣列的 ResultBatch 視圖而不複製資料。
+    """
+    
+    OPTIONAL_COLUMNS = ('up_card', 'penetration')
+    
+    def __init__(self, strategy: int, totals: np.ndarray, busted: Optional[np.ndarray] = None,
+                 up_card: Optional[np.ndarray] = None, penetration: Optional[np.ndarray] = None,
+                 first_game_id: int = 1):
+        """
+        初始化結果批次（不複製已是正確類型的陣列）
+        
+        Args:
+            strategy: 莊家補牌策略值
+            totals: 每局莊家最終點數
+            busted: 每局莊家是否爆牌，如為None則由 totals > 21 計算
+            up_card: 每局莊家第一張牌的點數 (1-13)
+            penetration: 每局開始時牌靴已發出的比例
+            first_game_id: 第一局的局序號
+        """
+        self.strategy = strategy
+        self.totals = np.asarray(totals, dtype=np.int8)
+        self.busted = self.totals > 21 if busted is None else np.asarray(busted, dtype=bool)
+        self.up_card = None if up_card is None else np.asarray(up_card, dtype=np.int8)
+        self.penetration = None if penetration is None else np.asarray(penetration, dtype=np.float32)
+        self.first_game_id = first_game_id
+        
+        for name, column in self.columns().items():
+            if len(column) != len(self.totals):
+                raise ValueError(f"Column {name} has {len(column)} rows, expected {len(self.totals)}")
+    
+    @classmethod
+    def from_records(cls, records: List[Dict[str, Any]], strategy: Optional[int] = None) -> 'ResultBatch':
+        """
+        由每局一個字典的結果列表建立結果批次
+        
+        Args:
+            records: 遊戲結果列表
+            strategy: 策略值，如為None則讀取第一筆結果的 strategy
+        
+        Returns:
+            結果批次
+        """
+        if strategy is None:
+            strategy = records[0]['strategy'] if records else 0
+        first_game_id = records[0].get('game_id', 1) if records else 1
+        totals = np.fromiter((r['dealer_hand_value'] for r in records), dtype=np.int8, count=len(records))
+        return cls(strategy, totals, first_game_id=first_game_id)
+    
+    @classmethod
+    def concatenate(cls, batches: Sequence['ResultBatch']) -> 'ResultBatch':
+        """
+        按順序拼接同一策略的多個批次（可選欄需在所有批次中都存在才保留）
+        
+        Args:
+            batches: 結果批次列表
+        
+        Returns:
+            拼接後的結果批次，局序號從第一個批次開始連續編號
+        """
+        if not batches:
+            raise ValueError("Cannot concatenate an empty list of batches")
+        optional = {
+            name: np.concatenate([getattr(batch, name) for batch in batches])
+            for name in cls.OPTIONAL_COLUMNS
+            if all(getattr(batch, name) is not None for batch in batches)
+        }
+        return cls(batches[0].strategy,
+                   np.concatenate([batch.totals for batch in batches]),
+                   np.concatenate([batch.busted for batch in batches]),
+                   first_game_id=batches[0].first_game_id, **optional)
+    
+    def columns(self) -> Dict[str, np.ndarray]:
+        """返回所有存在的欄，鍵與結果字典相同"""
+        columns = {'dealer_hand_value': self.totals, 'is_dealer_busted': self.busted}
+        for name in self.OPTIONAL_COLUMNS:
+            column = getattr(self, name)
+            if column is not None:
+                columns[name] = column
+        return columns
+    
+    def to_dataframe(self) -> pd.DataFrame:
+        """
+        轉換為 DataFrame（按欄建立，不逐行轉換）
+        
+        Returns:
+            包含 strategy、game_id 和所有存在的欄的 DataFrame
+        """
+        data = {
+            'strategy': np.full(len(self), self.strategy, dtype=np.int8),
+            'game_id': np.arange(self.first_game_id, self.first_game_id + len(self)),
+        }
+        data.update(self.columns())
+        return pd.DataFrame(data)
+    
+    @property
+    def nbytes(self) -> int:
+        """所有欄佔用的位元組數"""
+        return sum(column.nbytes for column in self.columns().values())
+    
+    def __len__(self) -> int:
+        """返回局數"""
+        return len(self.totals)
+    
+    def __getitem__(self, index: Union[int, slice]) -> Union[Dict[str, Any], 'ResultBatch']:
+        """
+        返回一局的結果字典，或連續切片的批次視圖
+        
+        Args:
+            index: 局索引（從0開始，支援負數）或步長為1的切片
+        
+        Returns:
+            結果字典或結果批次
+        """
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                raise ValueError(f"ResultBatch only supports contiguous slices, got step {step}")
+            stop = max(start, stop)
+            optional = {
+                name: getattr(self, name)[start:stop]
+                for name in self.OPTIONAL_COLUMNS if getattr(self, name) is not None
+            }
+            return ResultBatch(self.strategy, self.totals[start:stop], self.busted[start:stop],
+                               first_game_id=self.first_game_id + start, **optional)
+        
+        position = range(len(self))[index]
+        record = {
+            'strategy': self.strategy,
+            'game_id': self.first_game_id + position,
+        }
+        record.update({name: column[position].item() for name, column in self.columns().items()})
+        return record
+    
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        """按順序迭代每局的結果字典"""
+        columns = self.columns()
+        names = list(columns)
+        for offset, values in enumerate(zip(*(column.tolist() for column in columns.values()))):
+            record = {'strategy': self.strategy, 'game_id': self.first_game_id + offset}
+            record.update(zip(names, values))
+            yield record
+    
+    def __repr__(self) -> str:
+        return f"ResultBatch(strategy={self.strategy}, games={len(self)}, columns={list(self.columns())})"
@@ -0,0 +1,233 @@
+"""
+策略間的成對顯著性檢定，只使用點數計數，成本與局數無關
+
+爆牌率以雙比例 z 檢定比較（期望次數不足時改用 Fisher 精確檢定），
+完整點數分佈以 2 × K 列聯表的卡方檢定或 G 檢定比較，並以 Holm 方法校正多重比較。
+"""
+
+from itertools import combinations
+from math import exp, lgamma, log
+from statistics import NormalDist
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from blackpiyan.analysis.aggregate import OutcomeAggregate
+
+# 2 × 2 列聯表的最小期望次數低於此值時以 Fisher 精確檢定代替 z 檢定
+MIN_EXPECTED = 5
+
+# 點數分佈的檢定方法
+DISTRIBUTION_TESTS = ('chi2', 'g')
+
+PAIRWISE_COLUMNS = ['strategy_a', 'strategy_b', 'metric', 'test', 'statistic', 'p_value', 'p_adjusted', 'significant']
+
+def chi2_sf(statistic: float, dof: int) -> float:
+    """
+    卡方分佈的右尾機率 P(X >= statistic)
+    
+    即正則化上不完全伽瑪函數 Q(dof / 2, statistic / 2)：statistic 較小時以級數計算 P 再取 1 - P，
+    否則以連分式 (Lentz 方法) 直接計算 Q，兩者在各自範圍內都能快速收斂。
+    
+    Args:
+        statistic: 檢定統計量
+        dof: 自由度
+    
+    Returns:
+        右尾機率
+    """
+    if dof <= 0:
+        raise ValueError(f"Degrees of freedom must be positive, got {dof}")
+    if statistic <= 0:
+        return 1.0
+    a, x = dof / 2, statistic / 2
+    prefix = a * log(x) - x - lgamma(a)
+    if x < a + 1:
+        term = total = 1 / a
+        denominator = a
+        while abs(term) > abs(total) * 1e-15:
+            denominator += 1
+            term *= x / denominator
+            total += term
+        return max(0.0, 1 - total * exp(prefix))
+    tiny = 1e-300
+    b = x + 1 - a
+    c = 1 / tiny
+    d = 1 / b
+    fraction = d
+    for i in range(1, 10000):
+        an = -i * (i - a)
+        b += 2
+        d = an * d + b
+        d = tiny if abs(d) < tiny else d
+        c = b + an / c
+        c = tiny if abs(c) < tiny else c
+        d = 1 / d
+        step = d * c
+        fraction *= step
+        if abs(step - 1) < 1e-15:
+            break
+    return exp(prefix) * fraction
+
+def two_proportion_z_test(successes_a: int, count_a: int, successes_b: int, count_b: int) -> Tuple[float, float]:
+    """
+    雙比例 z 檢定（合併比例的標準誤）
+    
+    Args:
+        successes_a: 策略 A 的爆牌局數
+        count_a: 策略 A 的總局數
+        successes_b: 策略 B 的爆牌局數
+        count_b: 策略 B 的總局數
+    
+    Returns:
+        (z 統計量, 雙尾 p 值)
+    """
+    pooled = (successes_a + successes_b) / (count_a + count_b)
+    variance = pooled * (1 - pooled) * (1 / count_a + 1 / count_b)
+    if variance == 0:
+        return 0.0, 1.0
+    z = (successes_a / count_a - successes_b / count_b) / variance ** 0.5
+    return z, min(1.0, 2 * NormalDist().cdf(-abs(z)))
+
+def fisher_exact(successes_a: int, count_a: int, successes_b: int, count_b: int) -> Tuple[float, float]:
+    """
+    2 × 2 列聯表的 Fisher 精確檢定
+    
+    固定邊際總和時策略 A 的爆牌局數服從超幾何分佈；機率不超過觀察值的所有表的
+    機率和即雙尾 p 值。相鄰兩項的機率比為有理式，因此整個分佈以一次累加得出。
+    
+    Args:
+        successes_a: 策略 A 的爆牌局數
+        count_a: 策略 A 的總局數
+        successes_b: 策略 B 的爆牌局數
+        count_b: 策略 B 的總局數
+    
+    Returns:
+        (樣本勝算比, 雙尾 p 值)
+    """
+    total = count_a + count_b
+    successes = successes_a + successes_b
+    low, high = max(0, count_a - (total - successes)), min(successes, count_a)
+    x = np.arange(low, high, dtype=np.float64)
+    log_ratios = np.log((successes - x) * (count_a - x)) - np.log((x + 1) * (total - successes - count_a + x + 1))
+    log_first = (lgamma(successes + 1) - lgamma(low + 1) - lgamma(successes - low + 1)
+                 + lgamma(total - successes + 1) - lgamma(count_a - low + 1) - lgamma(total - successes - count_a + low + 1)
+                 - lgamma(total + 1) + lgamma(count_a + 1) + lgamma(count_b + 1))
+    probabilities = np.exp(log_first + np.concatenate(([0.0], np.cumsum(log_ratios))))
+    observed = probabilities[successes_a - low]
+    p_value = float(probabilities[probabilities <= observed * (1 + 1e-7)].sum())
+    
+    failures_a, failures_b = count_a - successes_a, count_b - successes_b
+    if successes_b * failures_a == 0:
+        odds_ratio = float('nan') if successes_a * failures_b == 0 else float('inf')
+    else:
+        odds_ratio = successes_a * failures_b / (successes_b * failures_a)
+    return odds_ratio, min(1.0, p_value)
+
+def distribution_test(counts_a: Sequence[int], counts_b: Sequence[int], method: str = 'chi2') -> Tuple[float, float]:
+    """
+    比較兩個點數分佈的 2 × K 列聯表檢定
+    
+    Args:
+        counts_a: 策略 A 的點數計數
+        counts_b: 策略 B 的點數計數
+        method: chi2（Pearson 卡方檢定）或 g（對數似然比 G 檢定）
+    
+    Returns:
+        (檢定統計量, p 值)，兩個分佈只有一個點數時為 (0, 1)
+    """
+    if method not in DISTRIBUTION_TESTS:
+        raise ValueError(f"Unknown distribution test {method}, expected one of {DISTRIBUTION_TESTS}")
+    table = np.array([counts_a, counts_b], dtype=np.float64)
+    table = table[:, table.sum(axis=0) > 0]
+    if table.shape[1] < 2:
+        return 0.0, 1.0
+    expected = table.sum(axis=1, keepdims=True) * table.sum(axis=0) / table.sum()
+    if method == 'chi2':
+        statistic = float(((table - expected) ** 2 / expected).sum())
+    else:
+        observed = table > 0
+        statistic = float(2 * (table[observed] * np.log(table[observed] / expected[observed])).sum())
+    return statistic, chi2_sf(statistic, table.shape[1] - 1)
+
+def holm_adjust(p_values: Sequence[float]) -> List[float]:
+    """
+    Holm 逐步校正多重比較的 p 值（控制族系錯誤率）
+    
+    Args:
+        p_values: 原始 p 值
+    
+    Returns:
+        與輸入順序相同的校正後 p 值
+    """
+    order = sorted(range(len(p_values)), key=lambda i: p_values[i])
+    adjusted = [0.0] * len(p_values)
+    running = 0.0
+    for rank, index in enumerate(order):
+        running = max(running, min(1.0, (len(p_values) - rank) * p_values[index]))
+        adjusted[index] = running
+    return adjusted
+
+def pairwise_tests(aggregates: Dict[int, OutcomeAggregate], method: str = 'chi2',
+                   alpha: float = 0.05) -> pd.DataFrame:
+    """
+    對每一對策略檢定爆牌率和點數分佈是否不同
+    
+    Args:
+        aggregates: 策略到聚合計數的字典（局數為0的策略不參與比較）
+        method: 點數分佈的檢定方法 (chi2 或 g)
+        alpha: 校正後的顯著水平
+    
+    Returns:
+        每對策略每個指標一行的 DataFrame (PAIRWISE_COLUMNS)，
+        同一指標的 p 值以 Holm 方法校正
+    """
+    if not 0 < alpha < 1:
+        raise ValueError(f"Significance level must be between 0 and 1, got {alpha}")
+    strategies = [strategy for strategy, aggregate in aggregates.items() if aggregate.count > 0]
+    rows = []
+    for metric in ('bust_rate', 'distribution'):
+        family = []
+        for a, b in combinations(strategies, 2):
+            first, second = aggregates[a], aggregates[b]
+            if metric == 'bust_rate':
+                table = (first.bust_count, first.count, second.bust_count, second.count)
+                busts, total = first.bust_count + second.bust_count, first.count + second.count
+                smallest_expected = min(busts, total - busts) * min(first.count, second.count) / total
+                if smallest_expected < MIN_EXPECTED:
+                    test = 'fisher'
+                    statistic, p_value = fisher_exact(*table)
+                else:
+                    test = 'z'
+                    statistic, p_value = two_proportion_z_test(*table)
+            else:
+                test = method
+                statistic, p_value = distribution_test(first.counts, second.counts, method)
+            family.append({'strategy_a': a, 'strategy_b': b, 'metric': metric, 'test': test,
+                           'statistic': statistic, 'p_value': p_value})
+        for row, adjusted in zip(family, holm_adjust([row['p_value'] for row in family])):
+            row['p_adjusted'] = adjusted
+            row['significant'] = adjusted < alpha
+        rows.extend(family)
+    return pd.DataFrame(rows, columns=PAIRWISE_COLUMNS)
+
+def pairwise_matrix(tests: pd.DataFrame, metric: str, strategies: Optional[Sequence[int]] = None) -> pd.DataFrame:
+    """
+    將 pairwise_tests 的結果整理為校正後 p 值的對稱矩陣
+    
+    Args:
+        tests: pairwise_tests 返回的 DataFrame
+        metric: bust_rate 或 distribution
+        strategies: 矩陣的行列順序，如為None則使用結果中出現的策略
+    
+    Returns:
+        行列皆為策略的 DataFrame，對角線為 NaN
+    """
+    selected = tests[tests['metric'] == metric]
+    if strategies is None:
+        strategies = sorted(set(selected['strategy_a']) | set(selected['strategy_b']))
+    matrix = pd.DataFrame(np.nan, index=list(strategies), columns=list(strategies))
+    for a, b, adjusted in zip(selected['strategy_a'], selected['strategy_b'], selected['p_adjusted']):
+        matrix.loc[a, b] = matrix.loc[b, a] = adjusted
+    return matrix
@@ -1,25 +1,32 @@
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
+
+import numpy as np
 
 from blackpiyan.model.card import Card
 from blackpiyan.model.deck import Deck
+from blackpiyan.model.shoe_library import ShoeLibrary
 from blackpiyan.model.dealer import Dealer
 
 class BlackjackGame:
     """21點遊戲類，實現遊戲邏輯"""
     
-    def __init__(self, config: Dict[str, Any]):
+    def __init__(self, config: Dict[str, Any], rng: Optional[np.random.Generator] = None,
+                 shoe_library: Optional[ShoeLibrary] = None):
         """
         初始化21點遊戲
         
         Args:
             config: 遊戲配置
+            rng: 洗牌使用的隨機數產生器，如為None則由牌組自行建立
+            shoe_library: 依序提供牌靴的牌靴庫，如為None則隨機洗牌
         """
         self.config = config
         num_decks = config.get('game', {}).get('decks', 6)
         reshuffle_threshold = config.get('game', {}).get('reshuffle_threshold', 0.4)
         dealer_hit_until = config.get('dealer', {}).get('hit_until_value', 17)
+        background_shuffle = config.get('simulation', {}).get('background_shuffle', False)
         
-        self.deck = Deck(num_decks=num_decks)
+        self.deck = Deck(num_decks=num_decks, rng=rng, background=background_shuffle, shoe_source=shoe_library)
         self.dealer = Dealer(hit_until_value=dealer_hit_until)
         self.reshuffle_threshold = reshuffle_threshold
     
@@ -32,9 +39,11 @@ class BlackjackGame:
             - dealer_hand: 莊家的手牌
             - dealer_hand_value: 莊家的手牌點數
             - is_dealer_busted: 莊家是否爆牌
+            - penetration: 本局開始時牌靴已發出的比例
         """
         # 檢查是否需要洗牌
         self.deck.auto_shuffle_if_needed(self.reshuffle_threshold)
+        penetration = 1 - self.deck.get_remaining_percentage()
         
         # 莊家玩牌
         dealer_hand, dealer_hand_value = self.dealer.play_hand(self.deck)
@@ -44,7 +53,8 @@ class BlackjackGame:
         return {
             'dealer_hand': dealer_hand,
             'dealer_hand_value': dealer_hand_value,
-            'is_dealer_busted': is_dealer_busted
+            'is_dealer_busted': is_dealer_busted,
+            'penetration': penetration
         }
     
     def reset(self) -> None:
@@ -22,6 +22,9 @@ from .worker import SimulationWorker
 # 導入BlackPiyan核心類
 from blackpiyan.config.config_manager import ConfigManager
 from blackpiyan.analysis.analyzer import Analyzer
+from blackpiyan.analysis.exact import ExactCalculator
+from blackpiyan.analysis.incremental import IncrementalAnalyzer
+from blackpiyan.analysis.significance import pairwise_matrix
 from blackpiyan.utils.font_manager import FontManager
 
 # --- 日誌處理器 ---
@@ -103,6 +106,7 @@ class BlackPiyanGUI(QMainWindow):
         # 初始化狀態
         self.worker_thread = None
         self.simulator_worker = None
+        self.exact_calculator = None
         self.ui.stopButton.setEnabled(False)
         
         # 設置窗口標題
@@ -360,6 +364,8 @@ class BlackPiyanGUI(QMainWindow):
         # 準備實時更新的數據結構
         self.current_strategy = None
         self.intermediate_results = {}
+        # 增量分析器逐次併入工作線程發送的聚合計數增量
+        self.live_analyzer = IncrementalAnalyzer()
 
         try:
             # 創建工作線程
@@ -476,7 +482,7 @@ class BlackPiyanGUI(QMainWindow):
                 # 1. 分析結果
                 analyzer = Analyzer(results)
                 self.analyzer = analyzer  # 保存分析器實例
-                comparison_df = analyzer.compare_strategies()
+                comparison_df = analyzer.compare_strategies(**self.interval_options())
 
                 # 2. 更新統計表格
                 self.update_summary_table(comparison_df)
@@ -520,6 +526,16 @@ class BlackPiyanGUI(QMainWindow):
         self.ui.stopButton.setEnabled(False)
         self.ui.progressBar.setValue(100)  # 標記完成
 
+    def interval_options(self):
+        """返回策略比較表的置信區間參數 (analysis 配置)"""
+        analysis_config = self.config.get('analysis', {})
+        if not analysis_config.get('confidence_intervals', True):
+            return {}
+        return {
+            'confidence': analysis_config.get('confidence_level', 0.95),
+            'replicates': analysis_config.get('bootstrap_replicates', 2000),
+        }
+
     def update_summary_table(self, df):
         """更新摘要表格"""
         # 清空表格
@@ -637,7 +653,15 @@ class BlackPiyanGUI(QMainWindow):
             colors = ['red' if val > 21 else 'steelblue' for val in x]
             
             # 創建條形圖
-            self.dist_canvas.axes.bar(range(len(x)), y, color=colors)
+            self.dist_canvas.axes.bar(range(len(x)), y, color=colors, label='模擬結果')
+            
+            # 疊加完整牌靴下的精確機率（換算為相同局數），與模擬結果對照
+            exact = self.get_exact_distribution(strategy)
+            if exact:
+                expected = [exact.get(val, 0.0) * stats['count'] for val in x]
+                self.dist_canvas.axes.plot(range(len(x)), expected, 'D', color='darkorange',
+                                           label='精確值（完整牌靴）')
+                self.dist_canvas.axes.legend()
             
             # 設置軸和標題
             self.dist_canvas.axes.set_xticks(range(len(x)))
@@ -647,6 +671,17 @@ class BlackPiyanGUI(QMainWindow):
             self.dist_canvas.axes.set_ylabel("局數")
             self.dist_canvas.axes.grid(True, axis='y')
             
+            # 記錄了莊家明牌時，在右側顯示明牌條件點數分佈的熱圖；
+            # 記錄了牌靴滲透率時，顯示爆牌率隨牌靴剩餘比例的變化
+            if analyzer.has_up_cards(strategy) or analyzer.has_penetration(strategy):
+                grid = self.dist_canvas.figure.add_gridspec(1, 2)
+                self.dist_canvas.axes.set_subplotspec(grid[0])
+                side_ax = self.dist_canvas.figure.add_subplot(grid[1])
+                if analyzer.has_up_cards(strategy):
+                    self.plot_up_card_heatmap(side_ax, analyzer, strategy)
+                else:
+                    self.plot_penetration_drift(side_ax, analyzer, strategy)
+            
         except Exception as e:
             error_msg = str(e)
             error_detail = traceback.format_exc()
@@ -665,6 +700,53 @@ class BlackPiyanGUI(QMainWindow):
             logging.exception("繪圖渲染時出錯")
             self.error_occurred.emit("繪圖渲染錯誤", f"無法渲染分佈圖: {str(e)}\n{traceback.format_exc()}")
 
+    def plot_up_card_heatmap(self, ax, analyzer, strategy):
+        """繪製按莊家明牌分組的條件點數分佈熱圖，並在行標籤上標示各明牌的爆牌率"""
+        table = analyzer.up_card_table(strategy)
+        bust_rates = analyzer.up_card_bust_rates(strategy)
+        image = ax.imshow(table.to_numpy(dtype=float), aspect='auto', cmap='viridis')
+        self.dist_canvas.figure.colorbar(image, ax=ax, label="條件機率")
+        ax.set_xticks(range(len(table.columns)))
+        ax.set_xticklabels([str(val) if val <= 21 else 'Bust' for val in table.columns])
+        ax.set_yticks(range(len(table.index)))
+        ax.set_yticklabels([f"{card} ({rate:.1%})" for card, rate in bust_rates.items()])
+        ax.set_title(f"策略 {strategy} 明牌條件分佈 (括號內為爆牌率)")
+        ax.set_xlabel("手牌點數")
+        ax.set_ylabel("莊家明牌")
+
+    def plot_penetration_drift(self, ax, analyzer, strategy):
+        """繪製爆牌率隨牌靴剩餘比例的變化（誤差線為 95% Wilson 置信區間），由滿靴到洗牌前從左到右"""
+        rates = analyzer.penetration_bust_rates(strategy)
+        drift = analyzer.penetration_drift(strategy)
+        midpoints = (rates['remaining_low'] + rates['remaining_high']) / 2 * 100
+        errors = [rates['bust_rate'] - rates['bust_rate_low'], rates['bust_rate_high'] - rates['bust_rate']]
+        ax.errorbar(midpoints, rates['bust_rate'] * 100, yerr=[error * 100 for error in errors],
+                    fmt='o-', capsize=3)
+        ax.invert_xaxis()
+        ax.set_title(f"策略 {strategy} 爆牌率 vs 牌靴剩餘比例 (卡方檢定 p = {drift['p_value']:.3g})")
+        ax.set_xlabel("牌靴剩餘比例 (%)")
+        ax.set_ylabel("爆牌率 (%)")
+        ax.grid(True)
+
+    def get_exact_distribution(self, strategy):
+        """
+        獲取當前牌副設置下指定策略的精確點數機率分布
+        
+        Args:
+            strategy: 莊家補牌策略
+            
+        Returns:
+            點數到機率的映射字典，無法計算時返回空字典
+        """
+        try:
+            num_decks = self.config.get('game', {}).get('decks', 6)
+            if self.exact_calculator is None or self.exact_calculator.num_decks != num_decks:
+                self.exact_calculator = ExactCalculator(num_decks)
+            return self.exact_calculator.get_distribution(strategy)
+        except ValueError as e:
+            logging.warning(f"無法計算策略 {strategy} 的精確分布: {e}")
+            return {}
+
     def plot_comparison_gui(self, analyzer=None, comparison_df=None):
         """繪製策略比較圖"""
         # 清除圖形
@@ -708,8 +790,13 @@ class BlackPiyanGUI(QMainWindow):
             # 添加總標題
             fig.suptitle("策略比較", fontsize=14, fontweight='bold', y=0.98)
             
+            # 有兩個以上策略時在下方一行顯示成對顯著性檢定矩陣
+            analysis_config = self.config.get('analysis', {})
+            show_pairwise = analysis_config.get('pairwise_tests', True) and len(comparison_df) >= 2
+            rows = 2 if show_pairwise else 1
+            
             # 1. 爆牌率比較 (左)
-            ax1 = fig.add_subplot(131)  # 1行3列的第1個
+            ax1 = fig.add_subplot(rows, 3, 1)  # 第一行3列的第1個
             if not comparison_df.empty:
                 strategies = comparison_df['strategy'].astype(str)
                 bust_rates = comparison_df['bust_rate']
@@ -745,7 +832,7 @@ class BlackPiyanGUI(QMainWindow):
                 ax1.set_ylim(0, max(bust_rates) * 1.1)
             
             # 2. 平均點數比較 (中)
-            ax2 = fig.add_subplot(132)  # 1行3列的第2個
+            ax2 = fig.add_subplot(rows, 3, 2)  # 第一行3列的第2個
             if not comparison_df.empty:
                 strategies = comparison_df['strategy'].astype(str)
                 mean_values = comparison_df['mean_value']
@@ -778,7 +865,7 @@ class BlackPiyanGUI(QMainWindow):
                 ax2.set_ylim(min_val, max(mean_values) * 1.05)
             
             # 3. 標準差比較 (右)
-            ax3 = fig.add_subplot(133)  # 1行3列的第3個
+            ax3 = fig.add_subplot(rows, 3, 3)  # 第一行3列的第3個
             if not comparison_df.empty:
                 strategies = comparison_df['strategy'].astype(str)
                 std_devs = comparison_df['std_dev']
@@ -809,6 +896,15 @@ class BlackPiyanGUI(QMainWindow):
                 # 設置 y 軸範圍
                 min_val = max(0, min(std_devs) * 0.9)
                 ax3.set_ylim(min_val, max(std_devs) * 1.05)
+            
+            # 4. 成對顯著性檢定 (下)：只由點數計數計算，實時更新時也可重新計算
+            if show_pairwise:
+                alpha = analysis_config.get('significance_level', 0.05)
+                tests = analyzer.pairwise_tests(analysis_config.get('distribution_test', 'chi2'), alpha)
+                titles = (('bust_rate', "爆牌率差異 (校正後 p 值)"), ('distribution', "點數分佈差異 (校正後 p 值)"))
+                for position, (metric, title) in enumerate(titles, 3):
+                    self.plot_pairwise_matrix(fig.add_subplot(2, 2, position),
+                                              pairwise_matrix(tests, metric, analyzer.strategies), title, alpha)
                 
         except Exception as e:
             error_msg = str(e)
@@ -830,6 +926,23 @@ class BlackPiyanGUI(QMainWindow):
             logging.exception("繪圖渲染時出錯")
             self.error_occurred.emit("繪圖渲染錯誤", f"無法渲染比較圖: {str(e)}\n{traceback.format_exc()}")
 
+    def plot_pairwise_matrix(self, ax, matrix, title, alpha):
+        """繪製校正後 p 值的策略 × 策略矩陣，顯著的配對以 * 標示"""
+        ax.imshow(matrix.to_numpy(dtype=float), cmap='RdYlGn_r', vmin=0, vmax=1)
+        labels = [str(strategy) for strategy in matrix.index]
+        ax.set_xticks(range(len(labels)))
+        ax.set_xticklabels(labels)
+        ax.set_yticks(range(len(labels)))
+        ax.set_yticklabels(labels)
+        ax.set_title(title, fontsize=12, pad=10)
+        for i in range(len(labels)):
+            for j in range(len(labels)):
+                p_value = matrix.iat[i, j]
+                if p_value == p_value:  # 對角線為 NaN
+                    text = "<0.001" if p_value < 0.001 else f"{p_value:.3f}"
+                    ax.text(j, i, text + ("*" if p_value < alpha else ""),
+                            ha='center', va='center', fontsize=8)
+
     @Slot()
     def show_about_dialog(self):
         """顯示關於對話框"""
@@ -991,7 +1104,7 @@ class BlackPiyanGUI(QMainWindow):
                 logging.error(f"清理圖形資源時出錯: {str(e)}")
             
             # 清理其他資源和引用
-            for attr_name in ['simulation_results', 'analyzer', 'intermediate_results']:
+            for attr_name in ['simulation_results', 'analyzer', 'live_analyzer', 'intermediate_results']:
                 if hasattr(self, attr_name):
                     try:
                         setattr(self, attr_name, None)
@@ -1044,14 +1157,16 @@ class BlackPiyanGUI(QMainWindow):
 
     @Slot(object, int)
     def handle_intermediate_results(self, intermediate_data, current_strategy):
-        """處理模擬過程中的中間結果，更新圖表"""
+        """處理模擬過程中的中間結果（各策略新增的聚合計數），更新圖表"""
         try:
-            # 保存中間結果和當前策略
-            self.intermediate_results = intermediate_data
+            # 將增量併入增量分析器，並保存累計結果和當前策略
+            for strategy, delta in intermediate_data.items():
+                self.live_analyzer.update(strategy, delta)
+            self.intermediate_results = self.live_analyzer.aggregates
             self.current_strategy = current_strategy
             
             # 確保下拉框包含所有已知策略
-            strategies = list(intermediate_data.keys())
+            strategies = list(self.live_analyzer.strategies)
             for strategy in sorted(strategies):
                 if self.ui.strategyDistCombo.findData(strategy) == -1:  # 如果策略不在下拉框中
                     self.ui.strategyDistCombo.addItem(f"策略 {strategy}", strategy)
@@ -1088,8 +1203,8 @@ class BlackPiyanGUI(QMainWindow):
                 logging.warning("中間結果為空，無法更新圖表")
                 return
                 
-            # 創建分析器
-            self.analyzer = Analyzer(self.intermediate_results)
+            # 增量已在接收時併入，直接使用增量分析器
+            self.analyzer = self.live_analyzer
             
             # 如果沒有策略數據，則退出
             if not self.analyzer.strategies:
@@ -1107,7 +1222,7 @@ class BlackPiyanGUI(QMainWindow):
                 self.plot_distribution_gui(strategy)
                 
             # 2. 更新策略比較頁的比較圖
-            comparison_df = self.analyzer.compare_strategies()
+            comparison_df = self.analyzer.compare_strategies(**self.interval_options())
             self.plot_comparison_gui(self.analyzer, comparison_df)
             
             # 3. 更新表格
@@ -405,7 +405,7 @@ class Ui_MainWindow(object):
         self.gamesLabel.setText(QCoreApplication.translate("MainWindow", u"每個策略的模擬局數:", None))
         self.strategiesLabel.setText(QCoreApplication.translate("MainWindow", u"要測試的策略值 (逗號分隔):", None))
         self.strategiesLineEdit.setText(QCoreApplication.translate("MainWindow", u"16, 17, 18", None))
-        self.simTimeLabel.setText(QCoreApplication.translate("MainWindow", u"模擬速度控制（目標完成時間）:", None))
+        self.simTimeLabel.setText(QCoreApplication.translate("MainWindow", u"時間預算（time_budget 模式）:", None))
         self.realtimeUpdateLabel.setText(QCoreApplication.translate("MainWindow", u"實時更新設置:", None))
         self.realtimeUpdateCheck.setText(QCoreApplication.translate("MainWindow", u"啟用實時更新", None))
         self.autoAdjustCheck.setText(QCoreApplication.translate("MainWindow", u"自動調整頻率", None))
@@ -5,7 +5,6 @@ from PySide6.QtCore import QObject, Signal, Slot
 import time
 import logging
 import traceback
-import copy
 
 # 導入核心類
 from blackpiyan.simulation.simulator import Simulator
@@ -15,10 +14,10 @@ class SimulationWorker(QObject):
     
     # 信號定義
     finished = Signal()              # 任務完成信號
-    result_ready = Signal(object)    # 結果準備好信號 (傳遞結果字典或錯誤信息)
+    result_ready = Signal(object)    # 結果準備好信號 (傳遞策略到聚合計數的字典或錯誤信息)
     progress = Signal(int, str)      # 進度更新信號 (百分比, 狀態消息)
     error_signal = Signal(str, str)  # 錯誤信號 (錯誤標題, 錯誤詳情)
-    intermediate_result = Signal(object, int)  # 中間結果信號 (部分結果字典, 當前策略)
+    intermediate_result = Signal(object, int)  # 中間結果信號 (上次發送後各策略新增的聚合計數, 當前策略)
 
     def __init__(self, config):
         """
@@ -37,8 +36,8 @@ class SimulationWorker(QObject):
         # 從配置中獲取實時更新設置
         self._setup_realtime_update_config()
         
-        # 累積的模擬結果
-        self.accumulated_results = {}
+        # 上次發送中間結果後新增、尚未發送的聚合計數
+        self.pending_deltas = {}
 
     def _setup_realtime_update_config(self):
         """設置實時更新配置"""
@@ -107,12 +106,27 @@ class SimulationWorker(QObject):
             strategies = self.config['simulation']['strategies']
             games_per_strategy = self.config['simulation']['min_games_per_strategy']
             sim_time_seconds = self.config.get('simulation', {}).get('sim_time_seconds', 10)
+            # games: 全速模擬指定局數; time_budget: 在 sim_time_seconds 內盡可能多地模擬;
+            # precision: 每個策略模擬到置信區間半寬達到目標為止，局數上限為 max_games_per_strategy
+            run_mode = self.config.get('simulation', {}).get('run_mode', 'games')
+            time_budget_mode = run_mode == 'time_budget'
+            precision_mode = run_mode == 'precision'
+            targets = simulator.precision_targets() if precision_mode else None
+            confidence = self.config.get('simulation', {}).get('confidence_level', 0.95)
+            max_games = self.config.get('simulation', {}).get('max_games_per_strategy')
+            if precision_mode and not targets:
+                raise ValueError("精度模式需要設定 target_bust_half_width 或 target_mean_half_width")
             total_strategies = len(strategies)
             
             # 計算本次模擬總局數，用於自動調整更新間隔
             total_games = games_per_strategy * total_strategies
             update_interval = self._calculate_update_interval(total_games)
-            self.logger.info(f"總模擬局數: {total_games}, 實時更新間隔: {update_interval}, 目標模擬時間: {sim_time_seconds}秒")
+            if time_budget_mode:
+                self.logger.info(f"時間預算模式: 總預算 {sim_time_seconds}秒, 實時更新間隔: {update_interval}")
+            elif precision_mode:
+                self.logger.info(f"精度模式: 目標半寬 {targets} (置信水平 {confidence}), 實時更新間隔: {update_interval}")
+            else:
+                self.logger.info(f"總模擬局數: {total_games}, 實時更新間隔: {update_interval}")
 
             for i, strategy in enumerate(strategies):
                 if self._stop_requested:
@@ -125,88 +139,92 @@ class SimulationWorker(QObject):
                 strategy_progress_step = 100 / total_strategies
                 self.progress.emit(int(strategy_progress_base), f"正在模擬策略 {strategy}...")
 
-                # 初始化此策略的結果列表
-                results[strategy] = []
-                self.accumulated_results[strategy] = []
+                # 初始化此策略的聚合計數（記錄明牌或滲透率時按該欄分組）
+                results[strategy] = simulator.aggregate_type()
                 
                 try:
-                    # 計算每個策略的目標模擬時間
+                    # 時間預算模式下平均分配預算，局數模式下以全速模擬指定局數
                     strategy_sim_time = sim_time_seconds / total_strategies
                     start_time = time.time()
                     
-                    # 計算基於目標時間的批次大小
-                    batch_count = max(20, min(100, int(games_per_strategy / 20)))  # 至少分成20批，最多100批
-                    base_batch_size = max(10, games_per_strategy // batch_count)
-                    
                     # 初始化模擬進度
                     completed_games = 0
                     last_update_time = time.time()
                     
-                    # 計算每批次應該的時間
-                    time_per_batch = strategy_sim_time / batch_count
-                    
-                    for batch_num in range(batch_count):
-                        if self._stop_requested:
-                            break
-                        
-                        # 計算本批次應該模擬的局數
-                        remaining = games_per_strategy - completed_games
-                        if batch_num == batch_count - 1:  # 最後一批
-                            current_batch = remaining
-                        else:
-                            current_batch = min(base_batch_size, remaining)
-                        
-                        # 記錄批次開始時間
-                        batch_start = time.time()
-                        
-                        # 執行一批模擬
-                        batch_results = simulator.run_simulation(strategy, current_batch)
-                        results[strategy].extend(batch_results)
-                        self.accumulated_results[strategy].extend(batch_results)
-                        completed_games += current_batch
-                        
-                        # 計算批次耗時
-                        batch_elapsed = time.time() - batch_start
+                    # 批次大小由模擬器按實測吞吐量調整，進度以穩定的節奏更新；
+                    # source 為底層生成器，停止時顯式關閉（檢查點模式藉此保存已完成的區塊）
+                    source = None
+                    if precision_mode:
+                        batches = simulator.iter_batches(strategy, num_games=max_games,
+                                                         targets=targets, confidence=confidence)
+                    elif (not time_budget_mode and simulator.checkpoint_interval is not None
+                          and simulator.record_column is None):
+                        # 局數模式定期保存檢查點：相同運行中斷後再次開始時從檢查點繼續
+                        source = simulator.iter_checkpointed([strategy], games_per_strategy,
+                                                             path=simulator.checkpoint_path(str(strategy)))
+                        batches = (delta[strategy] for delta in source)
+                    elif not time_budget_mode and simulator.cache_enabled:
+                        # 局數模式使用結果快取：已模擬過的局數直接讀取，只模擬缺少的局數
+                        source = simulator.iter_cached([strategy], games_per_strategy)
+                        batches = (delta[strategy] for delta in source)
+                    else:
+                        batches = simulator.iter_batches(
+                            strategy,
+                            num_games=None if time_budget_mode else games_per_strategy,
+                            time_budget=strategy_sim_time if time_budget_mode else None
+                        )
+                    for delta in batches:
+                        # 記錄此批次的聚合計數
+                        results[strategy].merge(delta)
+                        self.pending_deltas.setdefault(strategy, type(delta)()).merge(delta)
+                        completed_games += delta.count
                         
                         # 計算並發送進度
-                        batch_progress = completed_games / games_per_strategy * strategy_progress_step
-                        current_progress = int(strategy_progress_base + batch_progress)
-                        self.progress.emit(current_progress, 
-                                         f"策略 {strategy}: 已完成 {completed_games}/{games_per_strategy} 局")
+                        if time_budget_mode:
+                            fraction = min(1.0, (time.time() - start_time) / strategy_sim_time)
+                            status = f"策略 {strategy}: 已完成 {completed_games} 局"
+                        elif precision_mode:
+                            # 以外推所需的局數估計進度
+                            needed = results[strategy].games_needed(targets, confidence)
+                            fraction = completed_games / max(needed, completed_games)
+                            status = f"策略 {strategy}: 已完成 {completed_games} 局 (預計需要 {needed} 局)"
+                        else:
+                            fraction = completed_games / games_per_strategy
+                            status = f"策略 {strategy}: 已完成 {completed_games}/{games_per_strategy} 局"
+                        current_progress = int(strategy_progress_base + fraction * strategy_progress_step)
+                        self.progress.emit(current_progress, status)
                         
                         # 發送中間結果用於實時顯示
-                        if self.realtime_update_enabled and len(self.accumulated_results[strategy]) > 0:
+                        if self.realtime_update_enabled:
                             # 檢查是否需要更新 (避免過於頻繁的更新)
                             current_time = time.time()
                             time_since_last_update = current_time - last_update_time
                             
                             # 至少間隔0.5秒發送一次更新，避免GUI過載
                             if time_since_last_update >= 0.5:
-                                # 創建當前累積結果的副本以避免競態條件
-                                intermediate_data = copy.deepcopy(self.accumulated_results)
-                                self.intermediate_result.emit(intermediate_data, strategy)
+                                self._emit_deltas(strategy)
                                 last_update_time = current_time
                                 self.logger.debug(f"發送實時更新: 策略={strategy}, 已完成={completed_games}")
                         
-                        # 調整速度以符合目標時間
-                        # 如果批次執行太快，則等待一段時間
-                        if batch_elapsed < time_per_batch and batch_num < batch_count - 1:
-                            sleep_time = time_per_batch - batch_elapsed
-                            time.sleep(sleep_time)
-                            self.logger.debug(f"批次{batch_num}執行時間{batch_elapsed:.3f}秒，休眠{sleep_time:.3f}秒")
+                        if self._stop_requested:
+                            break
+                    batches.close()
+                    if source is not None:
+                        source.close()
                     
                     # 最後一次更新，確保顯示最終結果
                     if self.realtime_update_enabled:
-                        intermediate_data = copy.deepcopy(self.accumulated_results)
-                        self.intermediate_result.emit(intermediate_data, strategy)
+                        self._emit_deltas(strategy)
                     
-                    # 計算實際耗時
+                    # 計算實際耗時和達到的速度
                     strategy_elapsed = time.time() - start_time
-                    self.logger.info(f"策略 {strategy} 模擬完成, 實際耗時: {strategy_elapsed:.2f}秒 (目標: {strategy_sim_time:.2f}秒)")
+                    games_per_second = simulator.throughput.get(strategy, 0.0)
+                    self.logger.info(f"策略 {strategy} 模擬完成, 共 {completed_games} 局, 實際耗時: {strategy_elapsed:.2f}秒, "
+                                     f"速度: {games_per_second:,.0f} 局/秒")
                     
                     # 更新進度
                     strategy_progress = strategy_progress_base + strategy_progress_step
-                    self.progress.emit(int(strategy_progress), f"策略 {strategy} 模擬完成")
+                    self.progress.emit(int(strategy_progress), f"策略 {strategy} 模擬完成 ({games_per_second:,.0f} 局/秒)")
                     self.logger.info(f"線程: 策略 {strategy} 模擬完成")
                     
                 except Exception as e:
@@ -238,6 +256,21 @@ class SimulationWorker(QObject):
             self.finished.emit()
             self.logger.info("工作線程結束。")
 
+    def _emit_deltas(self, current_strategy):
+        """
+        發送上次發送後新增的聚合計數
+        
+        每個策略的增量是固定大小的計數陣列，信號內容的大小與已模擬局數無關。
+        發送後由接收方持有這些物件，工作線程改用新的增量。
+        
+        Args:
+            current_strategy: 當前模擬的策略
+        """
+        if not self.pending_deltas:
+            return
+        deltas, self.pending_deltas = self.pending_deltas, {}
+        self.intermediate_result.emit(deltas, current_strategy)
+
     def request_stop(self):
         """請求停止模擬任務"""
         self.logger.info("收到停止請求")
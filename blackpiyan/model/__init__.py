@@ -3,5 +3,7 @@
 from blackpiyan.model.card import Card
 from blackpiyan.model.deck import Deck
 from blackpiyan.model.dealer import Dealer
+from blackpiyan.model.dealer_table import DealerTable, get_dealer_table
+from blackpiyan.model.shoe_factory import ShoeFactory
 
-__all__ = ['Card', 'Deck', 'Dealer'] 
\ No newline at end of file
+__all__ = ['Card', 'Deck', 'Dealer', 'DealerTable', 'get_dealer_table', 'ShoeFactory'] 
\ No newline at end of file
@@ -1,6 +1,7 @@
 from typing import List, Tuple
 
 from blackpiyan.model.card import Card
+from blackpiyan.model.dealer_table import get_dealer_table
 from blackpiyan.model.deck import Deck
 
 class Dealer:
@@ -83,6 +84,9 @@ class Dealer:
         """
         莊家玩一手牌
         
+        未覆寫 should_hit 和 calculate_hand_value 時以狀態轉移表推進手牌；
+        子類覆寫其中任一方法時，改為逐張調用這兩個方法，使自訂規則生效。
+        
         Args:
             deck: 用於抽牌的牌組
             
@@ -91,6 +95,33 @@ class Dealer:
             - 莊家最終的手牌列表
             - 莊家最終的點數
         """
+        if (type(self).should_hit is not Dealer.should_hit
+                or type(self).calculate_hand_value is not Dealer.calculate_hand_value):
+            return self._play_hand_by_rules(deck)
+        
+        # 以狀態轉移表推進手牌，每張牌只需一次查表
+        table = get_dealer_table(self.hit_until_value)
+        next_state = table.next_state_list
+        stop = table.stop_list
+        
+        # 初始抽兩張牌
+        hand = [deck.draw(), deck.draw()]
+        state = next_state[next_state[0][hand[0].value]][hand[1].value]
+        
+        # 根據策略決定是否繼續補牌
+        while not stop[state]:
+            # 檢查剩餘牌數，如有必要則洗牌
+            deck.auto_shuffle_if_needed()
+            
+            # 補牌
+            card = deck.draw()
+            hand.append(card)
+            state = next_state[state][card.value]
+        
+        return hand, table.totals_list[state]
+    
+    def _play_hand_by_rules(self, deck: Deck) -> Tuple[List[Card], int]:
+        """以 should_hit 和 calculate_hand_value 逐張推進手牌，返回值同 play_hand"""
         # 初始抽兩張牌
         hand = [deck.draw(), deck.draw()]
         hand_value = self.calculate_hand_value(hand)
@@ -0,0 +1,75 @@
+from functools import lru_cache
+
+import numpy as np
+
+# 點數 (1-13) 對應的21點牌值，索引0不使用
+BLACKJACK_VALUES = np.array([0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 10, 10, 10], dtype=np.int8)
+
+# 莊家手牌可能出現的最大點數（20點補一張10點）
+MAX_HAND_TOTAL = 30
+
+# 硬點數 0-31 各有無 Ace 兩種狀態
+MAX_HARD_TOTAL = 31
+NUM_STATES = (MAX_HARD_TOTAL + 1) * 2
+
+# 扁平轉移表中每個狀態佔 16 格，索引為 (state << 4) | rank
+RANK_BITS = 4
+
+class DealerTable:
+    """
+    莊家補牌的狀態轉移表
+    
+    將手牌狀態編碼為 hard * 2 + has_ace（硬點數與是否持有 Ace，兩者決定軟點數），
+    預先計算每個狀態抽到每種點數 (1-13) 後的下一個狀態、每個狀態的最終點數，
+    以及按補牌策略是否停牌。補牌時每張牌只需一次查表，Dealer 和向量化引擎
+    共用同一組表。初始狀態 0 表示空手牌。
+    """
+    
+    def __init__(self, hit_until_value: int):
+        """
+        建立狀態轉移表
+        
+        Args:
+            hit_until_value: 莊家補牌策略，當點數小於此值時補牌
+        """
+        self.hit_until_value = hit_until_value
+        
+        states = np.arange(NUM_STATES)
+        hard, has_ace = states // 2, states % 2 == 1
+        # Ace 在不爆牌時計為 11 點
+        self.totals = (hard + 10 * (has_ace & (hard <= 11))).astype(np.int8)
+        self.stop = self.totals >= hit_until_value
+        
+        # next_state[state, rank]：狀態抽到點數 rank 後的狀態（rank 0 不使用）
+        ranks = np.arange(14)
+        next_hard = np.minimum(hard[:, None] + BLACKJACK_VALUES[None, :], MAX_HARD_TOTAL)
+        next_ace = has_ace[:, None] | (ranks[None, :] == 1)
+        self.next_state = (next_hard * 2 + next_ace).astype(np.int8)
+        self.next_state[:, 0] = states
+        
+        # 向量化引擎使用的扁平表：以 int16 的位運算索引代替二維花式索引
+        self.flat_next_state = np.zeros(NUM_STATES << RANK_BITS, dtype=np.int16)
+        self.flat_next_state.reshape(NUM_STATES, -1)[:, :14] = self.next_state
+        
+        # 逐局模擬使用的 Python 列表，避免 NumPy 純量索引的開銷
+        self.next_state_list = self.next_state.tolist()
+        self.totals_list = self.totals.tolist()
+        self.stop_list = self.stop.tolist()
+    
+    @staticmethod
+    def state_of(hard: int, has_ace: bool) -> int:
+        """返回 (硬點數, 是否持有 Ace) 對應的狀態編號"""
+        return hard * 2 + int(has_ace)
+
+@lru_cache(maxsize=None)
+def get_dealer_table(hit_until_value: int) -> DealerTable:
+    """
+    獲取指定補牌策略的狀態轉移表（每個策略只建立一次）
+    
+    Args:
+        hit_until_value: 莊家補牌策略
+    
+    Returns:
+        狀態轉移表
+    """
+    return DealerTable(hit_until_value)
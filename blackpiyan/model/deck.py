@@ -1,39 +1,65 @@
-import random
 from typing import List, Optional
 
+import numpy as np
+
 from blackpiyan.model.card import Card
+from blackpiyan.model.shoe_factory import ShoeFactory
 
 class Deck:
-    """表示一個牌組，可以包含多副牌"""
+    """
+    表示一個牌組，可以包含多副牌
+    
+    牌靴以 NumPy int8 陣列保存每張牌的編碼（花色索引 * 13 + 點數 - 1），
+    洗牌時從 ShoeFactory 批量產生的牌靴中取出下一個，抽牌只移動游標，
+    只有在呼叫者需要時才建立 Card 物件。
+    """
     
-    def __init__(self, num_decks: int = 6):
+    def __init__(self, num_decks: int = 6, rng: Optional[np.random.Generator] = None,
+                 batch_size: int = 64, background: bool = False,
+                 shoe_source: Optional[ShoeFactory] = None):
         """
         初始化牌組
         
         Args:
             num_decks: 牌組中包含的標準撲克牌副數，默認為6
+            rng: 洗牌使用的隨機數產生器，如為None則建立新的產生器
+            batch_size: 每次批量產生的牌靴數量
+            background: 是否在背景線程中預先產生下一批牌靴
+            shoe_source: 提供牌靴編碼的來源，可以是 ShoeFactory 或任何具有 shoe_size 和
+                next_shoe() 的物件（如磁碟上的 ShoeLibrary），如為None則建立 ShoeFactory
         """
         if num_decks <= 0:
             raise ValueError(f"Number of decks must be positive, got {num_decks}")
         
         self.num_decks = num_decks
         self.initial_cards_count = num_decks * 52
-        self.cards = self._create_decks(num_decks)
+        if shoe_source is not None and shoe_source.shoe_size != self.initial_cards_count:
+            raise ValueError(f"Shoe source has {shoe_source.shoe_size} cards per shoe, "
+                             f"expected {self.initial_cards_count}")
+        self._factory = shoe_source or ShoeFactory(self._create_shoe(num_decks), rng=rng,
+                                                   batch_size=batch_size, background=background)
+        self._cursor = 0
         self.shuffle()
     
-    def _create_decks(self, num_decks: int) -> List[Card]:
-        """創建多副牌"""
-        cards = []
-        for _ in range(num_decks):
-            for suit in Card.SUITS:
-                for value in range(1, 14):
-                    cards.append(Card(value, suit))
-        return cards
+    @staticmethod
+    def _create_shoe(num_decks: int) -> np.ndarray:
+        """創建多副牌的編碼陣列"""
+        return np.tile(np.arange(52, dtype=np.int8), num_decks)
+    
+    @staticmethod
+    def _card_from_code(code: int) -> Card:
+        """將牌的編碼轉換為 Card 物件"""
+        return Card(code % 13 + 1, Card.SUITS[code // 13])
+    
+    @property
+    def cards(self) -> List[Card]:
+        """剩餘未抽出的牌（按需建立 Card 物件）"""
+        return [self._card_from_code(int(code)) for code in self._shoe[self._cursor:]]
     
     def shuffle(self) -> None:
-        """洗牌"""
-        self.cards = self._create_decks(self.num_decks)
-        random.shuffle(self.cards)
+        """洗牌：換上一個新洗好的牌靴並將游標歸零"""
+        self._shoe = self._factory.next_shoe()
+        self._cursor = 0
     
     def draw(self) -> Card:
         """
@@ -41,13 +67,31 @@ class Deck:
         
         Returns:
             抽取的牌
-            
+        
         Raises:
             RuntimeError: 如果牌組已空
         """
-        if not self.cards:
+        return self._card_from_code(self._next_code())
+    
+    def draw_rank(self) -> int:
+        """
+        從牌組中抽取一張牌，只返回點數而不建立 Card 物件
+        
+        Returns:
+            抽取的牌的點數值 (1-13)
+        
+        Raises:
+            RuntimeError: 如果牌組已空
+        """
+        return self._next_code() % 13 + 1
+    
+    def _next_code(self) -> int:
+        """移動游標並返回下一張牌的編碼"""
+        if self._cursor >= self.initial_cards_count:
             raise RuntimeError("Cannot draw from an empty deck")
-        return self.cards.pop()
+        code = int(self._shoe[self._cursor])
+        self._cursor += 1
+        return code
     
     def get_remaining_percentage(self) -> float:
         """
@@ -56,7 +100,7 @@ class Deck:
         Returns:
             剩餘牌佔總牌數的百分比 (0.0-1.0)
         """
-        return len(self.cards) / self.initial_cards_count
+        return (self.initial_cards_count - self._cursor) / self.initial_cards_count
     
     def auto_shuffle_if_needed(self, threshold: float = 0.4) -> bool:
         """
@@ -64,7 +108,7 @@ class Deck:
         
         Args:
             threshold: 洗牌閾值，默認為40%
-            
+        
         Returns:
             是否進行了洗牌
         """
@@ -75,4 +119,4 @@ class Deck:
     
     def __len__(self) -> int:
         """返回牌組中剩餘的牌數"""
-        return len(self.cards) 
\ No newline at end of file
+        return self.initial_cards_count - self._cursor
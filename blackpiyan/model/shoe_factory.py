@@ -0,0 +1,119 @@
+from typing import Optional
+import threading
+
+import numpy as np
+
+class ShoeFactory:
+    """
+    批量產生洗好的牌靴
+    
+    每次以一次隨機數抽取為一整批 (batch_size, shoe_size) 個牌位各產生一個 64 位元隨機鍵，
+    將牌位序號放在鍵的低位後按行排序，即得到每個牌靴的均勻隨機排列。取用時從緩衝區
+    逐行返回，用完後換上下一批；background 為 True 時下一批在背景線程中預先產生
+    （排序和隨機數產生都會釋放 GIL），多核心下洗牌幾乎不佔用模擬線程的時間。
+    產生的牌靴序列只取決於隨機數產生器和 batch_size，與是否在背景產生無關。
+    """
+    
+    def __init__(self, base_shoe: np.ndarray, rng: Optional[np.random.Generator] = None,
+                 batch_size: int = 4096, background: bool = False):
+        """
+        初始化牌靴工廠
+        
+        Args:
+            base_shoe: 未洗的牌靴，每個元素為一張牌（編碼或點數）
+            rng: 隨機數產生器，只供本工廠使用，如為None則建立新的產生器
+            batch_size: 每批產生的牌靴數量
+            background: 是否在背景線程中預先產生下一批
+        """
+        if batch_size <= 0:
+            raise ValueError(f"Batch size must be positive, got {batch_size}")
+        
+        self.base_shoe = np.asarray(base_shoe, dtype=np.int8)
+        self.shoe_size = len(self.base_shoe)
+        self.batch_size = batch_size
+        self.background = background
+        self._rng = rng if rng is not None else np.random.default_rng()
+        
+        # 牌位序號佔鍵的低位，其餘位為隨機數（相同的隨機部分按牌位排序，機率可忽略）
+        position_bits = max(1, (self.shoe_size - 1).bit_length())
+        self._position_mask = np.uint64((1 << position_bits) - 1)
+        self._positions = np.arange(self.shoe_size, dtype=np.uint64)
+        
+        self._buffer = np.empty((0, self.shoe_size), dtype=np.int8)
+        self._cursor = 0
+        self._next_batch: Optional[np.ndarray] = None
+        self._worker: Optional[threading.Thread] = None
+    
+    def shuffle_batch(self, count: int) -> np.ndarray:
+        """
+        直接產生一批洗好的牌靴（不經過緩衝區）
+        
+        Args:
+            count: 牌靴數量
+        
+        Returns:
+            形狀為 (count, shoe_size) 的 int8 陣列
+        """
+        keys = self._rng.bit_generator.random_raw((count, self.shoe_size))
+        keys &= ~self._position_mask
+        keys |= self._positions
+        keys.sort(axis=1)
+        return self.base_shoe[(keys & self._position_mask).astype(np.intp)]
+    
+    def take(self, count: int) -> np.ndarray:
+        """
+        從緩衝區取出多個洗好的牌靴
+        
+        Args:
+            count: 牌靴數量
+        
+        Returns:
+            形狀為 (count, shoe_size) 的 int8 陣列（緩衝區足夠時為唯讀視圖）
+        """
+        if self._cursor + count <= len(self._buffer):
+            self._cursor += count
+            return self._buffer[self._cursor - count:self._cursor]
+        
+        shoes = np.empty((count, self.shoe_size), dtype=np.int8)
+        filled = 0
+        while filled < count:
+            if self._cursor == len(self._buffer):
+                self._refill()
+            n = min(count - filled, len(self._buffer) - self._cursor)
+            shoes[filled:filled + n] = self._buffer[self._cursor:self._cursor + n]
+            self._cursor += n
+            filled += n
+        return shoes
+    
+    def next_shoe(self) -> np.ndarray:
+        """
+        取出一個洗好的牌靴
+        
+        Returns:
+            長度為 shoe_size 的唯讀 int8 陣列（緩衝區的一行，不會被修改）
+        """
+        if self._cursor == len(self._buffer):
+            self._refill()
+        shoe = self._buffer[self._cursor]
+        self._cursor += 1
+        return shoe
+    
+    def _refill(self) -> None:
+        """換上下一批牌靴，背景模式下同時開始產生再下一批"""
+        if self._worker is not None:
+            self._worker.join()
+            self._worker = None
+            batch = self._next_batch
+        else:
+            batch = self.shuffle_batch(self.batch_size)
+        batch.flags.writeable = False
+        self._buffer = batch
+        self._cursor = 0
+        
+        if self.background:
+            self._worker = threading.Thread(target=self._produce, daemon=True)
+            self._worker.start()
+    
+    def _produce(self) -> None:
+        """背景線程：產生下一批牌靴"""
+        self._next_batch = self.shuffle_batch(self.batch_size)
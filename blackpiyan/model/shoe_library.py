@@ -0,0 +1,167 @@
+"""
+牌靴庫：將預先洗好的牌靴寫入磁碟，供多次運行和多個進程重複使用
+
+用法: python -m blackpiyan.model.shoe_library OUTPUT NUM_SHOES [--decks 6] [--seed SEED]
+"""
+
+from typing import List, Optional
+import argparse
+import os
+import sys
+
+import numpy as np
+
+from blackpiyan.model.shoe_factory import ShoeFactory
+
+# 牌的編碼（花色索引 * 13 + 點數 - 1）到點數 (1-13) 的查找表
+RANK_OF_CODE = (np.arange(52, dtype=np.int8) % 13 + 1)
+
+def write_shoe_library(path: str, num_shoes: int, num_decks: int = 6, seed: Optional[int] = None,
+                       batch_size: int = 4096) -> str:
+    """
+    將預先洗好的牌靴寫入 .npy 文件
+    
+    文件為形狀 (num_shoes, num_decks * 52) 的 int8 陣列，每個元素為牌的編碼
+    （與 Deck 相同），可以用 numpy.load(path, mmap_mode='r') 直接映射。
+    寫入時逐批產生，記憶體用量與牌靴數量無關。
+    
+    Args:
+        path: 輸出文件路徑
+        num_shoes: 牌靴數量
+        num_decks: 每個牌靴的牌副數量
+        seed: 隨機種子，如為None則從系統熵取得
+        batch_size: 每批產生的牌靴數量
+    
+    Returns:
+        輸出文件路徑
+    """
+    if num_shoes <= 0:
+        raise ValueError(f"Number of shoes must be positive, got {num_shoes}")
+    if num_decks <= 0:
+        raise ValueError(f"Number of decks must be positive, got {num_decks}")
+    
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    
+    factory = ShoeFactory(np.tile(np.arange(52, dtype=np.int8), num_decks),
+                          rng=np.random.default_rng(seed), batch_size=batch_size)
+    shoes = np.lib.format.open_memmap(path, mode='w+', dtype=np.int8, shape=(num_shoes, num_decks * 52))
+    for start in range(0, num_shoes, batch_size):
+        count = min(batch_size, num_shoes - start)
+        shoes[start:start + count] = factory.shuffle_batch(count)
+    shoes.flush()
+    del shoes
+    return path
+
+class ShoeLibrary:
+    """
+    從磁碟上的牌靴庫依序讀取牌靴
+    
+    文件以記憶體映射方式打開，只有實際讀到的牌靴會載入，多個進程同時讀取同一個文件時
+    共用作業系統的頁面快取。提供與 ShoeFactory 相同的 take / next_shoe 介面，因此可以
+    直接代替 ShoeFactory 供 Deck 和向量化引擎使用。每個讀取器只讀 [start, stop)
+    範圍內的牌靴，並行時以 shard 切分互不重疊的範圍。
+    """
+    
+    def __init__(self, path: str, start: int = 0, stop: Optional[int] = None, ranks: bool = False):
+        """
+        打開牌靴庫
+        
+        Args:
+            path: write_shoe_library 寫入的 .npy 文件路徑
+            start: 第一個讀取的牌靴序號
+            stop: 讀取範圍的結束序號（不含），如為None則讀到文件末尾
+            ranks: 是否返回點數 (1-13) 而非牌的編碼，向量化引擎使用點數
+        """
+        self.path = path
+        # 記憶體映射的普通 ndarray 視圖（避免 memmap 子類在逐元素讀取時的開銷）
+        self.shoes = np.asarray(np.load(path, mmap_mode='r'))
+        if self.shoes.dtype != np.int8 or self.shoes.ndim != 2 or self.shoes.shape[1] % 52:
+            raise ValueError(f"{path} is not a shoe library: expected an int8 array of shape (N, decks * 52), "
+                             f"got {self.shoes.dtype} {self.shoes.shape}")
+        
+        self.shoe_size = self.shoes.shape[1]
+        self.num_decks = self.shoe_size // 52
+        self.start = start
+        self.stop = len(self.shoes) if stop is None else stop
+        if not 0 <= self.start <= self.stop <= len(self.shoes):
+            raise ValueError(f"Invalid shoe range [{start}, {stop}) for a library of {len(self.shoes)} shoes")
+        self.ranks = ranks
+        self._cursor = self.start
+    
+    def __len__(self) -> int:
+        """返回讀取範圍內的牌靴數量"""
+        return self.stop - self.start
+    
+    @property
+    def used(self) -> int:
+        """已讀取的牌靴數量"""
+        return self._cursor - self.start
+    
+    def take(self, count: int) -> np.ndarray:
+        """
+        讀取接下來的多個牌靴
+        
+        Args:
+            count: 牌靴數量
+        
+        Returns:
+            形狀為 (count, shoe_size) 的 int8 陣列（讀取編碼時為記憶體映射的唯讀視圖）
+        
+        Raises:
+            RuntimeError: 如果讀取範圍內的牌靴不足
+        """
+        if self._cursor + count > self.stop:
+            raise RuntimeError(f"Shoe library {self.path} exhausted: needed {count} more shoes after "
+                               f"{self.used} of {len(self)}; write a larger library")
+        shoes = self.shoes[self._cursor:self._cursor + count]
+        self._cursor += count
+        return RANK_OF_CODE.take(shoes) if self.ranks else shoes
+    
+    def next_shoe(self) -> np.ndarray:
+        """
+        讀取下一個牌靴
+        
+        Returns:
+            長度為 shoe_size 的 int8 陣列
+        """
+        return self.take(1)[0]
+    
+    def rewind(self) -> None:
+        """回到讀取範圍的第一個牌靴，使下一次運行使用相同的牌靴"""
+        self._cursor = self.start
+    
+    def shard(self, index: int, count: int) -> 'ShoeLibrary':
+        """
+        返回讀取範圍的第 index 個（共 count 個）等分的讀取器
+        
+        Args:
+            index: 分片序號（從0開始）
+            count: 分片數量
+        
+        Returns:
+            只讀取該分片的新讀取器
+        """
+        if not 0 <= index < count:
+            raise ValueError(f"Shard index must be between 0 and {count - 1}, got {index}")
+        size = len(self) // count
+        start = self.start + index * size
+        return ShoeLibrary(self.path, start, start + size, self.ranks)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """命令行入口：寫入牌靴庫"""
+    parser = argparse.ArgumentParser(description="將預先洗好的牌靴寫入 .npy 牌靴庫")
+    parser.add_argument('output', help="輸出文件路徑 (.npy)")
+    parser.add_argument('num_shoes', type=int, help="牌靴數量")
+    parser.add_argument('--decks', type=int, default=6, help="每個牌靴的牌副數量 (默認6)")
+    parser.add_argument('--seed', type=int, default=None, help="隨機種子")
+    args = parser.parse_args(argv)
+    
+    path = write_shoe_library(args.output, args.num_shoes, args.decks, args.seed)
+    size_mb = os.path.getsize(path) / 1024 / 1024
+    print(f"已寫入 {args.num_shoes} 個 {args.decks} 副牌的牌靴到 {path} ({size_mb:.1f} MB)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,8 @@
 """模擬模塊，執行遊戲模擬和結果收集"""
 
+from blackpiyan.simulation.counter import CounterEngine
+from blackpiyan.simulation.rng import RandomStreams
 from blackpiyan.simulation.simulator import Simulator
+from blackpiyan.simulation.vectorized import VectorizedEngine
 
-__all__ = ['Simulator'] 
\ No newline at end of file
+__all__ = ['CounterEngine', 'RandomStreams', 'Simulator', 'VectorizedEngine'] 
\ No newline at end of file
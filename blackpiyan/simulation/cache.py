@@ -0,0 +1,146 @@
+from typing import Any, Dict, List, Optional
+import hashlib
+import json
+import os
+
+class ResultCache:
+    """
+    以內容定址的模擬結果快取
+    
+    每個條目以影響結果的參數（實際生效的遊戲配置、引擎版本、種子、策略組等）的
+    規範化 JSON 的 SHA-256 為鍵，保存該策略組已模擬的局數和每個策略的點數計數。
+    局數不是鍵的一部分，因此同一組參數的較長運行可以從已保存的局數繼續。
+    每個條目是目錄中的一個小 JSON 文件，讀取時更新其修改時間；超過條目數量或
+    總大小上限時，按修改時間刪除最久未使用的條目 (LRU)。
+    """
+    
+    def __init__(self, directory: str, max_entries: Optional[int] = None, max_bytes: Optional[int] = None):
+        """
+        初始化結果快取
+        
+        Args:
+            directory: 快取目錄
+            max_entries: 最多保留的條目數量，如為None則不限制
+            max_bytes: 所有條目的總大小上限（位元組），如為None則不限制
+        """
+        if max_entries is not None and max_entries <= 0:
+            raise ValueError(f"Maximum number of cache entries must be positive, got {max_entries}")
+        if max_bytes is not None and max_bytes <= 0:
+            raise ValueError(f"Maximum cache size must be positive, got {max_bytes}")
+        self.directory = directory
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+    
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> Optional['ResultCache']:
+        """
+        由 cache 配置建立快取
+        
+        Args:
+            config: 配置字典
+        
+        Returns:
+            結果快取，cache.enabled 為False時返回None
+        """
+        cache_config = config.get('cache', {})
+        if not cache_config.get('enabled', False):
+            return None
+        max_mb = cache_config.get('max_size_mb')
+        return cls(cache_config.get('directory', 'results/cache'),
+                   max_entries=cache_config.get('max_entries'),
+                   max_bytes=int(max_mb * 1024 * 1024) if max_mb is not None else None)
+    
+    @staticmethod
+    def key(parameters: Dict[str, Any]) -> str:
+        """
+        計算參數的規範化雜湊
+        
+        Args:
+            parameters: 可序列化為 JSON 的參數字典
+        
+        Returns:
+            64 個字元的十六進位 SHA-256
+        """
+        canonical = json.dumps(parameters, sort_keys=True, separators=(',', ':'), default=str)
+        return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+    
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        讀取條目並將其標記為最近使用
+        
+        Args:
+            key: 條目的鍵
+        
+        Returns:
+            條目字典（games、strategies、counts），不存在或已損壞時返回None
+        """
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as handle:
+                entry = json.load(handle)
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        return entry
+    
+    def put(self, key: str, entry: Dict[str, Any]) -> None:
+        """
+        寫入條目（先寫入臨時文件再替換，中斷時不會留下不完整的條目），然後按上限淘汰
+        
+        Args:
+            key: 條目的鍵
+            entry: 可序列化為 JSON 的條目字典
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(key)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as handle:
+            json.dump(entry, handle)
+        os.replace(temp_path, path)
+        self.evict()
+    
+    def entries(self) -> List[str]:
+        """
+        列出所有條目的文件路徑
+        
+        Returns:
+            由最久未使用到最近使用排序的路徑列表
+        """
+        if not os.path.isdir(self.directory):
+            return []
+        paths = [os.path.join(self.directory, name) for name in os.listdir(self.directory) if name.endswith('.json')]
+        return sorted(paths, key=os.path.getmtime)
+    
+    def evict(self) -> int:
+        """
+        刪除最久未使用的條目，直到不超過條目數量和總大小上限
+        
+        Returns:
+            刪除的條目數量
+        """
+        paths = self.entries()
+        sizes = [os.path.getsize(path) for path in paths]
+        total = sum(sizes)
+        removed = 0
+        while paths and ((self.max_entries is not None and len(paths) > self.max_entries)
+                         or (self.max_bytes is not None and total > self.max_bytes)):
+            os.remove(paths.pop(0))
+            total -= sizes.pop(0)
+            removed += 1
+        return removed
+    
+    def clear(self) -> None:
+        """刪除所有條目"""
+        for path in self.entries():
+            os.remove(path)
+    
+    def _path(self, key: str) -> str:
+        """返回條目的文件路徑"""
+        return os.path.join(self.directory, f"{key}.json")
+    
+    def __len__(self) -> int:
+        """返回條目數量"""
+        return len(self.entries())
+    
+    def __repr__(self) -> str:
+        return f"ResultCache(directory={self.directory!r}, entries={len(self)})"
@@ -0,0 +1,48 @@
+from typing import Any, Dict, Optional
+import json
+import os
+
+# 檢查點文件格式的版本
+CHECKPOINT_VERSION = 1
+
+def write_checkpoint(path: str, state: Dict[str, Any]) -> None:
+    """
+    以原子方式寫入檢查點
+    
+    先寫入同目錄的臨時文件並同步到磁碟，再以 os.replace 替換，
+    因此進程在任何時刻中斷，磁碟上都只會是上一個或新的完整檢查點。
+    
+    Args:
+        path: 檢查點文件路徑
+        state: 可序列化為 JSON 的檢查點內容
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as handle:
+        json.dump({'version': CHECKPOINT_VERSION, **state}, handle)
+        handle.flush()
+        os.fsync(handle.fileno())
+    os.replace(temp_path, path)
+
+def load_checkpoint(path: str) -> Optional[Dict[str, Any]]:
+    """
+    讀取檢查點
+    
+    Args:
+        path: 檢查點文件路徑
+    
+    Returns:
+        檢查點內容，文件不存在時返回None
+    
+    Raises:
+        ValueError: 如果文件不是此版本的檢查點
+    """
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as handle:
+        state = json.load(handle)
+    if state.get('version') != CHECKPOINT_VERSION:
+        raise ValueError(f"{path} is not a version {CHECKPOINT_VERSION} checkpoint")
+    return state
@@ -0,0 +1,237 @@
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from blackpiyan.model.dealer_table import get_dealer_table
+from blackpiyan.simulation.rng import RandomStreams
+from blackpiyan.simulation.vectorized import RECORDED_COLUMNS, VectorizedEngine
+
+# Philox4x32-10 的乘數與密鑰遞增常數 (Salmon et al., "Parallel Random Numbers: As Easy as 1, 2, 3")
+PHILOX_M0 = np.uint64(0xD2511F53)
+PHILOX_M1 = np.uint64(0xCD9E8D57)
+PHILOX_W0 = np.uint64(0x9E3779B9)
+PHILOX_W1 = np.uint64(0xBB67AE85)
+PHILOX_ROUNDS = 10
+MASK32 = np.uint64(0xFFFFFFFF)
+SHIFT32 = np.uint64(32)
+
+def philox4x32(counters: np.ndarray, key: Sequence[int]) -> np.ndarray:
+    """
+    以 Philox4x32-10 將計數器映射為隨機數
+    
+    輸出只取決於 (計數器, 密鑰)，因此任一位置的隨機數都能直接計算，無需產生之前的序列。
+    
+    Args:
+        counters: 形狀為 (4, m) 的計數器陣列，每列為一個 32 位元字
+        key: 兩個 32 位元字的密鑰
+    
+    Returns:
+        形狀為 (4, m) 的 uint32 隨機數陣列
+    """
+    c0, c1, c2, c3 = (np.asarray(word, dtype=np.uint64) for word in counters)
+    k0, k1 = np.uint64(key[0]), np.uint64(key[1])
+    for round_index in range(PHILOX_ROUNDS):
+        if round_index:
+            k0 = (k0 + PHILOX_W0) & MASK32
+            k1 = (k1 + PHILOX_W1) & MASK32
+        product0 = PHILOX_M0 * c0
+        product1 = PHILOX_M1 * c2
+        c0, c1, c2, c3 = ((product1 >> SHIFT32) ^ c1 ^ k0, product1 & MASK32,
+                          (product0 >> SHIFT32) ^ c3 ^ k1, product0 & MASK32)
+    return np.stack([c0, c1, c2, c3]).astype(np.uint32)
+
+class CounterEngine(VectorizedEngine):
+    """
+    以計數器式隨機數洗牌的向量化引擎
+    
+    每 rounds_per_shoe 局為一個牌靴區段，區段開始時使用新的牌靴。區段內的洗牌規則與
+    VectorizedEngine 相同，第 k 次洗牌的牌序由 Philox 以 (密鑰, 區段序號, k) 直接計算，
+    密鑰由根種子和策略組決定。因此第 g 局只取決於其所在的區段，可以單獨重現
+    （最多重玩 rounds_per_shoe 局），任意切分的區塊也無需協調即可並行模擬。
+    每條通道負責一個區段，區段內的各局依序完成。
+    """
+    
+    def __init__(self, config: Dict[str, Any], seed_sequence: np.random.SeedSequence,
+                 lanes: Optional[int] = None, rounds_per_shoe: Optional[int] = None):
+        """
+        初始化計數器式引擎
+        
+        Args:
+            config: 配置字典
+            seed_sequence: 密鑰的根種子序列，各策略組的密鑰由其衍生
+            lanes: 同時推進的牌靴區段數量，如為None則讀取 simulation.lanes（默認65536）
+            rounds_per_shoe: 每個牌靴區段的局數，如為None則讀取 simulation.rounds_per_shoe（默認256）
+        """
+        super().__init__(config, lanes=lanes)
+        self.seed_sequence = seed_sequence
+        self.rounds_per_shoe = rounds_per_shoe or config.get('simulation', {}).get('rounds_per_shoe', 256)
+        if self.rounds_per_shoe <= 0:
+            raise ValueError(f"Rounds per shoe must be positive, got {self.rounds_per_shoe}")
+        
+        self._base_shoe = np.tile(np.arange(52, dtype=np.int8) % 13 + 1, self.num_decks)
+        self._words = -(-self.shoe_size // 4)
+        self._position_bits = np.uint64(self.shoe_size.bit_length())
+        self._position_mask = np.uint64((1 << self.shoe_size.bit_length()) - 1)
+        self._keys: Dict[int, np.ndarray] = {}
+        self._key = None
+        self._lane_shoes = np.zeros(self.lanes, dtype=np.uint64)
+        self._lane_refills = np.zeros(self.lanes, dtype=np.uint64)
+    
+    def reset(self) -> None:
+        """回到每個策略組的第 0 局"""
+        self._positions: Dict[int, int] = {}
+    
+    def play_multi(self, hit_until_values: Sequence[int], num_games: int,
+                   record: Optional[str] = None) -> Union[np.ndarray, Tuple[np.ndarray, np.ndarray]]:
+        """
+        從上次停下的局繼續，以同一組牌序評估多個補牌策略
+        
+        Args:
+            hit_until_values: 要評估的補牌策略列表
+            num_games: 要玩的局數
+            record: 同時返回的每局欄 (up_card 或 penetration)，如為None則只返回點數
+        
+        Returns:
+            形狀為 (len(hit_until_values), num_games) 的 int8 點數陣列；
+            設置 record 時返回 (點數陣列, 該欄的陣列)
+        """
+        group = RandomStreams.group_id(hit_until_values)
+        first_game = self._positions.get(group, 0)
+        result = self.play_range(hit_until_values, first_game, num_games, record)
+        self._positions[group] = first_game + num_games
+        return result
+    
+    def play_range(self, hit_until_values: Sequence[int], first_game: int, num_games: int,
+                   record: Optional[str] = None) -> Union[np.ndarray, Tuple[np.ndarray, np.ndarray]]:
+        """
+        模擬局序號 [first_game, first_game + num_games) 的各局
+        
+        Args:
+            hit_until_values: 要評估的補牌策略列表（決定密鑰）
+            first_game: 第一局的序號（從0開始）
+            num_games: 要玩的局數
+            record: 同時返回的每局欄 (up_card: 明牌點數 1-13，penetration: 開局時牌靴
+                已發出的比例)，如為None則只返回點數
+        
+        Returns:
+            形狀為 (len(hit_until_values), num_games) 的 int8 點數陣列；
+            設置 record 時返回 (點數陣列, 該欄的陣列)
+        """
+        if first_game < 0:
+            raise ValueError(f"First game must not be negative, got {first_game}")
+        if record is not None and record not in RECORDED_COLUMNS:
+            raise ValueError(f"Unknown recorded column {record}, expected one of {RECORDED_COLUMNS}")
+        thresholds = np.unique(np.asarray(hit_until_values, dtype=np.int8))
+        self._key = self._group_key(hit_until_values)
+        rounds = self.rounds_per_shoe
+        first_shoe = first_game // rounds
+        shoes = np.arange(first_shoe, -(-(first_game + num_games) // rounds), dtype=np.uint64)
+        
+        totals = np.empty((len(thresholds), len(shoes) * rounds), dtype=np.int8)
+        column = np.empty(len(shoes) * rounds, dtype=self._column_dtype(record)) if record else None
+        for start in range(0, len(shoes), self.lanes):
+            n = min(self.lanes, len(shoes) - start)
+            self._lane_shoes[:n] = shoes[start:start + n]
+            self._lane_refills[:n] = 0
+            # 游標超出牌靴使每個區段的第一局先洗牌
+            self._cursors[:n] = self.shoe_size + 1
+            
+            block = np.empty((len(thresholds), rounds, n), dtype=np.int8)
+            column_block = np.empty((rounds, n), dtype=column.dtype) if record else None
+            for round_index in range(rounds):
+                block[:, round_index] = self._play_round(thresholds, n)
+                if record:
+                    column_block[round_index] = self._round_column(record)
+            totals[:, start * rounds:(start + n) * rounds] = block.transpose(0, 2, 1).reshape(len(thresholds), -1)
+            if record:
+                column[start * rounds:(start + n) * rounds] = column_block.T.reshape(-1)
+        
+        offset = first_game - first_shoe * rounds
+        totals = totals[:, offset:offset + num_games]
+        totals = totals[np.searchsorted(thresholds, hit_until_values)]
+        return (totals, column[offset:offset + num_games]) if record else totals
+    
+    def replay(self, hit_until_values: Sequence[int], game_index: int) -> List[int]:
+        """
+        單獨重現一局，成本只與 rounds_per_shoe 有關
+        
+        Args:
+            hit_until_values: 原運行的補牌策略列表
+            game_index: 局序號（從0開始）
+        
+        Returns:
+            各策略在該局的莊家最終點數，順序與 hit_until_values 相同
+        """
+        if game_index < 0:
+            raise ValueError(f"Game index must not be negative, got {game_index}")
+        thresholds = sorted(set(hit_until_values))
+        key = self._group_key(hit_until_values)
+        shoe, target_round = divmod(game_index, self.rounds_per_shoe)
+        table = get_dealer_table(thresholds[-1])
+        next_state, state_totals = table.next_state_list, table.totals_list
+        
+        def shuffled(refill: int) -> List[int]:
+            return self._shuffled_shoes(key, np.array([shoe], dtype=np.uint64),
+                                        np.array([refill], dtype=np.uint64))[0].tolist()
+        
+        refills = 0
+        cards, cursor = None, self.shoe_size + 1
+        for _ in range(target_round + 1):
+            if cursor > self._round_cursor_limit:
+                cards, cursor = shuffled(refills), 0
+                refills += 1
+            state = next_state[next_state[0][cards[cursor]]][cards[cursor + 1]]
+            cursor += 2
+            
+            results = [None] * len(thresholds)
+            while True:
+                total = state_totals[state]
+                for i, threshold in enumerate(thresholds):
+                    if results[i] is None and total >= threshold:
+                        results[i] = total
+                if results[-1] is not None:
+                    break
+                if cursor > self._hit_cursor_limit:
+                    cards, cursor = shuffled(refills), 0
+                    refills += 1
+                state = next_state[state][cards[cursor]]
+                cursor += 1
+        
+        return [results[thresholds.index(value)] for value in hit_until_values]
+    
+    def _group_key(self, hit_until_values: Sequence[int]) -> np.ndarray:
+        """返回策略組的 Philox 密鑰"""
+        group = RandomStreams.group_id(hit_until_values)
+        if group not in self._keys:
+            sequence = np.random.SeedSequence(self.seed_sequence.entropy,
+                                              spawn_key=self.seed_sequence.spawn_key + (group,))
+            self._keys[group] = sequence.generate_state(2, dtype=np.uint32)
+        return self._keys[group]
+    
+    def _shuffled_shoes(self, key: np.ndarray, shoes: np.ndarray, refills: np.ndarray) -> np.ndarray:
+        """
+        計算各 (區段, 洗牌次數) 的牌序
+        
+        計數器為 (字序號, 洗牌次數, 區段低32位, 區段高32位)，每個牌位得到一個 32 位元隨機鍵，
+        按鍵排序即為均勻的隨機排列。牌位序號放在鍵的低位一起排序，以值排序代替較慢的
+        argsort，相同的鍵也按位置排序，以保證可重現。
+        """
+        n = len(shoes)
+        words = np.arange(self._words, dtype=np.uint64)
+        counters = np.empty((4, n, self._words), dtype=np.uint64)
+        counters[0] = words
+        counters[1] = refills[:, None]
+        counters[2] = (shoes & MASK32)[:, None]
+        counters[3] = (shoes >> SHIFT32)[:, None]
+        random_keys = philox4x32(counters.reshape(4, -1), key)
+        random_keys = random_keys.reshape(4, n, self._words).transpose(1, 2, 0).reshape(n, -1)[:, :self.shoe_size]
+        sort_keys = (random_keys.astype(np.uint64) << self._position_bits) | np.arange(self.shoe_size, dtype=np.uint64)
+        sort_keys.sort(axis=1)
+        return self._base_shoe[(sort_keys & self._position_mask).astype(np.intp)]
+    
+    def _reshuffle(self, lanes: np.ndarray) -> None:
+        """以各通道的區段序號和洗牌次數重新計算牌序並將游標歸零"""
+        if lanes.size:
+            self._shoes[lanes] = self._shuffled_shoes(self._key, self._lane_shoes[lanes], self._lane_refills[lanes])
+            self._lane_refills[lanes] += np.uint64(1)
+            self._cursors[lanes] = 0
@@ -0,0 +1,149 @@
+from concurrent.futures import Executor, ProcessPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+import os
+
+import numpy as np
+
+from blackpiyan.analysis.aggregate import OutcomeAggregate
+from blackpiyan.game.blackjack import BlackjackGame
+from blackpiyan.model.shoe_library import ShoeLibrary
+from blackpiyan.simulation.counter import CounterEngine
+from blackpiyan.simulation.vectorized import VectorizedEngine
+
+def resolve_workers(workers: Optional[int]) -> int:
+    """
+    解析工作進程數量
+    
+    Args:
+        workers: 工作進程數量，0 表示使用所有 CPU 核心，None 表示不使用進程池
+    
+    Returns:
+        實際使用的工作進程數量 (至少為1)
+    """
+    if workers is None:
+        return 1
+    if workers < 0:
+        raise ValueError(f"Number of workers must not be negative, got {workers}")
+    if workers == 0:
+        return os.cpu_count() or 1
+    return workers
+
+@contextmanager
+def process_pool(workers: int) -> Iterator[Optional[Executor]]:
+    """
+    為整個運行創建一次進程池，結束時關閉
+    
+    分批調用 run_parallel 的運行應在此上下文中傳入同一個進程池，
+    避免每批都重新啟動工作進程。
+    
+    Args:
+        workers: 工作進程數量，為1時不創建進程池
+    
+    Yields:
+        進程池，workers 為1時為 None
+    """
+    if workers <= 1:
+        yield None
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        yield executor
+
+def split_games(num_games: int, chunk_size: int) -> List[int]:
+    """
+    將局數切分為不超過 chunk_size 的區塊
+    
+    Args:
+        num_games: 總局數
+        chunk_size: 每個區塊的最大局數
+    
+    Returns:
+        每個區塊的局數列表
+    """
+    if chunk_size <= 0:
+        raise ValueError(f"Chunk size must be positive, got {chunk_size}")
+    full, remainder = divmod(num_games, chunk_size)
+    return [chunk_size] * full + ([remainder] if remainder else [])
+
+def simulate_chunk(config: Dict[str, Any], strategies: Sequence[int], num_games: int,
+                   seed_sequence: np.random.SeedSequence, first_game: Optional[int] = None,
+                   shoe_range: Optional[Tuple[int, int]] = None, aggregate: bool = False) -> np.ndarray:
+    """
+    在工作進程中模擬一個區塊
+    
+    每個區塊使用自己的牌靴和由 seed_sequence 產生的獨立隨機數流。
+    如指定 first_game，則以 CounterEngine 模擬該策略組的第 first_game 局起的各局，
+    seed_sequence 為所有區塊共用的密鑰根序列。如指定 shoe_range，則依序使用
+    simulation.shoe_library 中該範圍的牌靴（以記憶體映射讀取）。
+    
+    Args:
+        config: 配置字典
+        strategies: 補牌策略列表，多於一個時以共用牌序一次模擬
+        num_games: 區塊局數
+        seed_sequence: 此區塊的隨機種子序列
+        first_game: 計數器式隨機數下區塊第一局的序號
+        shoe_range: 此區塊使用的牌靴庫範圍 [start, stop)
+        aggregate: 是否只返回點數計數而非每局點數
+    
+    Returns:
+        形狀為 (len(strategies), num_games) 的 int8 點數陣列，
+        aggregate 為 True 時為形狀 (len(strategies), OutcomeAggregate.NUM_BINS) 的計數陣列
+    """
+    rng = np.random.default_rng(seed_sequence)
+    engine = config.get('simulation', {}).get('engine', 'scalar')
+    library_path = config.get('simulation', {}).get('shoe_library')
+    
+    def open_library(ranks: bool) -> Optional[ShoeLibrary]:
+        return ShoeLibrary(library_path, *shoe_range, ranks=ranks) if shoe_range is not None else None
+    
+    if first_game is not None:
+        # 每條通道負責一個牌靴區段
+        rounds_per_shoe = config.get('simulation', {}).get('rounds_per_shoe', 256)
+        lanes = min(config.get('simulation', {}).get('lanes', 65536), -(-num_games // rounds_per_shoe) + 1)
+        totals = CounterEngine(config, seed_sequence, lanes=lanes).play_range(strategies, first_game, num_games)
+    elif engine == 'vectorized' or len(strategies) > 1:
+        # 每條通道約玩一輪完整牌靴，避免為小區塊初始化過多牌靴
+        lanes = min(config.get('simulation', {}).get('lanes', 65536), max(1, num_games // 64))
+        vector_engine = VectorizedEngine(config, lanes=lanes, rng=rng, shoe_library=open_library(ranks=True))
+        totals = vector_engine.play_multi(strategies, num_games)
+    else:
+        game = BlackjackGame(config, rng=rng, shoe_library=open_library(ranks=False))
+        game.set_dealer_strategy(strategies[0])
+        totals = np.fromiter(
+            (game.play_single_round()['dealer_hand_value'] for _ in range(num_games)),
+            dtype=np.int8, count=num_games
+        ).reshape(1, num_games)
+    
+    if aggregate:
+        return np.stack([OutcomeAggregate.from_totals(row).counts for row in totals])
+    return totals
+
+def run_parallel(config: Dict[str, Any], tasks: List[Tuple[Sequence[int], int, np.random.SeedSequence,
+                                                           Optional[int], Optional[Tuple[int, int]]]],
+                 workers: int, aggregate: bool = False, executor: Optional[Executor] = None) -> List[np.ndarray]:
+    """
+    在進程池中執行模擬區塊
+    
+    每個區塊的結果只取決於其策略、局數和種子序列，與工作進程數量和執行順序無關。
+    
+    Args:
+        config: 配置字典
+        tasks: (策略列表, 局數, 種子序列, 第一局序號, 牌靴庫範圍) 區塊列表，後兩項見 simulate_chunk
+        workers: 工作進程數量，為1時在當前進程中依序執行
+        aggregate: 是否只返回每個區塊的點數計數
+        executor: 由 process_pool 創建的進程池，如為None則為本次調用創建一個
+    
+    Returns:
+        與 tasks 順序相同的點數陣列（或計數陣列）列表
+    """
+    if workers <= 1:
+        return [simulate_chunk(config, *task, aggregate=aggregate) for task in tasks]
+    if executor is None:
+        with process_pool(workers) as executor:
+            return run_parallel(config, tasks, workers, aggregate, executor)
+    
+    futures = [
+        executor.submit(simulate_chunk, config, *task, aggregate=aggregate)
+        for task in tasks
+    ]
+    return [future.result() for future in futures]
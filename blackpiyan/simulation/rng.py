@@ -0,0 +1,73 @@
+from typing import Iterable, Optional
+
+import numpy as np
+
+# 隨機數流的種類：模擬器自身（逐批模擬）使用的流、按區塊分派的流、計數器式牌靴的密鑰，
+# 參數掃描的區塊（以情境參數的雜湊代替策略組），以及多進程比賽模式每輪的根種子（以輪次代替區塊序號）
+STREAM_ENGINE = 0
+STREAM_CHUNK = 1
+STREAM_COUNTER = 2
+STREAM_SWEEP = 3
+STREAM_RACE = 4
+
+class RandomStreams:
+    """
+    可重現且互不重疊的隨機數流
+    
+    每個流的 SeedSequence 由根種子和固定長度的鍵 (種類, 策略組, 區塊序號)
+    直接構造（等同於 SeedSequence.spawn 產生的子序列），與產生順序、工作進程
+    數量無關。因此同一根種子下，任一區塊都可以單獨重新產生並得到逐位相同的結果。
+    """
+    
+    def __init__(self, seed: Optional[int] = None):
+        """
+        初始化隨機數流
+        
+        Args:
+            seed: 根種子，如為None則從系統熵取得（可由 seed 屬性讀回以重現）
+        """
+        if seed is not None and seed < 0:
+            raise ValueError(f"Seed must not be negative, got {seed}")
+        self.root = np.random.SeedSequence(seed)
+        self.seed = self.root.entropy
+    
+    def seed_sequence(self, kind: int, group: int, index: int) -> np.random.SeedSequence:
+        """
+        返回指定鍵的種子序列
+        
+        Args:
+            kind: 流的種類 (STREAM_ENGINE、STREAM_CHUNK、STREAM_COUNTER、STREAM_SWEEP 或 STREAM_RACE)
+            group: 策略組編號，見 group_id
+            index: 區塊序號
+        
+        Returns:
+            種子序列
+        """
+        return np.random.SeedSequence(self.root.entropy, spawn_key=self.root.spawn_key + (kind, group, index))
+    
+    def generator(self, kind: int, group: int = 0, index: int = 0) -> np.random.Generator:
+        """
+        返回指定鍵的隨機數產生器
+        
+        Args:
+            kind: 流的種類
+            group: 策略組編號
+            index: 區塊序號
+        
+        Returns:
+            隨機數產生器
+        """
+        return np.random.default_rng(self.seed_sequence(kind, group, index))
+    
+    @staticmethod
+    def group_id(strategies: Iterable[int]) -> int:
+        """
+        返回一組策略的編號：以策略值為位的位元遮罩，與順序無關且每組唯一
+        
+        Args:
+            strategies: 策略值列表
+        
+        Returns:
+            策略組編號
+        """
+        return sum(1 << strategy for strategy in set(strategies))
@@ -1,72 +1,224 @@
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+import os
 import time
 
+import numpy as np
+
+from blackpiyan.analysis.aggregate import JOINT_AGGREGATES, OutcomeAggregate
+from blackpiyan.analysis.result_batch import ResultBatch
 from blackpiyan.config.config_manager import ConfigManager
 from blackpiyan.game.blackjack import BlackjackGame
+from blackpiyan.model.shoe_library import ShoeLibrary
+from blackpiyan.simulation.cache import ResultCache
+from blackpiyan.simulation.checkpoint import load_checkpoint, write_checkpoint
+from blackpiyan.simulation.counter import CounterEngine
+from blackpiyan.simulation.parallel import process_pool, resolve_workers, run_parallel, split_games
+from blackpiyan.simulation.rng import STREAM_CHUNK, STREAM_COUNTER, STREAM_ENGINE, STREAM_RACE, RandomStreams
+from blackpiyan.simulation.vectorized import RECORDED_COLUMNS, VectorizedEngine
 from blackpiyan.utils.logger import Logger
 
+# 模擬結果的版本：任何改變相同參數和種子下模擬結果的修改都應遞增，使舊的快取條目失效
+ENGINE_VERSION = 1
+
 class Simulator:
     """模擬器類，用於運行大量21點遊戲並收集數據"""
     
-    def __init__(self, config: Dict[str, Any]):
+    ENGINES = ('scalar', 'vectorized')
+    
+    def __init__(self, config: Dict[str, Any], workers: Optional[int] = None):
         """
         初始化模擬器
         
         Args:
             config: 配置字典
+            workers: run_multiple_strategies 使用的工作進程數量，0 表示使用所有 CPU 核心，
+                如為None則讀取 simulation.workers（默認1，即不使用進程池）
         """
         self.config = config
         self.logger = Logger(config).get_logger(__name__)
-        self.game = BlackjackGame(config)
+        sim_config = config.get('simulation', {})
+        
+        # 隨機數流：設置 simulation.seed 時所有結果可逐位重現
+        self.seed = sim_config.get('seed')
+        self.streams = RandomStreams(self.seed)
+        
+        # 牌靴庫：每次運行（每個策略）都從頭依序使用磁碟上相同的牌靴
+        self.shoe_library = sim_config.get('shoe_library')
+        self.counter_rng = sim_config.get('counter_rng', False)
+        if self.shoe_library and self.counter_rng:
+            raise ValueError("simulation.shoe_library cannot be combined with simulation.counter_rng")
+        self._shoe_sources: List[ShoeLibrary] = []
+        self.game = BlackjackGame(config, rng=self.streams.generator(STREAM_ENGINE, 0),
+                                  shoe_library=self._open_shoe_library(ranks=False))
+        
+        # 模擬引擎: scalar 逐局模擬，vectorized 以陣列同時推進多個牌靴
+        self.engine = sim_config.get('engine', 'scalar')
+        if self.engine not in self.ENGINES:
+            raise ValueError(f"Engine must be one of {self.ENGINES}, got {self.engine}")
+        
+        # 計數器式隨機數：每局可按 (策略, 局序號) 單獨重現，總是使用向量化引擎
+        use_vector_engine = self.engine == 'vectorized' or self.counter_rng
+        self.vector_engine = self._create_vector_engine() if use_vector_engine else None
+        
+        # 每局額外記錄的欄：莊家明牌 (up_card) 或開局時的牌靴滲透率 (penetration)，
+        # 聚合模式按該欄分組計數 (UpCardAggregate / PenetrationAggregate)；
+        # 記錄時在當前進程中模擬，不使用區塊、進程池和結果快取
+        self.record_up_card = sim_config.get('record_up_card', False)
+        self.record_penetration = sim_config.get('record_penetration', False)
+        if self.record_up_card and self.record_penetration:
+            raise ValueError("simulation.record_up_card cannot be combined with simulation.record_penetration")
+        self.record_column = 'up_card' if self.record_up_card else 'penetration' if self.record_penetration else None
+        self.aggregate_type = JOINT_AGGREGATES.get(self.record_column, OutcomeAggregate)
+        
+        # 多進程設置
+        self.workers = resolve_workers(workers if workers is not None else sim_config.get('workers', 1))
+        self.chunk_size = sim_config.get('chunk_size', 1000000)
+        
+        # 結果快取：設置種子（或 cache.unseeded 為True）時按參數雜湊重用已模擬的局數
+        self.cache = ResultCache.from_config(config)
+        self.cache_unseeded = config.get('cache', {}).get('unseeded', False)
+        
+        # 檢查點：每隔 checkpoint_interval 秒保存進度，中斷後可用 Simulator.resume 繼續
+        self.checkpoint_interval = sim_config.get('checkpoint_interval')
+        
+        # 最近一次 iter_batches 各策略達到的每秒局數
+        self.throughput: Dict[int, float] = {}
+        
+        # 最近一次 run_race 的結果：仍未被排除的策略，以及被排除的策略到其被排除的輪次
+        self.race_survivors: List[int] = []
+        self.race_eliminated: Dict[int, int] = {}
     
-    def run_simulation(self, strategy_value: int, num_games: int) -> List[Dict[str, Any]]:
+    def simulate_outcomes(self, strategy_value: int, num_games: int,
+                          record: Optional[str] = None) -> Tuple[np.ndarray, ...]:
         """
-        使用指定策略運行多局遊戲
+        使用指定策略運行多局遊戲，只返回結果陣列
         
         Args:
             strategy_value: 莊家補牌策略值
             num_games: 要運行的遊戲局數
-            
+            record: 同時返回的每局欄 (up_card: 莊家明牌點數 1-13，penetration: 開局時
+                牌靴已發出的比例)，如為None則不返回
+        
         Returns:
-            遊戲結果列表
+            一個包含兩個元素的元組:
+            - 每局莊家最終點數 (int8 陣列)
+            - 每局莊家是否爆牌 (bool 陣列)
+            設置 record 時另加第三個元素：該欄的陣列
         """
-        self.logger.info(f"開始模擬策略 {strategy_value}，共 {num_games} 局")
-        start_time = time.time()
-        
-        # 設置莊家策略
+        # 設置莊家策略（同時驗證策略值）
         self.game.set_dealer_strategy(strategy_value)
         
-        # 運行模擬並收集結果
-        results = []
+        if self.vector_engine is not None:
+            if record:
+                totals, column = self.vector_engine.play_multi([strategy_value], num_games, record=record)
+                return totals[0], totals[0] > 21, column
+            return self.vector_engine.play(strategy_value, num_games)
+        
+        if record is not None and record not in RECORDED_COLUMNS:
+            raise ValueError(f"Unknown recorded column {record}, expected one of {RECORDED_COLUMNS}")
+        totals = np.empty(num_games, dtype=np.int8)
+        column = np.empty(num_games, dtype=np.float32 if record == 'penetration' else np.int8) if record else None
         for i in range(num_games):
             result = self.game.play_single_round()
-            results.append({
-                'strategy': strategy_value,
-                'game_id': i + 1,
-                'dealer_hand_value': result['dealer_hand_value'],
-                'is_dealer_busted': result['is_dealer_busted']
-            })
+            totals[i] = result['dealer_hand_value']
+            if record == 'up_card':
+                column[i] = result['dealer_hand'][0].value
+            elif record:
+                column[i] = result['penetration']
             
             # 每1000局記錄進度
             if (i + 1) % 1000 == 0:
                 self.logger.debug(f"策略 {strategy_value} 已完成 {i + 1} 局")
         
+        return (totals, totals > 21, column) if record else (totals, totals > 21)
+    
+    def simulate_shared_outcomes(self, strategies: List[int], num_games: int,
+                                 record: Optional[str] = None) -> Dict[int, Tuple[np.ndarray, ...]]:
+        """
+        以同一組牌序一次模擬多個策略（共用隨機數）
+        
+        每局按最高的策略值發牌，並記錄每個策略在該牌序下的最終點數，
+        因此多個策略的成本與模擬單一最高策略相近。此模式總是使用向量化引擎。
+        
+        Args:
+            strategies: 要測試的補牌策略列表
+            num_games: 每個策略要運行的遊戲局數
+            record: 同時返回的每局欄 (up_card 或 penetration，所有策略相同)
+        
+        Returns:
+            策略映射到 (點數陣列, 爆牌陣列) 的字典，設置 record 時另加該欄的陣列
+        """
+        # 驗證所有策略值，並將遊戲策略設為實際發牌使用的最高值
+        for strategy in strategies:
+            self.game.dealer.set_strategy(strategy)
+        self.game.set_dealer_strategy(max(strategies))
+        
+        if self.vector_engine is None:
+            self.vector_engine = self._create_vector_engine()
+        
+        if record:
+            totals, column = self.vector_engine.play_multi(strategies, num_games, record=record)
+            return {strategy: (totals[i], totals[i] > 21, column) for i, strategy in enumerate(strategies)}
+        totals = self.vector_engine.play_multi(strategies, num_games)
+        return {strategy: (totals[i], totals[i] > 21) for i, strategy in enumerate(strategies)}
+    
+    def run_simulation(self, strategy_value: int, num_games: int) -> ResultBatch:
+        """
+        使用指定策略運行多局遊戲
+        
+        Args:
+            strategy_value: 莊家補牌策略值
+            num_games: 要運行的遊戲局數
+        
+        Returns:
+            列式結果批次（可像結果列表一樣索引和迭代）
+        """
+        self.logger.info(f"開始模擬策略 {strategy_value}，共 {num_games} 局")
+        start_time = time.time()
+        
+        totals, busted, *column = self.simulate_outcomes(strategy_value, num_games, self.record_column)
+        
+        # 收集結果
+        results = ResultBatch(strategy_value, totals, busted, **({self.record_column: column[0]} if column else {}))
+        
         elapsed_time = time.time() - start_time
         self.logger.info(f"策略 {strategy_value} 模擬完成，用時 {elapsed_time:.2f} 秒")
         
         return results
     
-    def run_multiple_strategies(self, strategies: List[int], games_per_strategy: int) -> Dict[int, List[Dict[str, Any]]]:
+    def run_multiple_strategies(self, strategies: List[int], games_per_strategy: int,
+                                shared_cards: Optional[bool] = None) -> Dict[int, ResultBatch]:
         """
         模擬多個策略
         
         Args:
             strategies: 要測試的補牌策略列表
             games_per_strategy: 每個策略要模擬的局數
-            
+            shared_cards: 是否讓所有策略共用同一組牌序（一次完成所有策略），
+                如為None則讀取 simulation.shared_cards（默認False）
+        
         Returns:
-            策略映射到結果列表的字典
+            策略映射到列式結果批次的字典
         """
+        if shared_cards is None:
+            shared_cards = self.config.get('simulation', {}).get('shared_cards', False)
+        
+        if self._chunked or shared_cards:
+            mode = f"{self.workers} 個工作進程" if self._chunked else "共用牌序"
+            self.logger.info(f"以{mode}模擬策略 {strategies}，每種策略 {games_per_strategy} 局")
+            start_time = time.time()
+            if self._chunked:
+                outcomes = self.simulate_parallel_outcomes(strategies, games_per_strategy, shared_cards)
+            else:
+                outcomes = self.simulate_shared_outcomes(strategies, games_per_strategy, self.record_column)
+            results = {
+                strategy: ResultBatch(strategy, totals, busted, **({self.record_column: column[0]} if column else {}))
+                for strategy, (totals, busted, *column) in outcomes.items()
+            }
+            elapsed_time = time.time() - start_time
+            self.logger.info(f"模擬完成，用時 {elapsed_time:.2f} 秒")
+            return results
+        
         results = {}
         
         for strategy in strategies:
@@ -75,6 +227,821 @@ class Simulator:
             results[strategy] = strategy_results
             
             # 重置遊戲狀態，準備下一個策略
-            self.game.reset()
+            self.reset()
+        
+        return results
+    
+    def simulate_parallel_outcomes(self, strategies: List[int], games_per_strategy: int,
+                                   shared_cards: bool = False) -> Dict[int, Tuple[np.ndarray, np.ndarray]]:
+        """
+        在進程池中模擬多個策略，只返回結果陣列
+        
+        每個策略（共用牌序時為整組策略）切分為多個區塊分派給工作進程，
+        每個區塊使用獨立的牌靴與隨機數流。工作進程只返回 int8 點數陣列，
+        由主進程按區塊順序拼接。設置種子時區塊劃分只取決於 chunk_size，
+        結果與工作進程數量無關。
+        
+        Args:
+            strategies: 要測試的補牌策略列表
+            games_per_strategy: 每個策略要模擬的局數
+            shared_cards: 是否讓所有策略共用同一組牌序
         
-        return results 
\ No newline at end of file
+        Returns:
+            策略映射到 (點數陣列, 爆牌陣列) 的字典
+        """
+        groups, chunks, tasks = self._parallel_tasks(strategies, games_per_strategy, shared_cards)
+        chunk_totals = run_parallel(self.config, tasks, self.workers)
+        
+        outcomes = {}
+        for i, group in enumerate(groups):
+            totals = np.concatenate(chunk_totals[i * len(chunks):(i + 1) * len(chunks)], axis=1)
+            for row, strategy in enumerate(group):
+                outcomes[strategy] = (totals[row], totals[row] > 21)
+        return outcomes
+    
+    def run_aggregate(self, strategies: List[int], games_per_strategy: int,
+                      shared_cards: Optional[bool] = None) -> Dict[int, OutcomeAggregate]:
+        """
+        模擬多個策略，只保留每個策略的點數計數
+        
+        以不超過 chunk_size 局的批次模擬並即時累加到聚合計數，不保留每局結果，
+        記憶體用量與模擬局數無關。多進程時每個區塊在工作進程內完成計數。
+        
+        Args:
+            strategies: 要測試的補牌策略列表
+            games_per_strategy: 每個策略要模擬的局數
+            shared_cards: 是否讓所有策略共用同一組牌序，
+                如為None則讀取 simulation.shared_cards（默認False）
+        
+        Returns:
+            策略映射到聚合計數的字典，可直接傳給 Analyzer
+        """
+        if shared_cards is None:
+            shared_cards = self.config.get('simulation', {}).get('shared_cards', False)
+        
+        strategies = list(dict.fromkeys(strategies))
+        self.logger.info(f"以聚合模式模擬策略 {strategies}，每種策略 {games_per_strategy} 局")
+        start_time = time.time()
+        aggregates = {strategy: self.aggregate_type() for strategy in strategies}
+        
+        if self.cache_enabled:
+            for delta in self.iter_cached(strategies, games_per_strategy, shared_cards):
+                for strategy, aggregate in delta.items():
+                    aggregates[strategy].merge(aggregate)
+        elif self._chunked:
+            _, _, tasks = self._parallel_tasks(strategies, games_per_strategy, shared_cards)
+            chunk_counts = run_parallel(self.config, tasks, self.workers, aggregate=True)
+            for (group, *_), counts in zip(tasks, chunk_counts):
+                for row, strategy in enumerate(group):
+                    aggregates[strategy].merge(OutcomeAggregate(counts[row]))
+        elif shared_cards:
+            for batch in split_games(games_per_strategy, self.chunk_size):
+                outcomes = self.simulate_shared_outcomes(strategies, batch, self.record_column)
+                for strategy, (totals, _, *column) in outcomes.items():
+                    aggregates[strategy].add(totals, *column)
+        else:
+            for strategy in strategies:
+                for batch in split_games(games_per_strategy, self.chunk_size):
+                    totals, _, *column = self.simulate_outcomes(strategy, batch, self.record_column)
+                    aggregates[strategy].add(totals, *column)
+                self.reset()
+        
+        elapsed_time = time.time() - start_time
+        self.logger.info(f"模擬完成，用時 {elapsed_time:.2f} 秒")
+        return aggregates
+    
+    @property
+    def cache_enabled(self) -> bool:
+        """是否使用結果快取（已配置快取、不額外記錄每局欄，且設置了種子或允許快取未設種子的運行）"""
+        return (self.cache is not None and self.record_column is None
+                and (self.seed is not None or self.cache_unseeded))
+    
+    def iter_cached(self, strategies: List[int], games_per_strategy: int,
+                    shared_cards: bool = False) -> Iterator[Dict[int, OutcomeAggregate]]:
+        """
+        從結果快取繼續模擬，逐區塊產生聚合計數
+        
+        每個策略（共用牌序時為整組策略）先產生快取中已有的計數，再只模擬缺少的局數，
+        完成後將總計數寫回快取。快取的局數剛好等於所需局數時不做任何模擬；多於所需
+        局數或無法從該局數繼續時（見 can_continue_from）從頭模擬，且不覆蓋較長的條目。
+        
+        Args:
+            strategies: 要測試的補牌策略列表
+            games_per_strategy: 每個策略要模擬的總局數
+            shared_cards: 是否讓所有策略共用同一組牌序
+        
+        Yields:
+            策略映射到新增聚合計數的字典（第一項可能是快取中的計數）
+        """
+        if self.cache is None:
+            raise RuntimeError("Result cache is not enabled, set cache.enabled in the configuration")
+        self._require_plain_counts('Cached runs')
+        
+        strategies = list(dict.fromkeys(strategies))
+        groups = [strategies] if shared_cards else [[strategy] for strategy in strategies]
+        for group in groups:
+            key = self.cache_key(group, shared_cards)
+            entry = self.cache.get(key)
+            totals = {strategy: OutcomeAggregate() for strategy in group}
+            start = 0
+            if entry is not None and entry['games'] <= games_per_strategy and self.can_continue_from(entry['games']):
+                start = entry['games']
+                cached = dict(zip(entry['strategies'], entry['counts']))
+                totals = {strategy: OutcomeAggregate(cached[strategy]) for strategy in group}
+                self.logger.info(f"策略 {group} 從快取讀取 {start} 局，需再模擬 {games_per_strategy - start} 局")
+                yield {strategy: aggregate.copy() for strategy, aggregate in totals.items()}
+            if start == games_per_strategy:
+                continue
+            
+            # 以與完整運行相同的區塊劃分模擬缺少的局數，每次向同一進程池分派一輪工作進程數量的區塊
+            _, _, tasks = self._parallel_tasks(group, games_per_strategy - start, shared_cards, first_game=start)
+            step = max(1, self.workers)
+            with process_pool(self.workers) as executor:
+                for i in range(0, len(tasks), step):
+                    for counts in run_parallel(self.config, tasks[i:i + step], self.workers, aggregate=True,
+                                               executor=executor):
+                        delta = {strategy: OutcomeAggregate(counts[row]) for row, strategy in enumerate(group)}
+                        for strategy, aggregate in delta.items():
+                            totals[strategy].merge(aggregate)
+                        yield delta
+            
+            if entry is None or entry['games'] <= games_per_strategy:
+                self.cache.put(key, {
+                    'games': games_per_strategy,
+                    'strategies': group,
+                    'counts': [totals[strategy].counts.tolist() for strategy in group],
+                })
+    
+    def cache_key(self, strategies: List[int], shared_cards: bool) -> str:
+        """
+        返回策略組在結果快取中的鍵
+        
+        鍵由實際生效的遊戲配置、影響結果的模擬配置（引擎、種子、區塊劃分、牌靴庫的
+        路徑、大小和修改時間等）、ENGINE_VERSION 和策略組決定，不包含局數。
+        
+        Args:
+            strategies: 策略組（共用牌序時為整組策略，否則為單一策略）
+            shared_cards: 是否共用牌序
+        
+        Returns:
+            快取鍵
+        """
+        sim_config = self.config.get('simulation', {})
+        game_config = self.config.get('game', {})
+        library = None
+        if self.shoe_library:
+            stat = os.stat(self.shoe_library)
+            library = {'path': os.path.abspath(self.shoe_library), 'size': stat.st_size, 'mtime': stat.st_mtime_ns}
+        return ResultCache.key({
+            'engine_version': ENGINE_VERSION,
+            'game': {
+                'decks': game_config.get('decks', 6),
+                'reshuffle_threshold': game_config.get('reshuffle_threshold', 0.4),
+            },
+            'simulation': {
+                'engine': self.engine,
+                'seed': self.seed,
+                'counter_rng': self.counter_rng,
+                'rounds_per_shoe': sim_config.get('rounds_per_shoe', 256),
+                'chunk_size': self.chunk_size,
+                'lanes': sim_config.get('lanes', 65536),
+                'shoe_batch': sim_config.get('shoe_batch', 4096),
+                'shoe_library': library,
+            },
+            'strategies': sorted(strategies),
+            'shared_cards': shared_cards,
+        })
+    
+    def can_continue_from(self, first_game: int) -> bool:
+        """
+        是否可以從第 first_game 局繼續一次運行
+        
+        設置種子時，繼續的部分必須與一次完整運行的對應部分逐位相同：計數器式隨機數
+        總是可以，區塊式隨機數流要求 first_game 為 chunk_size 的倍數，牌靴庫的分片
+        取決於總區塊數，因此無法繼續。未設種子時只要求各部分互不重複。
+        
+        Args:
+            first_game: 已模擬的局數
+        
+        Returns:
+            是否可以繼續
+        """
+        if first_game == 0:
+            return True
+        if self.shoe_library:
+            return False
+        return self.counter_rng or self.seed is None or first_game % self.chunk_size == 0
+    
+    def checkpoint_path(self, suffix: Optional[str] = None) -> str:
+        """
+        返回檢查點文件路徑
+        
+        Args:
+            suffix: 加在文件名後的後綴（例如 GUI 每個策略各用一個檢查點）
+        
+        Returns:
+            simulation.checkpoint_file，未設置時為 output.data_dir 下的 checkpoint.json
+        """
+        path = self.config.get('simulation', {}).get('checkpoint_file') or os.path.join(
+            self.config.get('output', {}).get('data_dir', 'results/data'), 'checkpoint.json')
+        if suffix:
+            root, extension = os.path.splitext(path)
+            path = f"{root}_{suffix}{extension}"
+        return path
+    
+    def iter_checkpointed(self, strategies: List[int], games_per_strategy: int, shared_cards: bool = False,
+                          path: Optional[str] = None, resume: bool = True) -> Iterator[Dict[int, OutcomeAggregate]]:
+        """
+        以可從中斷處繼續的方式模擬多個策略，逐區塊產生聚合計數
+        
+        運行按 chunk_size 切分為固定的區塊，每個區塊的隨機數流只由 (根種子, 策略組, 區塊序號)
+        決定，因此隨機數產生器的完整狀態就是根種子和已完成的區塊數；未設置種子時以本次的
+        系統熵作為根種子。每隔 checkpoint_interval 秒（默認60秒）、結束時，以及調用方提前停止
+        （關閉生成器）或模擬出錯時，將根種子、已完成的區塊數、各策略的聚合計數和配置以原子方式
+        寫入檢查點；已產生的批次都計入已完成的區塊。resume 為 True 且檢查點屬於
+        相同的運行（相同的配置、策略、局數和共用牌序設置）且尚未完成時，先產生已完成的計數，
+        再只模擬其餘區塊，最終結果與未中斷的運行逐位相同；已完成的檢查點不被重用，運行重新開始。
+        中斷時最多損失每個工作進程正在模擬的一個區塊。
+        
+        Args:
+            strategies: 要測試的補牌策略列表
+            games_per_strategy: 每個策略要模擬的局數
+            shared_cards: 是否讓所有策略共用同一組牌序
+            path: 檢查點文件路徑，如為None則使用 checkpoint_path()
+            resume: 是否從相同運行未完成的檢查點繼續
+        
+        Yields:
+            策略映射到新增聚合計數的字典（繼續時第一項為已完成的計數）
+        """
+        self._require_plain_counts('Checkpointed runs')
+        path = path or self.checkpoint_path()
+        interval = self.checkpoint_interval if self.checkpoint_interval is not None else 60
+        strategies = list(dict.fromkeys(strategies))
+        run_key = ResultCache.key({'run': self.cache_key(strategies, shared_cards), 'games': games_per_strategy})
+        state = load_checkpoint(path) if resume else None
+        if state is not None and state['run_key'] != run_key:
+            self.logger.warning(f"檢查點 {path} 屬於不同的運行，將重新開始並覆蓋")
+            state = None
+        elif state is not None and state['complete']:
+            # 已完成的運行不再重用：未設種子時 run_key 相同，重用會返回之前的樣本而非新的隨機結果
+            self.logger.info(f"檢查點 {path} 的運行已完成，將重新開始並覆蓋")
+            state = None
+        
+        # 以檢查點（或本次）的根種子模擬，結束後恢復模擬器原本的隨機數流
+        configured_seed, configured_streams = self.seed, self.streams
+        self.seed = state['seed'] if state is not None else self.streams.seed
+        self.streams = RandomStreams(self.seed)
+        try:
+            _, _, tasks = self._parallel_tasks(strategies, games_per_strategy, shared_cards)
+            totals = {strategy: OutcomeAggregate() for strategy in strategies}
+            completed = 0
+            
+            def save(complete: bool) -> None:
+                write_checkpoint(path, {
+                    'run_key': run_key,
+                    'seed': self.seed,
+                    'strategies': strategies,
+                    'games_per_strategy': games_per_strategy,
+                    'shared_cards': shared_cards,
+                    'completed_tasks': completed,
+                    'total_tasks': len(tasks),
+                    'complete': complete,
+                    'counts': {str(strategy): totals[strategy].counts.tolist() for strategy in strategies},
+                    'config': self.config,
+                })
+            
+            finished = False
+            with process_pool(self.workers) as executor:
+                try:
+                    if state is not None:
+                        completed = state['completed_tasks']
+                        totals = {strategy: OutcomeAggregate(state['counts'][str(strategy)]) for strategy in strategies}
+                        self.logger.info(f"從檢查點 {path} 繼續: 已完成 {completed}/{len(tasks)} 個區塊")
+                        yield {strategy: aggregate.copy() for strategy, aggregate in totals.items()}
+                    
+                    last_save = time.time()
+                    step = max(1, self.workers)
+                    for i in range(completed, len(tasks), step):
+                        batch = tasks[i:i + step]
+                        delta = {}
+                        for (group, *_), counts in zip(batch, run_parallel(self.config, batch, self.workers,
+                                                                           aggregate=True, executor=executor)):
+                            for row, strategy in enumerate(group):
+                                delta.setdefault(strategy, OutcomeAggregate()).merge(OutcomeAggregate(counts[row]))
+                        # 計數與已完成的區塊數一起更新，任何時刻保存的檢查點都是一致的
+                        for strategy, aggregate in delta.items():
+                            totals[strategy].merge(aggregate)
+                        completed = i + len(batch)
+                        if time.time() - last_save >= interval:
+                            save(complete=False)
+                            last_save = time.time()
+                        yield delta
+                    save(complete=True)
+                    finished = True
+                finally:
+                    # 調用方在收到某批後停止（關閉生成器）或模擬出錯時，保存到目前為止的進度
+                    if not finished:
+                        save(complete=False)
+        finally:
+            self.seed, self.streams = configured_seed, configured_streams
+    
+    def run_checkpointed(self, strategies: List[int], games_per_strategy: int,
+                         shared_cards: Optional[bool] = None, path: Optional[str] = None,
+                         resume: bool = True) -> Dict[int, OutcomeAggregate]:
+        """
+        模擬多個策略並定期保存檢查點，返回每個策略的聚合計數
+        
+        Args:
+            strategies: 要測試的補牌策略列表
+            games_per_strategy: 每個策略要模擬的局數
+            shared_cards: 是否讓所有策略共用同一組牌序，如為None則讀取 simulation.shared_cards
+            path: 檢查點文件路徑，如為None則使用 checkpoint_path()
+            resume: 是否從相同運行的檢查點繼續
+        
+        Returns:
+            策略映射到聚合計數的字典
+        """
+        if shared_cards is None:
+            shared_cards = self.config.get('simulation', {}).get('shared_cards', False)
+        strategies = list(dict.fromkeys(strategies))
+        start_time = time.time()
+        aggregates = {strategy: OutcomeAggregate() for strategy in strategies}
+        for delta in self.iter_checkpointed(strategies, games_per_strategy, shared_cards, path, resume):
+            for strategy, aggregate in delta.items():
+                aggregates[strategy].merge(aggregate)
+        self.logger.info(f"模擬完成，用時 {time.time() - start_time:.2f} 秒，檢查點: {path or self.checkpoint_path()}")
+        return aggregates
+    
+    @classmethod
+    def resume(cls, path: str, workers: Optional[int] = None) -> Dict[int, OutcomeAggregate]:
+        """
+        從檢查點繼續一次中斷的運行
+        
+        以檢查點中保存的配置、根種子和進度重建模擬器，只模擬尚未完成的區塊；
+        檢查點的運行已完成時直接返回保存的計數。
+        
+        Args:
+            path: 檢查點文件路徑
+            workers: 工作進程數量，如為None則讀取保存的配置（結果與此無關）
+        
+        Returns:
+            策略映射到聚合計數的字典，與未中斷的運行相同
+        """
+        state = load_checkpoint(path)
+        if state is None:
+            raise ValueError(f"Checkpoint {path} does not exist")
+        if state['complete']:
+            return {strategy: OutcomeAggregate(state['counts'][str(strategy)]) for strategy in state['strategies']}
+        simulator = cls(state['config'], workers=workers)
+        return simulator.run_checkpointed(state['strategies'], state['games_per_strategy'],
+                                          shared_cards=state['shared_cards'], path=path)
+    
+    def iter_batches(self, strategy_value: int, num_games: Optional[int] = None,
+                     time_budget: Optional[float] = None, batch_seconds: float = 0.1,
+                     targets: Optional[Dict[str, float]] = None,
+                     confidence: float = 0.95) -> Iterator[OutcomeAggregate]:
+        """
+        以按實測吞吐量調整大小的批次模擬單一策略
+        
+        每批的局數按上一批的實測速度調整為約 batch_seconds 秒，因此無論引擎快慢，
+        調用方都能以穩定的節奏收到結果。達到 num_games、用完 time_budget 或
+        所有指標的置信區間半寬都達到 targets 時停止，結束時將達到的每秒局數記錄在
+        throughput[strategy_value]。設定 targets 時，每批不超過按目前半寬外推
+        仍需的局數，因此停止時不會多模擬一整批。
+        
+        Args:
+            strategy_value: 莊家補牌策略值
+            num_games: 要模擬的總局數（設定 targets 時為上限），如為None則不限局數
+            time_budget: 時間預算（秒），如為None則不限時間
+            batch_seconds: 每批的目標耗時（秒）
+            targets: 指標名稱 (bust_rate、mean) 到目標置信區間半寬的字典
+            confidence: targets 的置信水平
+        
+        Yields:
+            每批結果的聚合計數（類型為 aggregate_type，記錄明牌或滲透率時按該欄分組）
+        """
+        if num_games is None and time_budget is None and not targets:
+            raise ValueError("Either num_games, time_budget or targets must be given")
+        
+        self.game.set_dealer_strategy(strategy_value)
+        start_time = time.perf_counter()
+        completed = 0
+        min_batch_size = batch_size = 1000
+        total = self.aggregate_type()
+        try:
+            while num_games is None or completed < num_games:
+                remaining_time = None if time_budget is None else time_budget - (time.perf_counter() - start_time)
+                if remaining_time is not None and remaining_time <= 0:
+                    break
+                if num_games is not None:
+                    batch_size = min(batch_size, num_games - completed)
+                
+                batch_start = time.perf_counter()
+                totals, _, *column = self.simulate_outcomes(strategy_value, batch_size, self.record_column)
+                batch_elapsed = time.perf_counter() - batch_start
+                completed += batch_size
+                delta = self.aggregate_type()
+                delta.add(totals, *column)
+                yield delta
+                
+                # 按實測速度決定下一批大小，每次最多放大4倍以免單次測量誤差過大
+                rate = batch_size / max(batch_elapsed, 1e-6)
+                target_seconds = batch_seconds if remaining_time is None else min(batch_seconds, remaining_time - batch_elapsed)
+                batch_size = max(1, min(4 * batch_size, int(rate * target_seconds)))
+                
+                if targets:
+                    # 所有指標都達到目標精度時停止，否則下一批不超過外推仍需的局數
+                    total.merge(delta)
+                    needed = total.games_needed(targets, confidence)
+                    if needed <= completed:
+                        break
+                    batch_size = min(batch_size, max(min_batch_size, needed - completed))
+        finally:
+            elapsed = time.perf_counter() - start_time
+            self.throughput[strategy_value] = completed / elapsed if elapsed > 0 else 0.0
+    
+    def run_time_budget(self, strategies: List[int], time_budget: float) -> Dict[int, OutcomeAggregate]:
+        """
+        在時間預算內盡可能多地模擬多個策略
+        
+        預算平均分配給每個策略，不設局數上限。各策略達到的每秒局數記錄在 throughput 中。
+        
+        Args:
+            strategies: 要測試的補牌策略列表
+            time_budget: 總時間預算（秒）
+        
+        Returns:
+            策略映射到聚合計數的字典
+        """
+        if time_budget <= 0:
+            raise ValueError(f"Time budget must be positive, got {time_budget}")
+        
+        strategies = list(dict.fromkeys(strategies))
+        strategy_budget = time_budget / len(strategies)
+        aggregates = {}
+        for strategy in strategies:
+            aggregates[strategy] = self.aggregate_type()
+            for delta in self.iter_batches(strategy, time_budget=strategy_budget):
+                aggregates[strategy].merge(delta)
+            self.logger.info(f"策略 {strategy} 在 {strategy_budget:.2f} 秒內模擬 {aggregates[strategy].count} 局 "
+                             f"({self.throughput[strategy]:,.0f} 局/秒)")
+            self.reset()
+        return aggregates
+    
+    def run_precision(self, strategies: List[int], targets: Optional[Dict[str, float]] = None,
+                      confidence: Optional[float] = None,
+                      max_games: Optional[int] = None) -> Dict[int, OutcomeAggregate]:
+        """
+        逐批模擬每個策略，直到其置信區間半寬達到目標
+        
+        每個策略獨立停止：已收斂的策略不會因為其他策略尚未收斂而繼續模擬。
+        每個策略實際使用的局數即返回的聚合計數的 count，並記錄在日誌中。
+        
+        Args:
+            strategies: 要測試的補牌策略列表
+            targets: 指標名稱 (bust_rate、mean) 到目標半寬的字典，如為None則讀取
+                simulation.target_bust_half_width 和 simulation.target_mean_half_width
+            confidence: 置信水平，如為None則讀取 simulation.confidence_level（默認0.95）
+            max_games: 每個策略的局數上限，如為None則讀取 simulation.max_games_per_strategy
+        
+        Returns:
+            策略映射到聚合計數的字典
+        """
+        sim_config = self.config.get('simulation', {})
+        if targets is None:
+            targets = self.precision_targets()
+        if not targets:
+            raise ValueError("At least one target half-width must be set for precision mode")
+        if confidence is None:
+            confidence = sim_config.get('confidence_level', 0.95)
+        if max_games is None:
+            max_games = sim_config.get('max_games_per_strategy')
+        
+        strategies = list(dict.fromkeys(strategies))
+        aggregates = {}
+        for strategy in strategies:
+            aggregates[strategy] = self.aggregate_type()
+            for delta in self.iter_batches(strategy, num_games=max_games, targets=targets, confidence=confidence):
+                aggregates[strategy].merge(delta)
+            
+            half_widths = aggregates[strategy].half_widths(confidence)
+            summary = ", ".join(f"{metric} ±{half_widths[metric]:.5f}" for metric in targets)
+            if aggregates[strategy].games_needed(targets, confidence) <= aggregates[strategy].count:
+                self.logger.info(f"策略 {strategy} 以 {aggregates[strategy].count} 局達到目標精度 ({summary})")
+            else:
+                self.logger.warning(f"策略 {strategy} 達到局數上限 {max_games} 時仍未達到目標精度 ({summary})")
+            self.reset()
+        return aggregates
+    
+    def run_race(self, strategies: List[int], metric: Optional[str] = None, maximize: Optional[bool] = None,
+                 initial_games: Optional[int] = None, tolerance: Optional[float] = None,
+                 confidence: Optional[float] = None, max_games: Optional[int] = None,
+                 shared_cards: Optional[bool] = None) -> Dict[int, OutcomeAggregate]:
+        """
+        以逐輪淘汰 (racing / successive halving) 比較多個策略
+        
+        每一輪讓所有仍在比賽中的策略的累計局數加倍，然後排除置信區間上界
+        （最小化時為下界）已落後於最佳策略下界（上界）的策略。置信水平按候選策略
+        數量做 Bonferroni 修正。只剩一個策略、所有剩餘策略的置信區間半寬都不超過
+        tolerance（差距已小於關心的精度）或達到局數上限時停止。明顯較差的策略只用
+        initial_games 局即被排除，因此計算量集中在難以區分的策略上。
+        
+        單進程時每輪直接延續模擬器的隨機數流（不會像設置種子時的 run_multiple_strategies
+        那樣從第一個區塊重新開始），因此各輪的局互不重複。多進程時（不記錄每局欄、
+        不使用牌靴庫）每輪新增的局數經 _parallel_tasks 切分為區塊分派到同一個進程池，
+        設置種子時每輪的根種子由 (種子, 輪次) 派生，結果與工作進程數量無關。
+        比賽結果記錄在 race_survivors 和 race_eliminated 中。
+        
+        Args:
+            strategies: 候選補牌策略列表
+            metric: 比較的指標 (bust_rate 或 mean)，如為None則讀取 simulation.race_metric（默認 bust_rate）
+            maximize: 指標越大越好，如為None則讀取 simulation.race_maximize
+                （未設置時爆牌率越小越好，平均點數越大越好）
+            initial_games: 第一輪每個策略的局數，如為None則讀取 simulation.race_initial_games（默認2000）
+            tolerance: 剩餘策略的半寬都不超過此值時停止，如為None則讀取 simulation.race_tolerance（默認0.0005）
+            confidence: 整體置信水平，如為None則讀取 simulation.confidence_level（默認0.95）
+            max_games: 每個策略的局數上限，如為None則讀取 simulation.max_games_per_strategy
+            shared_cards: 每輪是否讓剩餘策略共用同一組牌序，如為None則讀取 simulation.shared_cards
+        
+        Returns:
+            策略映射到聚合計數的字典（包含被排除的策略在被排除前的結果）
+        """
+        sim_config = self.config.get('simulation', {})
+        if metric is None:
+            metric = sim_config.get('race_metric', 'bust_rate')
+        if maximize is None:
+            maximize = sim_config.get('race_maximize')
+        if maximize is None:
+            maximize = metric != 'bust_rate'
+        if initial_games is None:
+            initial_games = sim_config.get('race_initial_games', 2000)
+        if tolerance is None:
+            tolerance = sim_config.get('race_tolerance', 0.0005)
+        if confidence is None:
+            confidence = sim_config.get('confidence_level', 0.95)
+        if max_games is None:
+            max_games = sim_config.get('max_games_per_strategy')
+        if shared_cards is None:
+            shared_cards = sim_config.get('shared_cards', False)
+        if metric not in OutcomeAggregate.PRECISION_METRICS:
+            raise ValueError(f"Race metric must be one of {OutcomeAggregate.PRECISION_METRICS}, got {metric}")
+        if initial_games <= 0:
+            raise ValueError(f"Initial games must be positive, got {initial_games}")
+        
+        strategies = list(dict.fromkeys(strategies))
+        # Bonferroni 修正：每個策略的區間都以 1 - (1 - confidence) / k 的水平計算
+        interval_confidence = 1 - (1 - confidence) / len(strategies)
+        aggregates = {strategy: self.aggregate_type() for strategy in strategies}
+        survivors = list(strategies)
+        self.race_eliminated = {}
+        target_games = initial_games
+        round_index = 0
+        start_time = time.time()
+        
+        parallel = self.workers > 1 and self.record_column is None and not self.shoe_library
+        with process_pool(self.workers if parallel else 1) as executor:
+            while True:
+                if max_games is not None:
+                    target_games = min(target_games, max_games)
+                batch = target_games - aggregates[survivors[0]].count
+                if batch > 0 and parallel:
+                    # 多進程時新增的局數切分為區塊分派到進程池，工作進程只返回點數計數
+                    tasks = self._race_tasks(survivors, batch, shared_cards, round_index)
+                    chunk_counts = run_parallel(self.config, tasks, self.workers, aggregate=True, executor=executor)
+                    for (group, *_), counts in zip(tasks, chunk_counts):
+                        for row, strategy in enumerate(group):
+                            aggregates[strategy].merge(OutcomeAggregate(counts[row]))
+                elif batch > 0:
+                    if shared_cards and len(survivors) > 1:
+                        outcomes = self.simulate_shared_outcomes(survivors, batch, self.record_column)
+                        for strategy, (totals, _, *column) in outcomes.items():
+                            aggregates[strategy].add(totals, *column)
+                    else:
+                        for strategy in survivors:
+                            totals, _, *column = self.simulate_outcomes(strategy, batch, self.record_column)
+                            aggregates[strategy].add(totals, *column)
+                
+                # 以區間互相比較：落後者的最佳可能值仍不如領先者的最差可能值即被排除
+                intervals = {strategy: aggregates[strategy].confidence_interval(metric, interval_confidence)
+                             for strategy in survivors}
+                if maximize:
+                    best_bound = max(low for low, _ in intervals.values())
+                    eliminated = [strategy for strategy in survivors if intervals[strategy][1] < best_bound]
+                else:
+                    best_bound = min(high for _, high in intervals.values())
+                    eliminated = [strategy for strategy in survivors if intervals[strategy][0] > best_bound]
+                for strategy in eliminated:
+                    self.race_eliminated[strategy] = round_index
+                survivors = [strategy for strategy in survivors if strategy not in eliminated]
+                self.logger.info(f"第 {round_index} 輪: 每個策略 {target_games} 局，排除 {eliminated}，剩餘 {survivors}")
+                
+                half_widths = [(high - low) / 2 for low, high in (intervals[strategy] for strategy in survivors)]
+                if (len(survivors) == 1 or max(half_widths) <= tolerance
+                        or (max_games is not None and target_games >= max_games)):
+                    break
+                target_games *= 2
+                round_index += 1
+        
+        self.race_survivors = survivors
+        total_games = sum(aggregate.count for aggregate in aggregates.values())
+        self.logger.info(f"比賽完成，用時 {time.time() - start_time:.2f} 秒，共 {total_games} 局，"
+                         f"剩餘策略 {survivors}")
+        self.reset()
+        return aggregates
+    
+    def _race_tasks(self, survivors: List[int], batch: int, shared_cards: bool,
+                    round_index: int) -> List[Tuple[List[int], int, np.random.SeedSequence,
+                                                    Optional[int], Optional[Tuple[int, int]]]]:
+        """
+        將比賽一輪新增的局數切分為進程池區塊
+        
+        設置種子時以 (根種子, 輪次) 派生本輪的根種子，因此各輪的區塊互不重複，
+        且結果只取決於種子和 chunk_size；未設種子時 _parallel_tasks 每次都使用新的根種子。
+        
+        Args:
+            survivors: 仍在比賽中的策略
+            batch: 本輪每個策略新增的局數
+            shared_cards: 是否讓剩餘策略共用同一組牌序
+            round_index: 輪次
+        
+        Returns:
+            區塊列表，格式見 _parallel_tasks
+        """
+        configured_seed, configured_streams = self.seed, self.streams
+        if configured_seed is not None:
+            self.seed = int(configured_streams.generator(STREAM_RACE, 0, round_index).integers(2 ** 63))
+            self.streams = RandomStreams(self.seed)
+        try:
+            _, _, tasks = self._parallel_tasks(survivors, batch, shared_cards and len(survivors) > 1)
+        finally:
+            self.seed, self.streams = configured_seed, configured_streams
+        return tasks
+    
+    def precision_targets(self) -> Dict[str, float]:
+        """
+        讀取配置中的目標置信區間半寬
+        
+        Returns:
+            指標名稱到目標半寬的字典（只包含已設定的指標）
+        """
+        sim_config = self.config.get('simulation', {})
+        targets = {
+            'bust_rate': sim_config.get('target_bust_half_width'),
+            'mean': sim_config.get('target_mean_half_width'),
+        }
+        return {metric: target for metric, target in targets.items() if target is not None}
+    
+    def replay_chunk(self, strategies: List[int], games_per_strategy: int, chunk_index: int,
+                     shared_cards: bool = False) -> Dict[int, np.ndarray]:
+        """
+        單獨重新模擬一次已設置種子的運行中的某個區塊
+        
+        返回的點數與以相同種子、策略和局數調用 run_multiple_strategies 或 run_aggregate
+        時該區塊的結果逐位相同，用於檢查個別區塊而無需重跑整個模擬。
+        
+        Args:
+            strategies: 原運行的補牌策略列表
+            games_per_strategy: 原運行每個策略的局數
+            chunk_index: 區塊序號（從0開始，每塊 chunk_size 局）
+            shared_cards: 原運行是否共用牌序
+        
+        Returns:
+            策略映射到該區塊點數陣列的字典
+        """
+        if self.seed is None:
+            raise RuntimeError("Replaying a chunk requires simulation.seed to be set")
+        
+        groups, chunks, tasks = self._parallel_tasks(strategies, games_per_strategy, shared_cards)
+        if not 0 <= chunk_index < len(chunks):
+            raise ValueError(f"Chunk index must be between 0 and {len(chunks) - 1}, got {chunk_index}")
+        
+        chunk_tasks = [tasks[i * len(chunks) + chunk_index] for i in range(len(groups))]
+        results = {}
+        for (group, *_), totals in zip(chunk_tasks, run_parallel(self.config, chunk_tasks, 1)):
+            for row, strategy in enumerate(group):
+                results[strategy] = totals[row]
+        return results
+    
+    def replay(self, strategy_value: int, game_id: int, strategies: Optional[List[int]] = None) -> Dict[str, Any]:
+        """
+        單獨重現一局，無需重跑之前的各局（需啟用 simulation.counter_rng）
+        
+        game_id 與結果列表中的 game_id 相同，即每次運行中該策略組的第 game_id 局
+        （從1開始）。成本與局序號無關，最多重玩 rounds_per_shoe 局。
+        
+        Args:
+            strategy_value: 莊家補牌策略值
+            game_id: 局序號（從1開始）
+            strategies: 原運行共用牌序的策略列表，如為None則表示單獨模擬該策略
+        
+        Returns:
+            與結果列表格式相同的該局結果字典
+        """
+        if not self.counter_rng:
+            raise RuntimeError("Replaying a game requires simulation.counter_rng to be enabled")
+        if game_id < 1:
+            raise ValueError(f"Game id must be at least 1, got {game_id}")
+        
+        group = list(strategies) if strategies else [strategy_value]
+        if strategy_value not in group:
+            raise ValueError(f"Strategy {strategy_value} is not in {group}")
+        for strategy in group:
+            self.game.dealer.set_strategy(strategy)
+        
+        total = self.vector_engine.replay(group, game_id - 1)[group.index(strategy_value)]
+        return {
+            'strategy': strategy_value,
+            'game_id': game_id,
+            'dealer_hand_value': total,
+            'is_dealer_busted': total > 21
+        }
+    
+    def _require_plain_counts(self, mode: str) -> None:
+        """區塊、快取和檢查點只保存點數計數，記錄每局欄時拋出異常而非靜默丟棄該欄"""
+        if self.record_column is not None:
+            raise ValueError(f"{mode} only keep hand-total counts and cannot be combined with "
+                             f"simulation.record_{self.record_column}")
+    
+    @property
+    def _chunked(self) -> bool:
+        """是否以區塊模擬（多進程、設置了種子或使用牌靴庫，且不額外記錄每局欄）"""
+        return self.record_column is None and (self.workers > 1 or self.seed is not None or bool(self.shoe_library))
+    
+    def _create_vector_engine(self) -> VectorizedEngine:
+        """建立使用模擬器自身隨機數流的向量化引擎"""
+        if self.counter_rng:
+            return CounterEngine(self.config, self.streams.seed_sequence(STREAM_COUNTER, 0, 0))
+        return VectorizedEngine(self.config, rng=self.streams.generator(STREAM_ENGINE, 1),
+                                shoe_library=self._open_shoe_library(ranks=True))
+    
+    def _open_shoe_library(self, ranks: bool) -> Optional[ShoeLibrary]:
+        """打開配置的牌靴庫（reset 時回到第一個牌靴），未配置時返回None"""
+        if not self.shoe_library:
+            return None
+        library = ShoeLibrary(self.shoe_library, ranks=ranks)
+        self._shoe_sources.append(library)
+        return library
+    
+    def _parallel_tasks(self, strategies: List[int], games_per_strategy: int, shared_cards: bool,
+                        first_game: int = 0) -> Tuple[List[List[int]], List[int], List[Tuple[List[int], int, np.random.SeedSequence,
+                                                                          Optional[int], Optional[Tuple[int, int]]]]]:
+        """
+        將多策略模擬切分為進程池區塊
+        
+        每個區塊的種子序列由 (策略組, 區塊序號) 決定，與區塊數量和工作進程數量無關；
+        未設種子時每次調用都從系統熵取得新的根種子，因此重複運行的結果互相獨立。
+        使用計數器式隨機數時，各區塊共用密鑰並只記錄第一局的序號。使用牌靴庫時，
+        牌靴庫按區塊數量等分，所有策略的第 i 個區塊使用相同的第 i 個分片。
+        first_game 大於0時只切分從該局開始的部分（見 can_continue_from）。
+        
+        Returns:
+            (策略分組, 每組的區塊局數, (策略分組, 局數, 種子序列, 第一局序號, 牌靴庫範圍) 區塊列表)
+        """
+        for strategy in strategies:
+            self.game.dealer.set_strategy(strategy)
+        
+        groups = [list(strategies)] if shared_cards else [[strategy] for strategy in strategies]
+        
+        if self.seed is not None or self.shoe_library:
+            # 可重現模式：區塊劃分只取決於 chunk_size
+            chunks = split_games(games_per_strategy, self.chunk_size)
+        else:
+            # 區塊不超過 chunk_size，且數量足以讓每個工作進程都有工作
+            balanced_chunk = -(-games_per_strategy * len(groups) // self.workers)
+            chunks = split_games(games_per_strategy, max(1, min(self.chunk_size, balanced_chunk)))
+        if not self.can_continue_from(first_game):
+            raise ValueError(f"Cannot continue this run from game {first_game}")
+        offsets = (first_game + np.cumsum([0] + chunks[:-1])).tolist()
+        if self.counter_rng:
+            counter_root = self.streams.seed_sequence(STREAM_COUNTER, 0, 0)
+            tasks = [(group, chunk, counter_root, offset, None)
+                     for group in groups for chunk, offset in zip(chunks, offsets)]
+        else:
+            shards = [None] * len(chunks)
+            if self.shoe_library:
+                library = ShoeLibrary(self.shoe_library)
+                shards = [(shard.start, shard.stop) for shard in
+                          (library.shard(index, len(chunks)) for index in range(len(chunks)))]
+            # 可重現模式下區塊序號為 第一局序號 / chunk_size，因此繼續的區塊與完整運行的對應區塊相同；
+            # 否則每次調用使用新的根種子，以第一局序號為區塊序號
+            if self.seed is not None or self.shoe_library:
+                streams = self.streams
+                indices = [offset // self.chunk_size for offset in offsets]
+            else:
+                streams = RandomStreams()
+                indices = offsets
+            tasks = [
+                (group, chunk, streams.seed_sequence(STREAM_CHUNK, RandomStreams.group_id(group), chunk_index),
+                 None, shards[position])
+                for group in groups
+                for position, (chunk, chunk_index) in enumerate(zip(chunks, indices))
+            ]
+        return groups, chunks, tasks
+    
+    def reset(self) -> None:
+        """重置遊戲狀態，重新洗所有牌靴（使用牌靴庫時回到第一個牌靴）"""
+        for library in self._shoe_sources:
+            library.rewind()
+        self.game.reset()
+        if self.vector_engine is not None:
+            self.vector_engine.reset()
\ No newline at end of file
@@ -0,0 +1,287 @@
+"""
+參數掃描：在牌副數量 × 洗牌閾值 × 莊家策略的組合上批量模擬
+
+用法: python -m blackpiyan.simulation.sweep [--config configs/default.yaml] [--workers N] [--restart]
+"""
+
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import argparse
+import copy
+import csv
+import itertools
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from blackpiyan.analysis.aggregate import OutcomeAggregate
+from blackpiyan.config.config_manager import ConfigManager
+from blackpiyan.simulation.cache import ResultCache
+from blackpiyan.simulation.parallel import resolve_workers, simulate_chunk, split_games
+from blackpiyan.simulation.rng import STREAM_SWEEP, RandomStreams
+from blackpiyan.simulation.simulator import ENGINE_VERSION
+from blackpiyan.utils.logger import Logger
+
+# 情境的參數欄（也是結果表中識別情境的鍵）
+SCENARIO_COLUMNS = ['decks', 'reshuffle_threshold', 'strategy', 'games']
+# 決定結果的運行設置欄（未設置種子時 seed 為空；settings 為其他影響結果的模擬配置的雜湊，見 SweepRunner.settings_key）
+RUN_COLUMNS = ['seed', 'chunk_size', 'settings']
+COUNT_COLUMNS = [f'count_{value}' for value in range(OutcomeAggregate.NUM_BINS)]
+RESULT_COLUMNS = SCENARIO_COLUMNS + RUN_COLUMNS + ['bust_rate', 'mean', 'std'] + COUNT_COLUMNS
+
+def expand_scenarios(config: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    展開 sweep 配置中的情境
+    
+    sweep.scenarios 為明確的情境列表時直接使用（未指定的參數取 game / simulation 的值），
+    否則展開 sweep.decks × sweep.reshuffle_thresholds × sweep.strategies 的網格。
+    
+    Args:
+        config: 配置字典
+    
+    Returns:
+        情境字典列表，每個包含 decks、reshuffle_threshold、strategy 和 games
+    """
+    sweep_config = config.get('sweep', {})
+    game_config = config.get('game', {})
+    sim_config = config.get('simulation', {})
+    defaults = {
+        'decks': game_config.get('decks', 6),
+        'reshuffle_threshold': game_config.get('reshuffle_threshold', 0.4),
+        'strategy': config.get('dealer', {}).get('hit_until_value', 17),
+        'games': sweep_config.get('games_per_scenario', sim_config.get('min_games_per_strategy', 1000)),
+    }
+    
+    if sweep_config.get('scenarios'):
+        scenarios = [{**defaults, **scenario} for scenario in sweep_config['scenarios']]
+    else:
+        grid = itertools.product(
+            sweep_config.get('decks') or [defaults['decks']],
+            sweep_config.get('reshuffle_thresholds') or [defaults['reshuffle_threshold']],
+            sweep_config.get('strategies') or sim_config.get('strategies', [defaults['strategy']])
+        )
+        scenarios = [
+            {'decks': decks, 'reshuffle_threshold': threshold, 'strategy': strategy, 'games': defaults['games']}
+            for decks, threshold, strategy in grid
+        ]
+    
+    for scenario in scenarios:
+        unknown = set(scenario) - set(SCENARIO_COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown scenario parameters {sorted(unknown)}, expected {SCENARIO_COLUMNS}")
+        if scenario['decks'] <= 0:
+            raise ValueError(f"Number of decks must be positive, got {scenario['decks']}")
+        if not 0 < scenario['reshuffle_threshold'] < 1:
+            raise ValueError(f"Reshuffle threshold must be between 0 and 1, got {scenario['reshuffle_threshold']}")
+        if not 12 <= scenario['strategy'] <= 21:
+            raise ValueError(f"Hit until value should be between 12 and 21, got {scenario['strategy']}")
+        if scenario['games'] <= 0:
+            raise ValueError(f"Number of games must be positive, got {scenario['games']}")
+    return scenarios
+
+def scenario_key(scenario: Dict[str, Any]) -> Tuple[int, float, int, int]:
+    """返回情境在結果表中的鍵"""
+    return (int(scenario['decks']), float(scenario['reshuffle_threshold']),
+            int(scenario['strategy']), int(scenario['games']))
+
+def scenario_stream(scenario: Dict[str, Any]) -> int:
+    """
+    返回情境的隨機數流編號
+    
+    編號由情境的牌副數量、洗牌閾值和策略的雜湊決定，與情境在網格中的位置無關，
+    因此增刪或重排其他情境不會改變此情境的結果。不包含局數，使延長的情境沿用
+    相同區塊的隨機數流。
+    
+    Args:
+        scenario: 情境字典
+    
+    Returns:
+        64 位元的流編號
+    """
+    key = ResultCache.key({'decks': int(scenario['decks']),
+                           'reshuffle_threshold': float(scenario['reshuffle_threshold']),
+                           'strategy': int(scenario['strategy'])})
+    return int(key[:16], 16)
+
+class SweepRunner:
+    """
+    參數掃描執行器
+    
+    每個情境按 simulation.chunk_size 切分為區塊，所有區塊提交到同一個進程池，
+    空閒的工作進程隨即取走下一個區塊，因此快慢不一的情境會自動平衡負載。
+    情境的所有區塊完成後立即將一行結果（情境參數、統計數據和點數計數）追加到
+    結果表 (CSV)；重新運行時跳過結果表中以相同種子、區塊大小和模擬配置完成的情境，
+    因此中斷後可以從中途繼續。設置 simulation.seed 時，每個區塊的隨機數流由 (種子, 情境參數的
+    雜湊, 區塊序號) 決定，結果與工作進程數量、完成順序和情境在網格中的位置無關。
+    """
+    
+    def __init__(self, config: Dict[str, Any], workers: Optional[int] = None, output: Optional[str] = None):
+        """
+        初始化參數掃描執行器
+        
+        Args:
+            config: 配置字典
+            workers: 工作進程數量，0 表示使用所有 CPU 核心，如為None則讀取 simulation.workers
+            output: 結果表路徑，如為None則讀取 sweep.output（默認為 output.data_dir 下的 sweep.csv）
+        """
+        self.config = config
+        self.logger = Logger(config).get_logger(__name__)
+        sim_config = config.get('simulation', {})
+        self.workers = resolve_workers(workers if workers is not None else sim_config.get('workers', 1))
+        self.chunk_size = sim_config.get('chunk_size', 1000000)
+        self.seed = sim_config.get('seed')
+        self.streams = RandomStreams(self.seed)
+        default_output = os.path.join(config.get('output', {}).get('data_dir', 'results/data'), 'sweep.csv')
+        self.output = output or config.get('sweep', {}).get('output') or default_output
+        self.scenarios = expand_scenarios(config)
+    
+    def settings_key(self) -> str:
+        """
+        返回種子和區塊大小以外影響結果的模擬配置的雜湊
+        
+        與 Simulator.cache_key 一樣包含引擎、通道數量、批量洗牌數量、計數器式隨機數、
+        牌靴庫和 ENGINE_VERSION，任一項改變時結果表中的行都不再被視為已完成。
+        
+        Returns:
+            16 位十六進位字串
+        """
+        sim_config = self.config.get('simulation', {})
+        return ResultCache.key({
+            'engine_version': ENGINE_VERSION,
+            'engine': sim_config.get('engine', 'scalar'),
+            'lanes': sim_config.get('lanes', 65536),
+            'shoe_batch': sim_config.get('shoe_batch', 4096),
+            'counter_rng': sim_config.get('counter_rng', False),
+            'rounds_per_shoe': sim_config.get('rounds_per_shoe', 256),
+            'shoe_library': sim_config.get('shoe_library'),
+        })[:16]
+    
+    def run_settings(self) -> Tuple[str, int, str]:
+        """返回本次運行寫入結果表的 (種子, 區塊大小, 模擬配置雜湊) 欄，未設置種子時種子為空字串"""
+        return ('' if self.seed is None else str(self.seed), int(self.chunk_size), self.settings_key())
+    
+    def completed_keys(self) -> set:
+        """
+        讀取結果表中已完成的情境
+        
+        只有以相同種子、區塊大小和模擬配置完成的行才算完成；未設置種子時，相同模擬配置下
+        任何未設置種子的運行完成的行都可重用。
+        
+        Returns:
+            已完成情境的鍵集合，每個鍵為 scenario_key 加上 run_settings 的各欄
+        """
+        if not os.path.exists(self.output):
+            return set()
+        table = pd.read_csv(self.output, dtype={'seed': str, 'settings': str})
+        table['seed'] = table['seed'].fillna('')
+        return {scenario_key(row) + (row['seed'], int(row['chunk_size']), row['settings'])
+                for row in table[SCENARIO_COLUMNS + RUN_COLUMNS].to_dict('records')}
+    
+    def run(self, resume: bool = True) -> pd.DataFrame:
+        """
+        執行掃描，逐個情境將結果寫入結果表
+        
+        Args:
+            resume: 是否跳過結果表中已有的情境；為False時清空結果表重新開始
+        
+        Returns:
+            完整的結果表（包含之前運行已完成的情境）
+        """
+        if not resume and os.path.exists(self.output):
+            os.remove(self.output)
+        done = self.completed_keys()
+        settings = self.run_settings()
+        pending = [(index, scenario) for index, scenario in enumerate(self.scenarios)
+                   if scenario_key(scenario) + settings not in done]
+        self.logger.info(f"參數掃描: 共 {len(self.scenarios)} 個情境，已完成 {len(self.scenarios) - len(pending)} 個，"
+                         f"使用 {self.workers} 個工作進程")
+        
+        start_time = time.time()
+        directory = os.path.dirname(self.output)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        write_header = not os.path.exists(self.output) or os.path.getsize(self.output) == 0
+        with open(self.output, 'a', newline='') as handle:
+            writer = csv.writer(handle)
+            if write_header:
+                writer.writerow(RESULT_COLUMNS)
+                handle.flush()
+            for finished, (scenario, aggregate) in enumerate(self._simulate(pending), 1):
+                stats = aggregate.statistics()
+                writer.writerow(list(scenario_key(scenario)) + list(settings)
+                                + [stats['bust_rate'], stats['mean'], stats['std']] + aggregate.counts.tolist())
+                handle.flush()
+                self.logger.info(f"情境 {finished}/{len(pending)} 完成: {scenario}，爆牌率 {stats['bust_rate']:.4f}")
+        
+        self.logger.info(f"參數掃描完成，用時 {time.time() - start_time:.2f} 秒")
+        return pd.read_csv(self.output)
+    
+    def _chunk_tasks(self, pending: List[Tuple[int, Dict[str, Any]]]) -> List[Tuple[int, Dict[str, Any], int, np.random.SeedSequence]]:
+        """將情境切分為 (情境序號, 情境配置, 局數, 種子序列) 區塊"""
+        tasks = []
+        for index, scenario in pending:
+            scenario_config = copy.deepcopy(self.config)
+            scenario_config.setdefault('game', {}).update(
+                decks=scenario['decks'], reshuffle_threshold=scenario['reshuffle_threshold'])
+            stream = scenario_stream(scenario)
+            for chunk_index, num_games in enumerate(split_games(scenario['games'], self.chunk_size)):
+                tasks.append((index, scenario_config, num_games,
+                              self.streams.seed_sequence(STREAM_SWEEP, stream, chunk_index)))
+        return tasks
+    
+    def _simulate(self, pending: List[Tuple[int, Dict[str, Any]]]) -> Iterator[Tuple[Dict[str, Any], OutcomeAggregate]]:
+        """按完成順序產生每個情境的聚合計數"""
+        scenarios = dict(pending)
+        tasks = self._chunk_tasks(pending)
+        remaining = {index: 0 for index in scenarios}
+        for index, *_ in tasks:
+            remaining[index] += 1
+        aggregates = {index: OutcomeAggregate() for index in scenarios}
+        
+        def collect(index: int, counts: np.ndarray) -> Optional[Tuple[Dict[str, Any], OutcomeAggregate]]:
+            aggregates[index].merge(OutcomeAggregate(counts))
+            remaining[index] -= 1
+            return (scenarios[index], aggregates.pop(index)) if remaining[index] == 0 else None
+        
+        if self.workers <= 1:
+            for index, scenario_config, num_games, seed_sequence in tasks:
+                counts = simulate_chunk(scenario_config, [scenarios[index]['strategy']], num_games,
+                                        seed_sequence, aggregate=True)[0]
+                finished = collect(index, counts)
+                if finished is not None:
+                    yield finished
+            return
+        
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            futures = {
+                executor.submit(simulate_chunk, scenario_config, [scenarios[index]['strategy']], num_games,
+                                seed_sequence, aggregate=True): index
+                for index, scenario_config, num_games, seed_sequence in tasks
+            }
+            while futures:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    finished = collect(futures.pop(future), future.result()[0])
+                    if finished is not None:
+                        yield finished
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """命令行入口：執行配置中的參數掃描"""
+    parser = argparse.ArgumentParser(description="在牌副數量 × 洗牌閾值 × 莊家策略的組合上批量模擬")
+    parser.add_argument('--config', default='configs/default.yaml', help="配置文件路徑")
+    parser.add_argument('--workers', type=int, default=None, help="工作進程數量 (0: 使用所有 CPU 核心)")
+    parser.add_argument('--output', default=None, help="結果表路徑 (.csv)")
+    parser.add_argument('--restart', action='store_true', help="清空結果表重新開始，而非跳過已完成的情境")
+    args = parser.parse_args(argv)
+    
+    config = ConfigManager(args.config).get_config()
+    runner = SweepRunner(config, workers=args.workers, output=args.output)
+    table = runner.run(resume=not args.restart)
+    print(f"已完成 {len(table)} 個情境，結果表: {runner.output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
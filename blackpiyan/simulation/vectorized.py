@@ -0,0 +1,232 @@
+from typing import Any, Dict, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from blackpiyan.model.dealer_table import MAX_HAND_TOTAL, RANK_BITS, get_dealer_table
+from blackpiyan.model.shoe_factory import ShoeFactory
+from blackpiyan.model.shoe_library import ShoeLibrary
+
+# Dealer.play_hand 在每次補牌前以 Deck.auto_shuffle_if_needed() 的默認閾值檢查洗牌
+HIT_RESHUFFLE_THRESHOLD = 0.4
+
+# 可隨點數一併返回的每局欄（與 ResultBatch 的欄名相同）
+RECORDED_COLUMNS = ('up_card', 'penetration')
+
+class VectorizedEngine:
+    """
+    向量化莊家模擬引擎
+    
+    以二維陣列 (lanes, shoe_size) 同時推進多個互相獨立的牌靴，每條通道
+    (lane) 每輪玩一手莊家牌。手牌以 Dealer 共用的 DealerTable 狀態編碼，
+    每張牌以一次查表推進；補牌決策、爆牌和各通道的洗牌都以陣列運算完成，
+    規則與 BlackjackGame.play_single_round 一致：
+    - 每局開始前，剩餘比例低於 reshuffle_threshold 的牌靴重新洗牌
+    - 每次補牌前，剩餘比例低於 40% 的牌靴重新洗牌
+    
+    引擎重置時每條通道從新牌靴中均勻隨機的位置（不超過開局洗牌的位置）開始，
+    之前的牌視為已發出，因此即使每條通道只玩少數幾局，各局開始時的牌靴滲透率
+    也覆蓋從新牌靴到洗牌前的整個範圍，而不是集中在牌靴開頭。
+    """
+    
+    def __init__(self, config: Dict[str, Any], lanes: Optional[int] = None,
+                 rng: Optional[np.random.Generator] = None, shoe_library: Optional[ShoeLibrary] = None):
+        """
+        初始化向量化引擎
+        
+        Args:
+            config: 配置字典
+            lanes: 同時推進的牌靴數量，如為None則讀取 simulation.lanes（默認65536）
+            rng: 隨機數產生器，如為None則建立新的產生器
+            shoe_library: 以點數 (ranks=True) 讀取的牌靴庫，如為None則隨機洗牌；
+                每條通道開始時各使用一個牌靴，之後按洗牌順序依序讀取
+        """
+        game_config = config.get('game', {})
+        num_decks = game_config.get('decks', 6)
+        if num_decks <= 0:
+            raise ValueError(f"Number of decks must be positive, got {num_decks}")
+        
+        self.num_decks = num_decks
+        self.shoe_size = num_decks * 52
+        self.reshuffle_threshold = game_config.get('reshuffle_threshold', 0.4)
+        self.lanes = lanes or config.get('simulation', {}).get('lanes', 65536)
+        if self.lanes <= 0:
+            raise ValueError(f"Number of lanes must be positive, got {self.lanes}")
+        
+        # 洗牌從批量產生的牌靴緩衝區取用，可在背景線程中預先產生；
+        # 每輪約有 1/60 的通道洗牌，每批不超過通道數量，避免為小區塊產生過多牌靴
+        sim_config = config.get('simulation', {})
+        base_shoe = np.tile(np.arange(52, dtype=np.int8) % 13 + 1, num_decks)
+        batch_size = min(sim_config.get('shoe_batch', 4096), self.lanes)
+        if shoe_library is not None and (not shoe_library.ranks or shoe_library.shoe_size != self.shoe_size):
+            raise ValueError(f"Shoe library must be opened with ranks=True and hold {self.shoe_size} cards per shoe")
+        self._factory = shoe_library or ShoeFactory(base_shoe, rng=rng, batch_size=batch_size,
+                                                    background=sim_config.get('background_shuffle', False))
+        self._shoes = np.tile(base_shoe, (self.lanes, 1))
+        self._flat_shoes = self._shoes.reshape(-1)
+        self._cursors = np.zeros(self.lanes, dtype=np.int64)
+        self._round_cursor_limit = self._cursor_limit(self.reshuffle_threshold)
+        self._hit_cursor_limit = self._cursor_limit(HIT_RESHUFFLE_THRESHOLD)
+        
+        # 起始位置使用由 rng 的種子序列派生的獨立產生器，不影響（可能在背景線程中使用的）洗牌產生器
+        seed_sequence = getattr(rng.bit_generator, 'seed_seq', None) if rng is not None else None
+        self._start_rng = np.random.default_rng(seed_sequence.spawn(1)[0] if seed_sequence is not None else None)
+        self.reset()
+    
+    def reset(self) -> None:
+        """重新洗所有牌靴，每條通道從均勻隨機的位置開始"""
+        self._reshuffle(np.arange(self.lanes))
+        self._cursors[:] = self._start_rng.integers(0, self._round_cursor_limit + 1, self.lanes)
+    
+    def play(self, hit_until_value: int, num_games: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        使用指定策略玩多局莊家牌
+        
+        Args:
+            hit_until_value: 莊家補牌策略，當點數小於此值時補牌
+            num_games: 要玩的局數
+        
+        Returns:
+            一個包含兩個元素的元組:
+            - 每局莊家最終點數 (int8 陣列)
+            - 每局莊家是否爆牌 (bool 陣列)
+        """
+        totals = self.play_multi([hit_until_value], num_games)[0]
+        return totals, totals > 21
+    
+    def play_multi(self, hit_until_values: Sequence[int], num_games: int,
+                   record: Optional[str] = None) -> Union[np.ndarray, Tuple[np.ndarray, np.ndarray]]:
+        """
+        以同一組牌序一次評估多個補牌策略
+        
+        閾值較高的莊家手牌，開頭的牌序與閾值較低時完全相同，因此每局只按
+        最高閾值發牌，並在點數首次達到各閾值時記錄該策略的最終點數。各策略
+        因而共用隨機數（common random numbers），但牌靴的消耗按最高閾值計算。
+        
+        Args:
+            hit_until_values: 要評估的補牌策略列表
+            num_games: 要玩的局數
+            record: 同時返回的每局欄（RECORDED_COLUMNS 之一），如為None則只返回點數：
+                up_card 為莊家明牌（第一張牌）點數 (1-13)，penetration 為每局開始時
+                牌靴已發出的比例
+        
+        Returns:
+            形狀為 (len(hit_until_values), num_games) 的 int8 陣列，
+            各行依序為對應策略每局的莊家最終點數；設置 record 時返回
+            (點數陣列, 該欄的陣列)，該欄為所有策略共用
+        """
+        if record is not None and record not in RECORDED_COLUMNS:
+            raise ValueError(f"Unknown recorded column {record}, expected one of {RECORDED_COLUMNS}")
+        thresholds = np.unique(np.asarray(hit_until_values, dtype=np.int8))
+        totals = np.empty((len(thresholds), num_games), dtype=np.int8)
+        column = np.empty(num_games, dtype=self._column_dtype(record)) if record else None
+        done = 0
+        while done < num_games:
+            n = min(self.lanes, num_games - done)
+            totals[:, done:done + n] = self._play_round(thresholds, n)
+            if record:
+                column[done:done + n] = self._round_column(record)
+            done += n
+        
+        # 按輸入順序返回（允許重複的策略值）
+        totals = totals[np.searchsorted(thresholds, hit_until_values)]
+        return (totals, column) if record else totals
+    
+    def _play_round(self, thresholds: np.ndarray, n: int) -> np.ndarray:
+        """前 n 條通道各按最高閾值玩一手牌，返回每個閾值下的最終點數"""
+        lanes = np.arange(n)
+        self._reshuffle(lanes[self._cursors[:n] > self._round_cursor_limit])
+        self._round_cursors = self._cursors[:n].copy()
+        
+        # 狀態轉移與點數與閾值無關，停牌判斷使用最高閾值的表
+        table = get_dealer_table(int(thresholds[-1]))
+        next_state, state_totals, stop = table.flat_next_state, table.totals, table.stop
+        # 空手牌為狀態 0，第一張牌的索引即為其點數；第一張牌即莊家明牌
+        self._up_cards = self._draw(lanes)
+        state = next_state.take(self._up_cards)
+        state = next_state.take((state << RANK_BITS) | self._draw(lanes))
+        hand_total = state_totals.take(state)
+        
+        # 點數對應已達到的閾值數量
+        num_thresholds = len(thresholds)
+        reached_lut = np.searchsorted(thresholds, np.arange(MAX_HAND_TOTAL + 1), side='right').astype(np.int8)
+        flat_totals = np.empty(num_thresholds * n, dtype=np.int8)
+        recorded = np.zeros(n, dtype=np.int8)
+        active = lanes
+        while True:
+            if num_thresholds == 1:
+                # 單一策略：點數達到閾值即停牌
+                standing = stop.take(state)
+                if standing.any():
+                    flat_totals[active[standing]] = hand_total[standing]
+                    hitting = ~standing
+                    active, state = active[hitting], state[hitting]
+            else:
+                # 記錄點數首次達到的閾值；軟點數轉硬點數時點數可能下降，已記錄的不再改變
+                reached = reached_lut[hand_total]
+                newly = reached > recorded
+                if newly.any():
+                    self._record(flat_totals, n, active[newly], recorded[newly],
+                                 reached[newly], hand_total[newly])
+                    recorded = np.maximum(recorded, reached)
+                    
+                    # 只在仍需補牌的通道上推進，使用緊湊的狀態陣列
+                    hitting = recorded < num_thresholds
+                    active, state = active[hitting], state[hitting]
+                    recorded = recorded[hitting]
+            if not active.size:
+                break
+            
+            self._reshuffle(active[self._cursors[active] > self._hit_cursor_limit])
+            state = next_state.take((state << RANK_BITS) | self._draw(active))
+            hand_total = state_totals.take(state)
+        
+        return flat_totals.reshape(num_thresholds, n)
+    
+    def _round_column(self, record: str) -> np.ndarray:
+        """返回上一輪 _play_round 各通道的明牌或開局時已發出的比例"""
+        if record == 'up_card':
+            return self._up_cards
+        return self._round_cursors / self.shoe_size
+    
+    @staticmethod
+    def _column_dtype(record: Optional[str]) -> type:
+        """返回每局欄的陣列類型（與 ResultBatch 相同）"""
+        return np.float32 if record == 'penetration' else np.int8
+    
+    @staticmethod
+    def _record(flat_totals: np.ndarray, n: int, lanes: np.ndarray, start: np.ndarray,
+                stop: np.ndarray, hand_total: np.ndarray) -> None:
+        """將 hand_total 寫入各通道閾值索引 [start, stop) 的位置"""
+        start = start.astype(np.intp)
+        counts = stop - start
+        if (counts == 1).all():
+            flat_totals[start * n + lanes] = hand_total
+            return
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        rows = np.repeat(start, counts) + offsets
+        flat_totals[rows * n + np.repeat(lanes, counts)] = np.repeat(hand_total, counts)
+    
+    def _cursor_limit(self, threshold: float) -> int:
+        """
+        返回游標上限：游標超過此值時剩餘比例低於閾值
+        
+        逐一比較與 Deck.get_remaining_percentage 相同的浮點運算，確保洗牌時機完全一致。
+        """
+        for cursor in range(self.shoe_size + 1):
+            if (self.shoe_size - cursor) / self.shoe_size < threshold:
+                return cursor - 1
+        return self.shoe_size
+    
+    def _draw(self, lanes: np.ndarray) -> np.ndarray:
+        """從指定通道各抽一張牌，返回點數 (1-13)"""
+        cursors = self._cursors[lanes]
+        if cursors.size and cursors.max() >= self.shoe_size:
+            raise RuntimeError("Cannot draw from an empty deck")
+        self._cursors[lanes] = cursors + 1
+        return self._flat_shoes[lanes * self.shoe_size + cursors]
+    
+    def _reshuffle(self, lanes: np.ndarray) -> None:
+        """重新洗指定通道的牌靴並將游標歸零"""
+        if lanes.size:
+            self._shoes[lanes] = self._factory.take(lanes.size)
+            self._cursors[lanes] = 0
@@ -1,9 +1,14 @@
 """測試21點模型層的功能"""
 
 import unittest
+
+import numpy as np
+
 from blackpiyan.model.card import Card
 from blackpiyan.model.deck import Deck
 from blackpiyan.model.dealer import Dealer
+from blackpiyan.model.dealer_table import get_dealer_table
+from blackpiyan.model.shoe_factory import ShoeFactory
 
 class TestCard(unittest.TestCase):
     """測試Card類"""
@@ -80,7 +85,40 @@ class TestDeck(unittest.TestCase):
         # 下一次抽牌應該拋出異常
         with self.assertRaises(RuntimeError):
             deck.draw()
+
+    def test_shoe_composition(self):
+        """測試牌靴組成與只取點數的抽牌"""
+        deck = Deck(num_decks=2)
+
+        # 每種牌 (點數, 花色) 應該剛好出現兩次
+        cards = deck.cards
+        self.assertEqual(len({(card.value, card.suit) for card in cards}), 52)
+
+        # 依序抽出所有點數，每個點數應出現 4 * 2 次
+        ranks = [deck.draw_rank() for _ in range(104)]
+        for rank in range(1, 14):
+            self.assertEqual(ranks.count(rank), 8)
+        self.assertEqual(len(deck), 0)
+
+        # 洗牌後恢復完整牌靴
+        deck.shuffle()
+        self.assertEqual(len(deck), 104)
     
+    def test_shoe_factory(self):
+        """測試批量產生的牌靴與背景產生的一致性"""
+        base_shoe = np.tile(np.arange(52, dtype=np.int8) % 13 + 1, 2)
+        factory = ShoeFactory(base_shoe, rng=np.random.default_rng(3), batch_size=16)
+        shoes = factory.take(40)
+        self.assertEqual(shoes.shape, (40, 104))
+        # 每個牌靴都是完整牌靴的排列，且各不相同
+        self.assertTrue((np.sort(shoes, axis=1) == np.sort(base_shoe)).all())
+        self.assertEqual(len({shoe.tobytes() for shoe in shoes}), 40)
+        
+        # 背景產生不改變牌靴序列
+        background = ShoeFactory(base_shoe, rng=np.random.default_rng(3), batch_size=16, background=True)
+        self.assertTrue((background.take(40) == shoes).all())
+        self.assertTrue((background.next_shoe() == factory.next_shoe()).all())
+
     def test_remaining_percentage(self):
         """測試剩餘牌數百分比計算"""
         deck = Deck(num_decks=1)
@@ -212,6 +250,29 @@ class TestDealer(unittest.TestCase):
         # 22點爆
         self.assertTrue(dealer.is_busted(22))
     
+    def test_dealer_table(self):
+        """測試狀態轉移表與逐張計算的點數一致"""
+        dealer = Dealer()
+        table = get_dealer_table(17)
+        self.assertIs(get_dealer_table(17), table)
+        
+        deck = Deck(num_decks=1)
+        for _ in range(200):
+            if len(deck) < 15:
+                deck.shuffle()
+            hand = [deck.draw(), deck.draw()]
+            state = table.next_state_list[table.next_state_list[0][hand[0].value]][hand[1].value]
+            while True:
+                # 每個狀態的點數與停牌判斷應與 calculate_hand_value 和 should_hit 相同
+                hand_value = dealer.calculate_hand_value(hand)
+                self.assertEqual(table.totals_list[state], hand_value)
+                self.assertEqual(table.stop_list[state], not dealer.should_hit(hand_value))
+                if table.stop_list[state]:
+                    break
+                card = deck.draw()
+                hand.append(card)
+                state = table.next_state_list[state][card.value]
+    
     def test_play_hand(self):
         """測試完整的玩牌過程"""
         dealer = Dealer(hit_until_value=17)
@@ -225,6 +286,26 @@ class TestDealer(unittest.TestCase):
         # 手牌點數應該>=17（除非初始兩張牌就爆了）
         if hand_value <= 21:
             self.assertGreaterEqual(hand_value, 17)
+        
+        # 子類覆寫 should_hit 時使用自訂規則（軟17補牌）而非狀態轉移表
+        class SoftSeventeenDealer(Dealer):
+            def should_hit(self, hand_value):
+                return hand_value < 17 or (hand_value == 17 and self.soft)
+            
+            def calculate_hand_value(self, hand):
+                total = super().calculate_hand_value(hand)
+                # 有 Ace 計為 11 點時為軟牌
+                self.soft = total != sum(card.blackjack_value for card in hand)
+                return total
+        
+        dealer = SoftSeventeenDealer()
+        deck = Deck(num_decks=1)
+        for _ in range(100):
+            if len(deck) < 15:
+                deck.shuffle()
+            hand, hand_value = dealer.play_hand(deck)
+            self.assertEqual(hand_value, dealer.calculate_hand_value(hand))
+            self.assertFalse(dealer.should_hit(hand_value))
 
 if __name__ == "__main__":
     unittest.main() 
\ No newline at end of file
@@ -1,15 +1,32 @@
 """測試21點模擬功能"""
 
+import copy
 import os
 import unittest
 import tempfile
 import shutil
+import time
 from pathlib import Path
 
+import numpy as np
+import pandas as pd
+
 from blackpiyan.config.config_manager import ConfigManager
 from blackpiyan.game.blackjack import BlackjackGame
+from blackpiyan.gui.worker import SimulationWorker
+from blackpiyan.model.deck import Deck
+from blackpiyan.model.shoe_library import ShoeLibrary, write_shoe_library
+from blackpiyan.simulation.counter import philox4x32
+from blackpiyan.simulation.cache import ResultCache
+from blackpiyan.simulation.checkpoint import load_checkpoint
 from blackpiyan.simulation.simulator import Simulator
+from blackpiyan.simulation.sweep import SweepRunner, expand_scenarios, scenario_key
+from blackpiyan.analysis.aggregate import JointAggregate, OutcomeAggregate, PenetrationAggregate, UpCardAggregate
 from blackpiyan.analysis.analyzer import Analyzer
+from blackpiyan.analysis.exact import ExactCalculator
+from blackpiyan.analysis.incremental import IncrementalAnalyzer
+from blackpiyan.analysis.result_batch import ResultBatch
+from blackpiyan.analysis.significance import chi2_sf, fisher_exact, holm_adjust
 from blackpiyan.visualization.visualizer import Visualizer
 
 class TestSimulation(unittest.TestCase):
@@ -82,6 +99,683 @@ class TestSimulation(unittest.TestCase):
         for strategy in strategies:
             self.assertIn(strategy, all_results)
             self.assertEqual(len(all_results[strategy]), num_games)
+
+    def test_vectorized_engine(self):
+        """測試向量化引擎與逐局模擬在統計上一致"""
+        self.config['simulation']['engine'] = 'vectorized'
+        self.config['simulation']['lanes'] = 1024
+        simulator = Simulator(self.config)
+
+        # 結果格式應與逐局模擬相同
+        results = simulator.run_simulation(17, 10)
+        self.assertEqual(len(results), 10)
+        self.assertEqual([r['game_id'] for r in results], list(range(1, 11)))
+        for result in results:
+            self.assertEqual(result['is_dealer_busted'], result['dealer_hand_value'] > 21)
+
+        # 爆牌率應與逐局模擬一致（容許約4個標準差）
+        totals, busted = simulator.simulate_outcomes(17, 200000)
+        self.assertTrue(((totals >= 17) & (totals <= 26)).all())
+        self.config['simulation']['engine'] = 'scalar'
+        _, scalar_busted = Simulator(self.config).simulate_outcomes(17, 20000)
+        self.assertAlmostEqual(busted.mean(), scalar_busted.mean(), delta=0.013)
+
+        # 無效的策略值應該拋出異常
+        with self.assertRaises(ValueError):
+            simulator.simulate_outcomes(11, 10)
+
+    def test_shared_cards(self):
+        """測試多個策略共用同一組牌序"""
+        simulator = Simulator(self.config)
+        strategies = [18, 16, 17]
+        outcomes = simulator.simulate_shared_outcomes(strategies, 5000)
+        self.assertEqual(list(outcomes.keys()), strategies)
+
+        for low, high in ((16, 17), (17, 18)):
+            low_totals, _ = outcomes[low]
+            high_totals, _ = outcomes[high]
+            # 低閾值停牌時點數已達到高閾值，兩者應該是同一手牌
+            same_hand = low_totals >= high
+            self.assertTrue((high_totals[same_hand] == low_totals[same_hand]).all())
+            # 每個策略的最終點數都應該達到其閾值
+            self.assertTrue((low_totals >= low).all())
+
+        # 結果格式應與逐一模擬相同
+        results = simulator.run_multiple_strategies([16, 17], 10, shared_cards=True)
+        self.assertEqual(len(results[16]), 10)
+        self.assertEqual(results[17][-1]['game_id'], 10)
+
+    def test_parallel_workers(self):
+        """測試多進程模擬"""
+        self.config['simulation']['engine'] = 'vectorized'
+        self.config['simulation']['chunk_size'] = 3000
+        simulator = Simulator(self.config, workers=2)
+        self.assertEqual(simulator.workers, 2)
+
+        # 每個策略被切分為多個區塊後應按順序拼接
+        outcomes = simulator.simulate_parallel_outcomes([16, 17], 10000)
+        for strategy in (16, 17):
+            totals, busted = outcomes[strategy]
+            self.assertEqual(len(totals), 10000)
+            self.assertTrue((totals >= strategy).all())
+            self.assertTrue((busted == (totals > 21)).all())
+        self.assertGreater(outcomes[17][1].mean(), outcomes[16][1].mean())
+
+        # 結果格式應與單進程模擬相同
+        results = simulator.run_multiple_strategies([16, 17], 10)
+        self.assertEqual(len(results[16]), 10)
+        self.assertEqual(results[16][-1]['game_id'], 10)
+        
+        # 未設種子時重複運行的結果互相獨立
+        first = simulator.run_aggregate([16, 17], 6000)
+        second = simulator.run_aggregate([16, 17], 6000)
+        self.assertFalse(np.array_equal(first[16].counts, second[16].counts))
+        self.assertFalse(np.array_equal(first[17].counts, second[17].counts))
+
+    def test_aggregate_mode(self):
+        """測試聚合模式與逐局結果的統計一致"""
+        simulator = Simulator(self.config)
+        aggregates = simulator.run_aggregate([16, 17], 500)
+        self.assertEqual(aggregates[16].count, 500)
+        self.assertEqual(aggregates[17].bust_count, sum(aggregates[17].counts[22:]))
+        
+        # 多個批次的聚合結果可以合併
+        merged = aggregates[16] + aggregates[17]
+        self.assertEqual(merged.count, 1000)
+        
+        # 聚合計數的統計應與 pandas 逐局計算的結果相同
+        results = simulator.run_multiple_strategies([16, 17], 101)
+        expected = Analyzer(results).calculate_statistics(17)
+        actual = Analyzer({17: OutcomeAggregate.from_results(results[17])}).calculate_statistics(17)
+        for key in ('count', 'bust_count', 'min', 'max', 'value_counts'):
+            self.assertEqual(actual[key], expected[key])
+        for key in ('bust_rate', 'mean', 'median', 'std', 'percentile_25', 'percentile_75'):
+            self.assertAlmostEqual(actual[key], expected[key])
+        
+        # 合併統計應包含所有策略
+        analyzer = Analyzer({16: aggregates[16], 17: results[17]})
+        self.assertEqual(analyzer.calculate_statistics()['count'], 601)
+        self.assertEqual(len(analyzer.compare_strategies()), 2)
+    
+    def test_worker_deltas(self):
+        """測試工作線程發送的增量合併後等於最終結果"""
+        self.config['simulation'].update({'engine': 'vectorized', 'strategies': [16, 17],
+                                          'min_games_per_strategy': 200000})
+        worker = SimulationWorker(self.config)
+        received = []
+        final = []
+        worker.intermediate_result.connect(lambda deltas, strategy: received.append(deltas))
+        worker.result_ready.connect(final.append)
+        
+        # 不啟動事件循環，直接在當前線程執行工作方法（信號以直接連接同步送達）
+        worker.run()
+        self.assertEqual(len(final), 1)
+        totals = final[0]
+        self.assertEqual(totals[16].count, 200000)
+        merged = {}
+        for deltas in received:
+            for strategy, delta in deltas.items():
+                merged.setdefault(strategy, OutcomeAggregate()).merge(delta)
+        self.assertEqual(merged, totals)
+        self.assertEqual(worker.pending_deltas, {})
+    
+    def test_time_budget(self):
+        """測試按實測吞吐量調整批次的時間預算模式"""
+        simulator = Simulator(self.config)
+        
+        # 局數模式應剛好模擬指定局數
+        batches = list(simulator.iter_batches(17, num_games=12345))
+        self.assertEqual(sum(batch.count for batch in batches), 12345)
+        self.assertGreater(simulator.throughput[17], 0)
+        
+        # 時間預算模式在預算內盡可能多地模擬
+        start_time = time.time()
+        aggregates = simulator.run_time_budget([16, 17], 0.4)
+        self.assertLess(time.time() - start_time, 1.5)
+        for strategy in (16, 17):
+            self.assertGreater(aggregates[strategy].count, 0)
+            self.assertGreater(simulator.throughput[strategy], 0)
+        
+        with self.assertRaises(ValueError):
+            next(simulator.iter_batches(17))
+    
+    def test_precision_mode(self):
+        """測試模擬到置信區間半寬達到目標為止的精度模式"""
+        simulator = Simulator(self.config)
+        targets = {'bust_rate': 0.01, 'mean': 0.05}
+        aggregates = simulator.run_precision([16, 17], targets=targets, confidence=0.95)
+        for strategy in (16, 17):
+            half_widths = aggregates[strategy].half_widths(0.95)
+            self.assertLessEqual(half_widths['bust_rate'], 0.01)
+            self.assertLessEqual(half_widths['mean'], 0.05)
+            # 每批不超過外推仍需的局數，不會大幅超出所需局數
+            p = aggregates[strategy].statistics()['bust_rate']
+            self.assertLess(aggregates[strategy].count, 2 * 1.96 ** 2 * p * (1 - p) / 0.01 ** 2 + 2000)
+        
+        # 達到局數上限時停止
+        capped = simulator.run_precision([17], targets={'bust_rate': 1e-5}, max_games=5000)
+        self.assertEqual(capped[17].count, 5000)
+        
+        with self.assertRaises(ValueError):
+            OutcomeAggregate.from_totals(np.array([17, 22])).games_needed({'median': 0.1})
+    
+    def test_race(self):
+        """測試逐輪淘汰較差策略的比賽模式"""
+        simulator = Simulator(self.config)
+        aggregates = simulator.run_race([16, 17, 18], metric='bust_rate', maximize=True,
+                                        initial_games=100, tolerance=0.0)
+        self.assertEqual(simulator.race_survivors, [18])
+        self.assertEqual(set(simulator.race_eliminated), {16, 17})
+        
+        # 每輪累計局數加倍，被排除的策略停在被排除的輪次
+        for strategy, round_index in simulator.race_eliminated.items():
+            self.assertEqual(aggregates[strategy].count, 100 * 2 ** round_index)
+        self.assertGreaterEqual(aggregates[18].count, max(a.count for a in aggregates.values()))
+        
+        # 最小化時保留最小的策略；達到局數上限時停止
+        simulator.run_race([16, 17, 18], maximize=False, initial_games=100, max_games=100)
+        self.assertIn(16, simulator.race_survivors)
+        
+        # 爆牌率默認越小越好
+        simulator.run_race([16, 18], initial_games=1000, tolerance=0.0)
+        self.assertEqual(simulator.race_survivors, [16])
+        
+        # 多進程時各輪分派到進程池，設置種子時結果與工作進程數量無關
+        self.config['simulation'].update({'seed': 8, 'chunk_size': 500})
+        racer = Simulator(self.config, workers=2)
+        parallel = racer.run_race([16, 18], initial_games=400, tolerance=0.0)
+        self.assertEqual(racer.race_survivors, [16])
+        self.assertEqual(Simulator(self.config, workers=3).run_race([16, 18], initial_games=400, tolerance=0.0),
+                         parallel)
+        
+        with self.assertRaises(ValueError):
+            simulator.run_race([16, 17], metric='median')
+    
+    def test_sweep(self):
+        """測試參數掃描可以從中途繼續，且結果與工作進程數量無關"""
+        config = copy.deepcopy(self.config)
+        config['simulation'].update({'seed': 5, 'chunk_size': 700})
+        config['sweep'] = {'decks': [1, 6], 'reshuffle_thresholds': [0.25, 0.5],
+                           'strategies': [16, 17], 'games_per_scenario': 2000}
+        self.assertEqual(len(expand_scenarios(config)), 8)
+        
+        output = os.path.join(self.temp_dir, 'sweep.csv')
+        full = SweepRunner(config, workers=1, output=output).run(resume=False)
+        self.assertEqual(len(full), 8)
+        self.assertTrue((full['games'] == 2000).all())
+        self.assertTrue((full.filter(like='count_').sum(axis=1) == 2000).all())
+        
+        # 模擬中斷：只保留前三個情境，繼續運行後只補上其餘情境
+        with open(output) as handle:
+            lines = handle.readlines()
+        with open(output, 'w') as handle:
+            handle.writelines(lines[:4])
+        runner = SweepRunner(config, workers=2, output=output)
+        self.assertEqual(len(runner.completed_keys()), 3)
+        resumed = runner.run()
+        key = ['decks', 'reshuffle_threshold', 'strategy']
+        pd.testing.assert_frame_equal(resumed.sort_values(key).reset_index(drop=True),
+                                      full.sort_values(key).reset_index(drop=True))
+        
+        # 情境的結果只取決於其參數，與在網格中的位置無關
+        subset = copy.deepcopy(config)
+        subset['sweep'] = {'scenarios': [{'decks': 6, 'reshuffle_threshold': 0.5, 'strategy': 17}],
+                           'games_per_scenario': 2000}
+        single = SweepRunner(subset, workers=1, output=os.path.join(self.temp_dir, 'single.csv')).run()
+        match = full[(full['decks'] == 6) & (full['reshuffle_threshold'] == 0.5) & (full['strategy'] == 17)]
+        self.assertEqual(single.filter(like='count_').values.tolist(), match.filter(like='count_').values.tolist())
+        
+        # 改變區塊大小或模擬引擎後不重用以其他設置完成的情境
+        for key, value in (('chunk_size', 900), ('engine', 'vectorized')):
+            changed = copy.deepcopy(config)
+            changed['simulation'][key] = value
+            runner = SweepRunner(changed, workers=1, output=output)
+            done = runner.completed_keys()
+            self.assertEqual(len(done), 8)
+            self.assertFalse(any(scenario_key(scenario) + runner.run_settings() in done
+                                 for scenario in runner.scenarios))
+    
+    def test_result_cache(self):
+        """測試結果快取的重用、延長和淘汰"""
+        config = copy.deepcopy(self.config)
+        config['simulation'].update({'seed': 3, 'chunk_size': 500, 'engine': 'vectorized'})
+        expected = Simulator(config).run_aggregate([16, 17], 1000)
+        
+        cache_dir = os.path.join(self.temp_dir, 'cache')
+        config['cache'] = {'enabled': True, 'directory': cache_dir}
+        simulator = Simulator(config)
+        simulator.run_aggregate([16, 17], 500)
+        self.assertEqual(len(simulator.cache), 2)
+        
+        # 延長到 1000 局時只模擬缺少的 500 局，結果與一次完整運行相同
+        deltas = [delta[16].count for delta in simulator.iter_cached([16], 1000)]
+        self.assertEqual(deltas, [500, 500])
+        self.assertEqual(simulator.run_aggregate([16, 17], 1000), expected)
+        
+        # 多進程時所有批次共用一個進程池，結果與單進程相同
+        parallel_config = copy.deepcopy(config)
+        parallel_config['cache']['directory'] = os.path.join(self.temp_dir, 'parallel_cache')
+        parallel = Simulator(parallel_config, workers=2)
+        self.assertEqual([delta[16].count for delta in parallel.iter_cached([16], 1000)], [500, 500])
+        self.assertEqual(parallel.run_aggregate([16], 1000)[16], expected[16])
+        
+        # 重複運行只讀取快取；改變配置使用不同的條目
+        self.assertEqual([delta[17].count for delta in simulator.iter_cached([17], 1000)], [1000])
+        other = copy.deepcopy(config)
+        other['game']['decks'] = 6
+        self.assertNotEqual(Simulator(other).cache_key([16], False), simulator.cache_key([16], False))
+        
+        # 超過條目上限時刪除最久未使用的條目
+        cache = ResultCache(os.path.join(self.temp_dir, 'lru'), max_entries=2)
+        for name in ('a', 'b'):
+            cache.put(name, {'games': 1})
+            time.sleep(0.01)
+        cache.get('a')
+        cache.put('c', {'games': 1})
+        self.assertIsNone(cache.get('b'))
+        self.assertIsNotNone(cache.get('a'))
+    
+    def test_checkpoint_resume(self):
+        """測試中斷的運行從檢查點繼續後與未中斷的運行相同"""
+        config = copy.deepcopy(self.config)
+        config['simulation'].update({'seed': None, 'chunk_size': 300, 'engine': 'vectorized',
+                                     'checkpoint_interval': 0})
+        path = os.path.join(self.temp_dir, 'checkpoint.json')
+        
+        # 模擬兩個區塊後中斷
+        batches = Simulator(config, workers=1).iter_checkpointed([16, 17], 1000, path=path)
+        next(batches)
+        next(batches)
+        batches.close()
+        
+        state = load_checkpoint(path)
+        self.assertEqual(state['completed_tasks'], 2)
+        self.assertFalse(state['complete'])
+        
+        # 未設種子時以記錄的根種子繼續，結果與以該種子一次完成的運行相同
+        resumed = Simulator.resume(path, workers=1)
+        config['simulation']['seed'] = state['seed']
+        expected = Simulator(config, workers=1).run_aggregate([16, 17], 1000)
+        self.assertEqual(resumed, expected)
+        self.assertEqual(resumed[16].count, 1000)
+        self.assertTrue(load_checkpoint(path)['complete'])
+        self.assertEqual(Simulator.resume(path, workers=1), expected)
+        
+        # 未設種子時重新運行已完成的相同運行會抽取新的樣本，而非重用檢查點
+        config['simulation']['seed'] = None
+        fresh_path = os.path.join(self.temp_dir, 'fresh.json')
+        first = Simulator(config, workers=1).run_checkpointed([16, 17], 1000, path=fresh_path)
+        finished = load_checkpoint(fresh_path)
+        self.assertTrue(finished['complete'])
+        batches = Simulator(config, workers=1).iter_checkpointed([16, 17], 1000, path=fresh_path)
+        self.assertEqual(next(batches)[16].count, 300)
+        batches.close()
+        self.assertEqual(load_checkpoint(fresh_path)['completed_tasks'], 1)
+        self.assertNotEqual(load_checkpoint(fresh_path)['seed'], finished['seed'])
+        second = Simulator(config, workers=1).run_checkpointed([16, 17], 1000, path=fresh_path)
+        self.assertNotEqual(second, first)
+        config['simulation']['seed'] = state['seed']
+        
+        # 不同運行的檢查點不被使用
+        other = Simulator(config, workers=1).run_checkpointed([16, 17], 600, path=path)
+        self.assertEqual(other[17].count, 600)
+        
+        # 保存間隔未到時提前停止，關閉生成器也會保存已產生的批次，繼續後不丟失任何一批
+        config['simulation']['checkpoint_interval'] = 3600
+        stop_path = os.path.join(self.temp_dir, 'stopped.json')
+        batches = Simulator(config, workers=1).iter_checkpointed([16, 17], 1000, path=stop_path)
+        received = [next(batches) for _ in range(3)]
+        batches.close()
+        state = load_checkpoint(stop_path)
+        self.assertEqual(state['completed_tasks'], 3)
+        self.assertEqual(state['counts']['16'], sum(delta[16].counts for delta in received).tolist())
+        self.assertEqual(Simulator.resume(stop_path, workers=1), expected)
+    
+    def test_seeded_streams(self):
+        """測試設置種子時結果可重現且與工作進程數量無關"""
+        config = copy.deepcopy(self.config)
+        config['simulation'].update({'seed': 42, 'chunk_size': 300, 'engine': 'vectorized'})
+        
+        single = Simulator(config, workers=1).run_aggregate([16, 17], 1000)
+        parallel = Simulator(config, workers=2).run_aggregate([16, 17], 1000)
+        for strategy in (16, 17):
+            self.assertEqual(single[strategy], parallel[strategy])
+        
+        # 單獨重現的區塊應與完整運行中的同一區塊逐位相同
+        simulator = Simulator(config, workers=1)
+        results = simulator.run_multiple_strategies([16, 17], 1000)
+        replayed = simulator.replay_chunk([16, 17], 1000, 2)
+        totals = [result['dealer_hand_value'] for result in results[17][600:900]]
+        self.assertEqual(replayed[17].tolist(), totals)
+        
+        with self.assertRaises(ValueError):
+            simulator.replay_chunk([16, 17], 1000, 4)
+        with self.assertRaises(RuntimeError):
+            Simulator(self.config).replay_chunk([17], 1000, 0)
+    
+    def test_counter_rng(self):
+        """測試計數器式隨機數可單獨重現任一局"""
+        # Random123 的 Philox4x32-10 已知答案
+        output = philox4x32(np.zeros((4, 1), dtype=np.uint32), [0, 0])[:, 0]
+        self.assertEqual(output.tolist(), [0x6627e8d5, 0xe169c58d, 0xbc57ac4c, 0x9b00dbd8])
+        
+        config = copy.deepcopy(self.config)
+        config['simulation'].update({'seed': 7, 'counter_rng': True, 'rounds_per_shoe': 64, 'chunk_size': 700})
+        simulator = Simulator(config, workers=1)
+        results = simulator.run_multiple_strategies([16, 17], 2000)
+        for game_id in (1, 64, 65, 1234, 2000):
+            self.assertEqual(simulator.replay(17, game_id), results[17][game_id - 1])
+        
+        # 結果與區塊劃分和工作進程數量無關
+        config['simulation']['chunk_size'] = 300
+        parallel = Simulator(config, workers=2).run_aggregate([16, 17], 2000)
+        self.assertEqual(parallel[16], OutcomeAggregate.from_results(results[16]))
+        
+        # 共用牌序時以整組策略重現
+        shared = simulator.run_multiple_strategies([16, 17], 300, shared_cards=True)
+        self.assertEqual(simulator.replay(16, 299, [16, 17]), shared[16][298])
+        
+        with self.assertRaises(RuntimeError):
+            Simulator(self.config).replay(17, 1)
+    
+    def test_shoe_library(self):
+        """測試從磁碟牌靴庫依序讀取牌靴"""
+        path = write_shoe_library(os.path.join(self.temp_dir, 'shoes.npy'), 200, num_decks=2, seed=1)
+        library = ShoeLibrary(path)
+        self.assertEqual((len(library), library.num_decks), (200, 2))
+        
+        # Deck 按文件中的順序發牌
+        deck = Deck(num_decks=2, shoe_source=ShoeLibrary(path))
+        ranks = [deck.draw_rank() for _ in range(104)]
+        self.assertEqual(ranks, (library.shoes[0] % 13 + 1).tolist())
+        
+        # 分片互不重疊，讀完後拋出異常
+        shard = library.shard(3, 4)
+        self.assertEqual((shard.start, shard.stop), (150, 200))
+        shard.take(50)
+        with self.assertRaises(RuntimeError):
+            shard.next_shoe()
+        
+        # 使用相同牌靴庫的運行結果相同，且與工作進程數量無關
+        config = copy.deepcopy(self.config)
+        config['simulation'].update({'shoe_library': path, 'chunk_size': 250})
+        first = Simulator(config, workers=1).run_aggregate([16, 17], 500)
+        second = Simulator(config, workers=2).run_aggregate([16, 17], 500)
+        for strategy in (16, 17):
+            self.assertEqual(first[strategy], second[strategy])
+    
+    def test_result_batch(self):
+        """測試列式結果批次與結果列表的相容性"""
+        simulator = Simulator(self.config)
+        results = simulator.run_multiple_strategies([16, 17], 600)
+        batch = results[16]
+        self.assertIsInstance(batch, ResultBatch)
+        self.assertEqual(batch.nbytes, 2 * 600)
+        
+        # 索引、切片和迭代返回與結果列表相同格式的字典
+        records = list(batch)
+        self.assertEqual(records[-1], batch[-1])
+        self.assertEqual(batch[-1]['game_id'], 600)
+        self.assertEqual(list(batch[100:200]), records[100:200])
+        self.assertTrue(np.shares_memory(batch[100:200].totals, batch.totals))
+        
+        # 由結果列表重建、拼接和轉換為 DataFrame
+        rebuilt = ResultBatch.concatenate([ResultBatch.from_records(records[:250]),
+                                           ResultBatch.from_records(records[250:])])
+        self.assertEqual(list(rebuilt), records)
+        self.assertEqual(rebuilt.to_dataframe().to_dict('records'), records)
+        
+        # 分析器對結果批次和結果列表的統計相同
+        from_batches = Analyzer(results)
+        from_lists = Analyzer({strategy: list(batch) for strategy, batch in results.items()})
+        for strategy in (16, 17, None):
+            actual = from_batches.calculate_statistics(strategy)
+            wanted = from_lists.calculate_statistics(strategy)
+            self.assertEqual(actual['count'], wanted['count'])
+            self.assertEqual(actual['value_counts'], wanted['value_counts'])
+            self.assertAlmostEqual(actual['std'], wanted['std'])
+    
+    def test_histogram_statistics(self):
+        """測試由點數計數得出的統計與 pandas 逐局計算的結果相同"""
+        simulator = Simulator(self.config)
+        records = {strategy: list(batch) for strategy, batch in simulator.run_multiple_strategies([16, 17], 301).items()}
+        analyzer = Analyzer(records)
+        
+        for strategy in (16, 17, None):
+            rows = records[strategy] if strategy is not None else records[16] + records[17]
+            values = pd.DataFrame(rows)['dealer_hand_value']
+            stats = analyzer.calculate_statistics(strategy)
+            self.assertEqual(stats['count'], len(values))
+            self.assertEqual(stats['bust_count'], int((values > 21).sum()))
+            self.assertEqual(stats['value_counts'], values.value_counts().sort_index().to_dict())
+            for key, wanted in (('median', values.median()), ('percentile_25', values.quantile(0.25)),
+                                ('percentile_75', values.quantile(0.75)), ('min', values.min()), ('max', values.max())):
+                self.assertEqual(stats[key], wanted)
+            self.assertAlmostEqual(stats['mean'], values.mean())
+            self.assertAlmostEqual(stats['std'], values.std())
+        
+        # 空結果列表與缺少的策略返回默認值
+        self.assertEqual(Analyzer({16: []}).calculate_statistics(16)['count'], 0)
+        self.assertEqual(analyzer.calculate_statistics(18)['count'], 0)
+    
+    def test_bootstrap_intervals(self):
+        """測試以多項分佈重抽樣點數計數的自助法置信區間"""
+        simulator = Simulator(self.config)
+        aggregates = simulator.run_aggregate([16, 17], 2000)
+        
+        # 每個重抽樣的局數與原計數相同，且只落在出現過的點數上
+        samples = aggregates[16].bootstrap(500, np.random.default_rng(0))
+        self.assertEqual(samples.shape, (500, OutcomeAggregate.NUM_BINS))
+        self.assertTrue(np.all(samples.sum(axis=1) == 2000))
+        self.assertTrue(np.all(samples[:, aggregates[16].counts == 0] == 0))
+        
+        # 向量化統計與逐個計算的統計相同
+        batch = OutcomeAggregate.batch_statistics(samples[:3])
+        for row in range(3):
+            stats = OutcomeAggregate(samples[row]).statistics()
+            for metric in OutcomeAggregate.BOOTSTRAP_METRICS:
+                self.assertAlmostEqual(batch[metric][row], stats[metric])
+        
+        analyzer = Analyzer(aggregates)
+        comparison = analyzer.compare_strategies(confidence=0.95, replicates=500, seed=1)
+        for column in ('bust_rate', 'mean_value', 'median_value', 'std_dev'):
+            self.assertTrue((comparison[f'{column}_low'] <= comparison[column]).all())
+            self.assertTrue((comparison[column] <= comparison[f'{column}_high']).all())
+        pd.testing.assert_frame_equal(comparison, analyzer.compare_strategies(confidence=0.95, replicates=500, seed=1))
+        self.assertEqual(len(analyzer.compare_strategies().columns), 6)
+        
+        # 合併的區間和局數不足時的區間
+        low, high = analyzer.confidence_intervals(confidence=0.9, replicates=500, seed=2)['bust_rate']
+        self.assertLess(low, analyzer.calculate_statistics()['bust_rate'])
+        self.assertLess(analyzer.calculate_statistics()['bust_rate'], high)
+        self.assertTrue(np.isnan(OutcomeAggregate().bootstrap_intervals()['mean'][0]))
+    
+    def test_pairwise_tests(self):
+        """測試成對顯著性檢定與多重比較校正"""
+        # 已知的參考值
+        self.assertAlmostEqual(chi2_sf(3.841458820694124, 1), 0.05)
+        self.assertAlmostEqual(chi2_sf(20.0, 2), np.exp(-10))
+        self.assertAlmostEqual(fisher_exact(8, 10, 1, 6)[1], 0.03496503496503495)
+        self.assertAlmostEqual(fisher_exact(3, 4, 1, 4)[1], 0.4857142857142857)
+        self.assertEqual(holm_adjust([0.01, 0.04, 0.03, 0.005]), [0.03, 0.06, 0.06, 0.02])
+        
+        # 明顯不同的策略顯著，相同的計數不顯著；局數很少時改用 Fisher 精確檢定
+        low = OutcomeAggregate.from_totals(np.repeat([17, 18, 22], [500, 400, 100]))
+        high = OutcomeAggregate.from_totals(np.repeat([17, 18, 22], [300, 400, 300]))
+        tiny = OutcomeAggregate.from_totals(np.array([17, 22, 18]))
+        analyzer = Analyzer({16: low, 17: low.copy(), 18: high, 19: tiny})
+        tests = analyzer.pairwise_tests(method='g')
+        self.assertEqual(len(tests), 12)
+        pair = tests.set_index(['strategy_a', 'strategy_b', 'metric'])
+        self.assertTrue(pair.loc[(16, 18, 'bust_rate'), 'significant'])
+        self.assertTrue(pair.loc[(16, 18, 'distribution'), 'significant'])
+        self.assertFalse(pair.loc[(16, 17, 'bust_rate'), 'significant'])
+        self.assertEqual(pair.loc[(16, 19, 'bust_rate'), 'test'], 'fisher')
+        self.assertTrue((tests['p_adjusted'] >= tests['p_value']).all())
+        
+        comparison, matrices = analyzer.compare_strategies(pairwise=True)
+        self.assertEqual(len(comparison), 4)
+        self.assertEqual(matrices['bust_rate'].loc[18, 16], pair.loc[(16, 18, 'bust_rate'), 'p_adjusted'])
+        self.assertTrue(np.isnan(matrices['distribution'].loc[17, 17]))
+    
+    def test_up_card_tables(self):
+        """測試按莊家明牌分組的條件結果表"""
+        self.config['simulation']['record_up_card'] = True
+        for engine in ('vectorized', 'scalar'):
+            self.config['simulation']['engine'] = engine
+            batch = Simulator(self.config).run_simulation(17, 3000)
+            self.assertEqual(len(batch.up_card), 3000)
+            self.assertTrue(((batch.up_card >= 1) & (batch.up_card <= 13)).all())
+        
+        # 條件分佈每行和為1，爆牌率與逐局計算一致（10/J/Q/K 合併為 10）
+        analyzer = Analyzer({17: batch})
+        self.assertTrue(analyzer.has_up_cards(17))
+        table = analyzer.up_card_table(17)
+        self.assertEqual(list(table.index), ['A'] + [str(value) for value in range(2, 11)])
+        self.assertTrue(np.allclose(table.sum(axis=1), 1))
+        frame = batch.to_dataframe()
+        expected = frame.groupby(frame['up_card'].clip(upper=10))['is_dealer_busted'].mean()
+        self.assertTrue(np.allclose(analyzer.up_card_bust_rates(17).values, expected.values))
+        self.assertEqual(analyzer.calculate_statistics(17)['count'], 3000)
+        
+        # 局數模式返回明牌聚合，合併普通聚合應拋出異常
+        self.config['simulation'].update({'engine': 'vectorized', 'seed': 5})
+        aggregates = Simulator(self.config).run_aggregate([16, 17], 2000)
+        self.assertIsInstance(aggregates[16], UpCardAggregate)
+        self.assertTrue((aggregates[16].joint.sum(axis=0) == aggregates[16].counts).all())
+        self.assertEqual(aggregates[17].count, 2000)
+        with self.assertRaises(ValueError):
+            aggregates[16].merge(OutcomeAggregate.from_totals(np.array([17])))
+        
+        # 精度模式和時間預算模式保留聯合計數；只保存點數計數的檢查點模式拋出異常
+        simulator = Simulator(self.config)
+        precise = simulator.run_precision([17], targets={'bust_rate': 0.02}, max_games=5000)
+        self.assertIsInstance(precise[17], UpCardAggregate)
+        self.assertEqual(precise[17].joint.sum(), precise[17].count)
+        self.assertTrue((precise[17].joint.sum(axis=1) > 0).all())
+        budget = simulator.run_time_budget([16], 0.05)
+        self.assertEqual(budget[16].joint.sum(), budget[16].count)
+        with self.assertRaises(ValueError):
+            simulator.run_checkpointed([17], 100, path=os.path.join(self.temp_dir, 'checkpoint.json'))
+        
+        # 計數器式隨機數的明牌與逐段模擬一致
+        self.config['simulation'].update({'counter_rng': True, 'rounds_per_shoe': 16})
+        engine = Simulator(self.config)._create_vector_engine()
+        totals, up_cards = engine.play_range([17], 0, 100, record='up_card')
+        tail_totals, tail_up_cards = engine.play_range([17], 40, 60, record='up_card')
+        self.assertTrue((tail_totals == totals[:, 40:]).all())
+        self.assertTrue((tail_up_cards == up_cards[40:]).all())
+        
+        # 沒有明牌數據時應該拋出異常
+        with self.assertRaises(ValueError):
+            Analyzer({17: OutcomeAggregate.from_totals(np.array([17, 22]))}).up_card_table(17)
+        
+        # 未實現 rows 的分組聚合在建立時即拋出異常
+        class MissingRows(JointAggregate):
+            COLUMN, LABELS, NUM_ROWS = 'up_card', ('A',), 1
+        with self.assertRaises(TypeError):
+            MissingRows()
+    
+    def test_penetration_buckets(self):
+        """測試按牌靴剩餘比例分組的聚合計數與爆牌率變化"""
+        # 已發出的比例映射到剩餘比例的區間，剛洗好的牌靴歸入最後一個區間
+        rows = PenetrationAggregate.rows(np.array([0.0, 0.05, 0.5, 0.62, 1.0]))
+        self.assertEqual(rows.tolist(), [19, 19, 10, 7, 0])
+        
+        self.config['simulation']['record_penetration'] = True
+        for engine in ('vectorized', 'scalar'):
+            self.config['simulation']['engine'] = engine
+            batch = Simulator(self.config).run_simulation(17, 3000)
+            self.assertEqual(batch.penetration.dtype, np.float32)
+            # 每局開始前剩餘比例低於洗牌閾值的牌靴已經重新洗牌，
+            # 且各局覆蓋從新牌靴到洗牌前的整個範圍（向量化引擎的通道不只停留在牌靴開頭）
+            threshold = self.config['game']['reshuffle_threshold']
+            self.assertTrue((1 - batch.penetration >= threshold - 1e-6).all())
+            self.assertGreater(batch.penetration.max(), 1 - threshold - 0.05)
+            self.assertLess(batch.penetration.min(), 0.05)
+        
+        # 各區間的局數和爆牌率與逐局分組一致
+        analyzer = Analyzer({17: batch})
+        self.assertTrue(analyzer.has_penetration(17))
+        self.assertFalse(analyzer.has_up_cards(17))
+        rates = analyzer.penetration_bust_rates(17)
+        self.assertEqual(rates['games'].sum(), 3000)
+        buckets = PenetrationAggregate.rows(batch.penetration)
+        expected = pd.Series(batch.busted).groupby(buckets).mean()
+        self.assertTrue(np.allclose(rates['bust_rate'].values, expected.values))
+        self.assertTrue((rates['bust_rate_low'] <= rates['bust_rate']).all())
+        self.assertTrue(np.allclose(analyzer.penetration_table(17).sum(axis=1), 1))
+        drift = analyzer.penetration_drift(17)
+        self.assertTrue(0 <= drift['p_value'] <= 1)
+        
+        # 局數模式和逐批模式返回同類聚合；不同分組的聚合不能合併
+        self.config['simulation']['engine'] = 'vectorized'
+        simulator = Simulator(self.config)
+        aggregates = simulator.run_aggregate([16, 17], 2000)
+        self.assertIsInstance(aggregates[16], PenetrationAggregate)
+        self.assertEqual(aggregates[16].joint.sum(), 2000)
+        delta = next(simulator.iter_batches(17, num_games=500))
+        self.assertIsInstance(delta, PenetrationAggregate)
+        self.assertEqual(aggregates[17].copy().merge(delta).count, 2500)
+        with self.assertRaises(ValueError):
+            aggregates[16].merge(UpCardAggregate())
+        
+        # 不能同時記錄明牌和滲透率
+        self.config['simulation']['record_up_card'] = True
+        with self.assertRaises(ValueError):
+            Simulator(self.config)
+    
+    def test_incremental_analyzer(self):
+        """測試增量分析器逐批更新後與一次性分析的結果相同"""
+        simulator = Simulator(self.config)
+        results = simulator.run_multiple_strategies([16, 17], 300)
+        expected = Analyzer(results)
+        
+        # 以不同形式的批次逐批更新
+        analyzer = IncrementalAnalyzer()
+        for strategy, strategy_results in results.items():
+            analyzer.update(strategy, strategy_results[:50])
+            totals = [r['dealer_hand_value'] for r in strategy_results[50:120]]
+            analyzer.update(strategy, np.array(totals))
+            analyzer.update(strategy, OutcomeAggregate.from_results(strategy_results[120:]))
+        self.assertEqual(analyzer.strategies, [16, 17])
+        
+        for strategy in (16, 17, None):
+            actual = analyzer.calculate_statistics(strategy)
+            wanted = expected.calculate_statistics(strategy)
+            self.assertEqual(actual['count'], wanted['count'])
+            self.assertEqual(actual['value_counts'], wanted['value_counts'])
+            for key in ('bust_rate', 'mean', 'median', 'std', 'percentile_25', 'percentile_75'):
+                self.assertAlmostEqual(actual[key], wanted[key])
+        self.assertEqual(len(analyzer.compare_strategies()), 2)
+    
+    def test_exact_calculator(self):
+        """測試有限牌靴的精確點數分布"""
+        calculator = ExactCalculator(num_decks=2)
+        for strategy in (12, 17, 21):
+            distribution = calculator.get_distribution(strategy)
+            self.assertAlmostEqual(sum(distribution.values()), 1.0)
+            self.assertGreaterEqual(min(distribution), strategy)
+        
+        # 明確指定完整牌靴的13種點數張數，結果應與按牌副數計算相同
+        self.assertEqual(calculator.get_distribution(17, [8] * 13), calculator.get_distribution(17))
+        
+        # 只剩10點牌時，莊家必然拿到20點，策略21時再補一張爆牌
+        tens_only = [0] * 9 + [5]
+        self.assertEqual(calculator.get_distribution(17, tens_only), {20: 1.0})
+        self.assertEqual(calculator.get_distribution(21, tens_only), {30: 1.0})
+        
+        # 精確爆牌率應與模擬結果一致（容許約4個標準差）
+        self.config['simulation']['engine'] = 'vectorized'
+        self.config['game']['decks'] = 2
+        _, busted = Simulator(self.config).simulate_outcomes(17, 200000)
+        self.assertAlmostEqual(busted.mean(), calculator.get_bust_probability(17), delta=0.005)
+        
+        with self.assertRaises(ValueError):
+            calculator.get_distribution(17, [1, 2, 3])
+        # 牌不足以讓莊家停牌時與其他無效組成一樣拋出 ValueError
+        with self.assertRaises(ValueError):
+            calculator.get_distribution(17, [0, 2] + [0] * 8)
     
     def test_analyzer(self):
         """測試分析器"""